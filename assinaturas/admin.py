@@ -1,5 +1,26 @@
 from django.contrib import admin
-from .models import Categoria, Assinatura
+from django.db.models import Q, Sum
+from django.utils import timezone
+from .models import (
+    Categoria, Assinatura, Cobranca, Exclusao, GastoConsolidado, Perfil,
+    Tarefa, TaxaCambio,
+)
+
+
+class CategoriaListFilter(admin.RelatedFieldListFilter):
+    """
+    Filtro por categoria com o dono no mesmo SELECT: Categoria.__str__
+    mostra o usuário, e o filtro padrão faria uma consulta por opção
+    """
+
+    def field_choices(self, field, request, model_admin):
+        categorias = field.related_model._default_manager.select_related(
+            'usuario'
+        )
+        ordering = self.field_admin_ordering(field, request, model_admin)
+        if ordering:
+            categorias = categorias.order_by(*ordering)
+        return [(categoria.pk, str(categoria)) for categoria in categorias]
 
 
 @admin.register(Categoria)
@@ -8,6 +29,7 @@ class CategoriaAdmin(admin.ModelAdmin):
     list_filter = ['usuario', 'data_criacao']
     search_fields = ['nome', 'descricao', 'usuario__username']
     readonly_fields = ['data_criacao']
+    list_select_related = ['usuario']
     
     fieldsets = (
         ('Informações Básicas', {
@@ -22,6 +44,21 @@ class CategoriaAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_queryset(self, request):
+        # Soma das linhas consolidadas, não uma contagem das assinaturas
+        return super().get_queryset(request).annotate(
+            total_ativas=Sum(
+                'gastos_consolidados__quantidade',
+                filter=Q(gastos_consolidados__status='ATIVA'),
+                default=0
+            )
+        )
+
+    def total_assinaturas(self, obj):
+        return obj.total_ativas
+    total_assinaturas.short_description = 'Assinaturas ativas'
+    total_assinaturas.admin_order_field = 'total_ativas'
+
 
 @admin.register(Assinatura)
 class AssinaturaAdmin(admin.ModelAdmin):
@@ -38,7 +75,7 @@ class AssinaturaAdmin(admin.ModelAdmin):
     list_filter = [
         'status', 
         'ciclo_pagamento', 
-        'categoria', 
+        ('categoria', CategoriaListFilter),
         'data_proxima_cobranca'
     ]
     search_fields = [
@@ -47,6 +84,7 @@ class AssinaturaAdmin(admin.ModelAdmin):
         'usuario__username',
         'categoria__nome'
     ]
+    list_select_related = ['usuario', 'categoria__usuario']
     readonly_fields = [
         'data_criacao', 
         'data_atualizacao',
@@ -122,3 +160,94 @@ class AssinaturaAdmin(admin.ModelAdmin):
         queryset.update(status='CANCELADA')
         self.message_user(request, f'{queryset.count()} assinatura(s) cancelada(s).')
     marcar_como_cancelada.short_description = 'Marcar como Cancelada'
+
+
+@admin.register(GastoConsolidado)
+class GastoConsolidadoAdmin(admin.ModelAdmin):
+    list_display = [
+        'usuario',
+        'categoria',
+        'status',
+        'ciclo_pagamento',
+        'moeda',
+        'quantidade',
+        'valor_mensal',
+        'valor_anual'
+    ]
+    list_filter = ['status', 'ciclo_pagamento', 'moeda']
+    search_fields = ['usuario__username', 'categoria__nome']
+    list_select_related = ['usuario', 'categoria']
+
+    # Mantido pelos signals e pelo comando reconstruir_consolidado
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Cobranca)
+class CobrancaAdmin(admin.ModelAdmin):
+    list_display = ['data', 'usuario', 'assinatura', 'valor', 'moeda']
+    search_fields = ['usuario__username']
+    list_select_related = ['usuario', 'assinatura']
+    date_hierarchy = 'data'
+    # COUNT(*) sem filtro percorre a tabela inteira
+    show_full_result_count = False
+
+    # Histórico somente de inserção (avancar_cobrancas)
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Tarefa)
+class TarefaAdmin(admin.ModelAdmin):
+    list_display = [
+        'id',
+        'tipo',
+        'usuario',
+        'status',
+        'tentativas',
+        'data_criacao',
+        'data_fim'
+    ]
+    list_filter = ['status', 'tipo']
+    search_fields = ['usuario__username']
+    list_select_related = ['usuario']
+    readonly_fields = ['trabalhador', 'resultado', 'erro', 'data_inicio', 'data_fim']
+    actions = ['reenfileirar']
+
+    def reenfileirar(self, request, queryset):
+        """Volta as tarefas que falharam para a fila, com novas tentativas"""
+        total = queryset.filter(status='FALHOU').update(
+            status='PENDENTE', tentativas=0, executar_apos=timezone.now()
+        )
+        self.message_user(request, f'{total} tarefa(s) reenfileirada(s).')
+    reenfileirar.short_description = 'Reenfileirar tarefas que falharam'
+
+
+@admin.register(TaxaCambio)
+class TaxaCambioAdmin(admin.ModelAdmin):
+    list_display = ['moeda', 'taxa', 'data_atualizacao']
+    search_fields = ['moeda']
+
+
+@admin.register(Perfil)
+class PerfilAdmin(admin.ModelAdmin):
+    list_display = ['usuario', 'moeda_base']
+    list_filter = ['moeda_base']
+    search_fields = ['usuario__username']
+    list_select_related = ['usuario']
+    raw_id_fields = ['usuario']
+
+
+@admin.register(Exclusao)
+class ExclusaoAdmin(admin.ModelAdmin):
+    list_display = ['modelo', 'objeto_id', 'usuario', 'data_exclusao']
+    list_filter = ['modelo']
+    search_fields = ['usuario__username']
+    list_select_related = ['usuario']
+    raw_id_fields = ['usuario']
@@ -0,0 +1,423 @@
+"""
+API JSON de assinaturas e categorias: serialização, validação e
+gravações em lote
+
+As respostas saem de values() (dicionários, sem instanciar modelos).
+Cada requisição de escrita recebe uma lista de até LIMITE_LOTE itens,
+valida todos antes de gravar e grava tudo em uma transação: com algum
+item inválido nada é gravado. As gravações usam bulk_create,
+bulk_update e exclusão por queryset, que reconstroem os gastos
+consolidados uma vez por usuário, então o número de consultas depende
+do número de lotes do banco e não do número de itens.
+"""
+import re
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from .importacao import CICLOS, STATUS
+from .models import Assinatura, Categoria
+from .resumo import invalidar_resumo
+
+
+# Itens por requisição de escrita
+LIMITE_LOTE = 1000
+
+# Itens por página das listagens (padrão e máximo de ?limite=)
+TAMANHO_PAGINA = 50
+LIMITE_PAGINA = 200
+
+CAMPOS_ASSINATURA = (
+    'id',
+    'nome',
+    'descricao',
+    'valor',
+    'moeda',
+    'ciclo_pagamento',
+    'status',
+    'categoria_id',
+    'data_primeira_cobranca',
+    'data_proxima_cobranca',
+    'dia_vencimento',
+    'observacoes',
+    'valor_mensal_normalizado',
+    'data_criacao',
+    'data_atualizacao',
+)
+
+CAMPOS_CATEGORIA = (
+    'id',
+    'nome',
+    'descricao',
+    'cor',
+    'data_criacao',
+    'data_atualizacao',
+)
+
+# Campos aceitos na criação e na alteração
+EDITAVEIS_ASSINATURA = (
+    'nome', 'descricao', 'valor', 'moeda', 'ciclo_pagamento', 'status',
+    'categoria_id', 'data_primeira_cobranca', 'observacoes',
+)
+OBRIGATORIOS_ASSINATURA = (
+    'nome', 'valor', 'ciclo_pagamento', 'data_primeira_cobranca',
+)
+EDITAVEIS_CATEGORIA = ('nome', 'descricao', 'cor')
+
+COR = re.compile(r'^#[0-9a-fA-F]{6}$')
+
+NOME_EM_USO = 'Nome de categoria já em uso; envie as alterações em lotes separados.'
+
+
+class ErroLote(Exception):
+    """Itens inválidos: [{'indice': posição na lista, 'mensagens': [...]}]"""
+
+    def __init__(self, erros):
+        super().__init__(f'{len(erros)} item(ns) inválido(s).')
+        self.erros = erros
+
+
+def _validar_lote(itens):
+    if not isinstance(itens, list):
+        raise ErroLote([{'indice': None, 'mensagens': ['Envie uma lista.']}])
+    if not itens or len(itens) > LIMITE_LOTE:
+        raise ErroLote([{
+            'indice': None,
+            'mensagens': [f'Envie de 1 a {LIMITE_LOTE} itens.'],
+        }])
+
+
+def _texto(valor, campo):
+    if valor is None:
+        return None
+    if not isinstance(valor, str):
+        raise ValueError(f'{campo}: deve ser texto.')
+    return valor.strip()
+
+
+def _rodar_validadores(modelo, dados, erros):
+    """Validadores dos campos do modelo (tamanho, mínimo, dígitos)"""
+    for campo, valor in dados.items():
+        if valor is None:
+            continue
+        try:
+            modelo._meta.get_field(campo).run_validators(valor)
+        except ValidationError as erro:
+            erros.extend(f'{campo}: {mensagem}' for mensagem in erro.messages)
+
+
+def validar_assinatura(item, categorias, parcial=False):
+    """
+    Converte um item JSON nos campos de Assinatura. `categorias` é o
+    conjunto de ids de categoria do usuário. Com `parcial`, só os
+    campos enviados são exigidos. Retorna (dados, erros).
+    """
+    if not isinstance(item, dict):
+        return None, ['O item deve ser um objeto.']
+    desconhecidos = set(item) - set(EDITAVEIS_ASSINATURA) - {'id'}
+    if desconhecidos:
+        return None, [f'Campos desconhecidos: {", ".join(sorted(desconhecidos))}.']
+    erros = [
+        f'Campo obrigatório: {campo}.'
+        for campo in OBRIGATORIOS_ASSINATURA
+        if not parcial and item.get(campo) in (None, '')
+    ]
+    if erros:
+        return None, erros
+
+    dados = {}
+    for campo in EDITAVEIS_ASSINATURA:
+        if campo not in item:
+            continue
+        valor = item[campo]
+        try:
+            if campo == 'valor':
+                if isinstance(valor, bool):
+                    raise InvalidOperation
+                dados[campo] = Decimal(str(valor))
+                if not dados[campo].is_finite():
+                    raise InvalidOperation
+            elif campo == 'data_primeira_cobranca':
+                dados[campo] = date.fromisoformat(str(valor))
+            elif campo == 'categoria_id':
+                if valor is not None and (
+                    not isinstance(valor, int) or isinstance(valor, bool)
+                    or valor not in categorias
+                ):
+                    raise ValueError(f'Categoria inválida: {valor}.')
+                dados[campo] = valor
+            elif campo in ('moeda', 'ciclo_pagamento', 'status'):
+                dados[campo] = (_texto(valor, campo) or '').upper()
+            else:
+                dados[campo] = _texto(valor, campo)
+        except InvalidOperation:
+            erros.append(f'Valor inválido: {valor}.')
+        except ValueError as erro:
+            mensagem = str(erro)
+            if campo == 'data_primeira_cobranca':
+                mensagem = f'Data inválida: {valor} (use AAAA-MM-DD).'
+            erros.append(mensagem)
+
+    if 'nome' in dados and not dados['nome']:
+        erros.append('Campo obrigatório: nome.')
+    if 'ciclo_pagamento' in dados and dados['ciclo_pagamento'] not in CICLOS:
+        erros.append(f'Ciclo de pagamento inválido: {item["ciclo_pagamento"]}.')
+    if 'status' in dados and dados['status'] not in STATUS:
+        erros.append(f'Status inválido: {item["status"]}.')
+    if 'moeda' in dados and not (
+        len(dados['moeda']) == 3 and dados['moeda'].isalpha()
+    ):
+        erros.append(f'Moeda inválida: {item["moeda"]}.')
+    _rodar_validadores(
+        Assinatura,
+        {c: v for c, v in dados.items() if c in ('nome', 'valor')},
+        erros,
+    )
+    return (None if erros else dados), erros
+
+
+def _preencher_datas(assinatura):
+    """O que save() preencheria a partir da primeira cobrança"""
+    assinatura.dia_vencimento = assinatura.data_primeira_cobranca.day
+    assinatura.data_proxima_cobranca = assinatura.calcular_proxima_cobranca(
+        assinatura.data_primeira_cobranca
+    )
+
+
+def _ids_do_lote(itens, existentes, nome):
+    """Confere o 'id' de cada item de uma alteração; retorna os erros"""
+    erros, vistos = [], set()
+    for indice, item in enumerate(itens):
+        pk = item.get('id') if isinstance(item, dict) else None
+        if not isinstance(pk, int) or isinstance(pk, bool):
+            erros.append({'indice': indice, 'mensagens': ['Campo obrigatório: id.']})
+        elif pk in vistos:
+            erros.append({'indice': indice, 'mensagens': [f'id repetido: {pk}.']})
+        elif pk not in existentes:
+            erros.append({
+                'indice': indice,
+                'mensagens': [f'{nome} não encontrada: {pk}.'],
+            })
+        else:
+            vistos.add(pk)
+    return erros
+
+
+def _ids(lista):
+    """Lista de ids de uma exclusão"""
+    _validar_lote(lista)
+    if not all(isinstance(pk, int) and not isinstance(pk, bool) for pk in lista):
+        raise ErroLote([{'indice': None, 'mensagens': ['Envie uma lista de ids.']}])
+    return set(lista)
+
+
+def serializar_assinaturas(usuario, ids):
+    return list(
+        Assinatura.objects.for_user(usuario).filter(id__in=ids)
+        .order_by('id').values(*CAMPOS_ASSINATURA)
+    )
+
+
+def serializar_categorias(usuario, ids):
+    return list(
+        Categoria.objects.filter(usuario=usuario, id__in=ids)
+        .order_by('id').values(*CAMPOS_CATEGORIA)
+    )
+
+
+def criar_assinaturas(usuario, itens):
+    """Cria as assinaturas em lote. Retorna os ids criados."""
+    _validar_lote(itens)
+    categorias = set(usuario.categorias.values_list('id', flat=True))
+    novas, erros = [], []
+    for indice, item in enumerate(itens):
+        dados, mensagens = validar_assinatura(item, categorias)
+        if mensagens:
+            erros.append({'indice': indice, 'mensagens': mensagens})
+            continue
+        assinatura = Assinatura(usuario_id=usuario.pk, **dados)
+        _preencher_datas(assinatura)
+        novas.append(assinatura)
+    if erros:
+        raise ErroLote(erros)
+
+    with transaction.atomic():
+        Assinatura.objects.bulk_create(novas)
+    return [assinatura.pk for assinatura in novas]
+
+
+def atualizar_assinaturas(usuario, itens):
+    """
+    Altera as assinaturas em lote; cada item tem o 'id' e os campos a
+    mudar. Retorna os ids alterados.
+    """
+    _validar_lote(itens)
+    ids = [item.get('id') for item in itens if isinstance(item, dict)]
+    existentes = Assinatura.objects.for_user(usuario).in_bulk(
+        {pk for pk in ids if isinstance(pk, int) and not isinstance(pk, bool)}
+    )
+    erros = _ids_do_lote(itens, existentes, 'Assinatura')
+    if erros:
+        raise ErroLote(erros)
+
+    categorias = set(usuario.categorias.values_list('id', flat=True))
+    campos = set()
+    for indice, item in enumerate(itens):
+        dados, mensagens = validar_assinatura(item, categorias, parcial=True)
+        if mensagens:
+            erros.append({'indice': indice, 'mensagens': mensagens})
+            continue
+        assinatura = existentes[item['id']]
+        for campo, valor in dados.items():
+            setattr(assinatura, campo, valor)
+        campos.update(dados)
+        if 'data_primeira_cobranca' in dados:
+            _preencher_datas(assinatura)
+            campos.update(('dia_vencimento', 'data_proxima_cobranca'))
+    if erros:
+        raise ErroLote(erros)
+
+    if campos:
+        campos = [
+            'categoria' if campo == 'categoria_id' else campo for campo in campos
+        ]
+        with transaction.atomic():
+            Assinatura.objects.bulk_update(existentes.values(), sorted(campos))
+    return list(existentes)
+
+
+def excluir_assinaturas(usuario, ids):
+    """Exclui as assinaturas do usuário em lote. Retorna a quantidade."""
+    ids = _ids(ids)
+    with transaction.atomic():
+        _, por_modelo = Assinatura.objects.for_user(usuario).filter(
+            id__in=ids
+        ).delete()
+    return por_modelo.get(Assinatura._meta.label, 0)
+
+
+def validar_categoria(item, parcial=False):
+    """Converte um item JSON nos campos de Categoria. Retorna (dados, erros)."""
+    if not isinstance(item, dict):
+        return None, ['O item deve ser um objeto.']
+    desconhecidos = set(item) - set(EDITAVEIS_CATEGORIA) - {'id'}
+    if desconhecidos:
+        return None, [f'Campos desconhecidos: {", ".join(sorted(desconhecidos))}.']
+
+    dados, erros = {}, []
+    for campo in EDITAVEIS_CATEGORIA:
+        if campo in item:
+            try:
+                dados[campo] = _texto(item[campo], campo)
+            except ValueError as erro:
+                erros.append(str(erro))
+    if ('nome' in dados or not parcial) and not dados.get('nome'):
+        erros.append('Campo obrigatório: nome.')
+    if 'cor' in dados and not COR.match(dados['cor'] or ''):
+        erros.append(f'Cor inválida: {item["cor"]} (use #RRGGBB).')
+    _rodar_validadores(
+        Categoria, {c: v for c, v in dados.items() if c == 'nome'}, erros
+    )
+    return (None if erros else dados), erros
+
+
+def _nomes_repetidos(nomes, erros):
+    """Acrescenta um erro para cada item cujo nome já está em uso"""
+    vistos = {}
+    for indice, nome in nomes:
+        if nome in vistos:
+            erros.append({
+                'indice': indice,
+                'mensagens': [f'Você já possui uma categoria com o nome "{nome}".'],
+            })
+        vistos[nome] = indice
+
+
+def criar_categorias(usuario, itens):
+    """Cria as categorias em lote. Retorna os ids criados."""
+    _validar_lote(itens)
+    existentes = list(usuario.categorias.values_list('nome', flat=True))
+    novas, erros = [], []
+    for indice, item in enumerate(itens):
+        dados, mensagens = validar_categoria(item)
+        if mensagens:
+            erros.append({'indice': indice, 'mensagens': mensagens})
+            continue
+        novas.append((indice, Categoria(usuario_id=usuario.pk, **dados)))
+    _nomes_repetidos(
+        [(None, nome) for nome in existentes]
+        + [(indice, categoria.nome) for indice, categoria in novas],
+        erros,
+    )
+    if erros:
+        raise ErroLote(sorted(erros, key=lambda erro: erro['indice']))
+
+    try:
+        with transaction.atomic():
+            Categoria.objects.bulk_create([categoria for _, categoria in novas])
+    except IntegrityError:
+        # Nome criado por outra requisição depois da verificação
+        raise ErroLote([{'indice': None, 'mensagens': [NOME_EM_USO]}])
+    invalidar_resumo(usuario.pk)
+    return [categoria.pk for _, categoria in novas]
+
+
+def atualizar_categorias(usuario, itens):
+    """Altera as categorias em lote (itens com 'id'). Retorna os ids."""
+    _validar_lote(itens)
+    existentes = usuario.categorias.in_bulk()
+    erros = _ids_do_lote(itens, existentes, 'Categoria')
+    if erros:
+        raise ErroLote(erros)
+
+    campos = set()
+    indices = {}
+    for indice, item in enumerate(itens):
+        dados, mensagens = validar_categoria(item, parcial=True)
+        if mensagens:
+            erros.append({'indice': indice, 'mensagens': mensagens})
+            continue
+        categoria = existentes[item['id']]
+        for campo, valor in dados.items():
+            setattr(categoria, campo, valor)
+        campos.update(dados)
+        indices[categoria.pk] = indice
+    # As não alteradas vêm primeiro: o erro fica no item que mudou
+    _nomes_repetidos(
+        [
+            (None, categoria.nome) for pk, categoria in existentes.items()
+            if pk not in indices
+        ] + [
+            (indice, existentes[pk].nome) for pk, indice in indices.items()
+        ],
+        erros,
+    )
+    if erros:
+        raise ErroLote(sorted(erros, key=lambda erro: erro['indice']))
+
+    alteradas = [existentes[item['id']] for item in itens]
+    if campos:
+        try:
+            with transaction.atomic():
+                Categoria.objects.bulk_update(alteradas, sorted(campos))
+        except IntegrityError:
+            # O índice único é verificado linha a linha: trocar os nomes
+            # de duas categorias no mesmo lote também cai aqui
+            raise ErroLote([{'indice': None, 'mensagens': [NOME_EM_USO]}])
+        invalidar_resumo(usuario.pk)
+    return [categoria.pk for categoria in alteradas]
+
+
+def excluir_categorias(usuario, ids):
+    """
+    Exclui as categorias do usuário em lote (as assinaturas ficam sem
+    categoria). Retorna a quantidade.
+    """
+    ids = _ids(ids)
+    with transaction.atomic():
+        _, por_modelo = Categoria.objects.filter(
+            usuario=usuario, id__in=ids
+        ).delete()
+    return por_modelo.get(Categoria._meta.label, 0)
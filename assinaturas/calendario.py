@@ -0,0 +1,159 @@
+"""
+Calendário (.ics) das próximas cobranças, para assinar em aplicativos
+de calendário
+
+A versão do calendário é a última alteração das assinaturas do usuário
+(índice usuario, data_atualizacao) ou do próprio feed (exclusões e
+troca do token e da moeda base), junto com o dia atual, que define a
+janela projetada, e a versão das taxas de câmbio. Com ela a view
+responde 304 sem gerar nada, e o corpo gerado fica em cache até a
+versão mudar.
+"""
+import hashlib
+from datetime import date, datetime, time, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.http import quote_etag
+
+from .cambio import moeda_base, taxas_de_cambio
+from .models import Assinatura, FeedCalendario
+from .models.assinatura import simbolo_moeda
+from .projecao import carregar_assinaturas, projetar
+
+
+# Meses projetados no calendário
+CALENDARIO_MESES = 12
+
+# O corpo muda com a versão; o tempo só limita a memória do cache
+CALENDARIO_TIMEOUT = 60 * 60 * 24
+
+# Tamanho máximo de uma linha do iCalendar, em bytes (RFC 5545, 3.1)
+TAMANHO_LINHA = 75
+
+
+def versao(feed, hoje=None):
+    """
+    Retorna (etag, ultima_alteracao) do calendário do feed, com uma
+    consulta ao banco
+    """
+    if hoje is None:
+        hoje = date.today()
+    ultima = Assinatura.objects.filter(usuario_id=feed.usuario_id).aggregate(
+        ultima=Max('data_atualizacao')
+    )['ultima']
+    ultima = max(filter(None, [ultima, feed.data_atualizacao]))
+    _, versao_taxas = taxas_de_cambio()
+
+    assinatura = (
+        f'{feed.usuario_id}:{ultima.isoformat()}:{hoje.isoformat()}:'
+        f'{CALENDARIO_MESES}:{versao_taxas}'
+    )
+    etag = quote_etag(hashlib.md5(assinatura.encode()).hexdigest())
+    # A janela muda na virada do dia, mesmo sem alterações
+    inicio_do_dia = timezone.make_aware(datetime.combine(hoje, time.min))
+    return etag, max(ultima, inicio_do_dia)
+
+
+def registrar_alteracao_feed(usuario_id):
+    """Muda a versão do calendário (ex.: assinatura excluída)"""
+    FeedCalendario.objects.filter(usuario_id=usuario_id).update(
+        data_atualizacao=timezone.now()
+    )
+
+
+def _escapar(texto):
+    """Escapa um valor TEXT do iCalendar"""
+    return (
+        texto.replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+    )
+
+
+def _dobrar(linha):
+    """
+    Quebra a linha em partes de até 75 bytes; as continuações começam
+    com um espaço. Não divide caracteres UTF-8 de mais de um byte.
+    """
+    partes = []
+    atual, tamanho = '', 0
+    for caractere in linha:
+        bytes_caractere = len(caractere.encode())
+        if tamanho + bytes_caractere > TAMANHO_LINHA:
+            partes.append(atual)
+            atual, tamanho = ' ', 1
+        atual += caractere
+        tamanho += bytes_caractere
+    partes.append(atual)
+    return '\r\n'.join(partes)
+
+
+def _valor(valor, simbolo):
+    return f'{simbolo} {valor:.2f}'.replace('.', ',')
+
+
+def gerar_ics(cobrancas, carimbo, nome='MeuBolso - Cobranças', simbolo='R$'):
+    """
+    Texto do calendário com um evento de dia inteiro por cobrança.
+    `carimbo` (DTSTAMP) é a última alteração, para que o mesmo estado
+    gere sempre o mesmo corpo. Os valores estão na moeda de `simbolo`,
+    exceto os das cobranças com 'moeda' (sem taxa para a conversão).
+    """
+    dtstamp = carimbo.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    linhas = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//MeuBolso//Cobrancas//PT-BR',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_escapar(nome)}',
+    ]
+    for cobranca in cobrancas:
+        dia = cobranca['data'].strftime('%Y%m%d')
+        # A categoria fica de fora: editar uma categoria não altera a
+        # data_atualizacao das assinaturas (a versão não mudaria)
+        simbolo_cobranca = simbolo
+        if cobranca.get('moeda'):
+            simbolo_cobranca = simbolo_moeda(cobranca['moeda'])
+        resumo = (
+            f"{cobranca['nome']} - {_valor(cobranca['valor'], simbolo_cobranca)}"
+        )
+        linhas += [
+            'BEGIN:VEVENT',
+            f"UID:{cobranca['assinatura_id']}-{dia}@meubolso",
+            f'DTSTAMP:{dtstamp}',
+            f'DTSTART;VALUE=DATE:{dia}',
+            f'SUMMARY:{_escapar(resumo)}',
+            'TRANSP:TRANSPARENT',
+            'END:VEVENT',
+        ]
+    linhas.append('END:VCALENDAR')
+    return ''.join(_dobrar(linha) + '\r\n' for linha in linhas)
+
+
+def calendario_usuario(feed, etag, ultima_alteracao, hoje=None):
+    """Corpo do calendário do feed, do cache enquanto a versão não muda"""
+    chave = f'calendario:{feed.usuario_id}:{etag}'
+    corpo = cache.get(chave)
+    if corpo is None:
+        if hoje is None:
+            hoje = date.today()
+        moeda = moeda_base(feed.usuario_id)
+        projecao = projetar(
+            carregar_assinaturas(feed.usuario_id, moeda), hoje,
+            CALENDARIO_MESES, detalhar=True,
+        )
+        cobrancas = [
+            cobranca
+            for mes in projecao['meses']
+            for cobranca in mes['cobrancas']
+        ]
+        corpo = gerar_ics(
+            cobrancas, ultima_alteracao, simbolo=simbolo_moeda(moeda)
+        )
+        cache.set(chave, corpo, CALENDARIO_TIMEOUT)
+    return corpo
@@ -0,0 +1,171 @@
+"""
+Conversão de moedas nas consultas de totais
+
+As taxas (TaxaCambio) ficam em memória em cada processo e são relidas
+do banco quando passam CAMBIO_TTL segundos; salvar ou excluir uma taxa
+descarta a cópia do processo atual. A conversão é feita no próprio
+SQL: converter() monta um CASE pela coluna de moeda com o fator de
+cada moeda como literal, usado dentro de Sum(), então os totais saem
+do banco já na moeda base sem consultas extras nem laços em Python.
+Valores em moedas sem taxa viram NULL e ficam fora das somas: quem
+mostra um total informa à parte as moedas que não entraram nele
+(moedas_sem_taxa).
+
+As taxas são carregadas de arquivo (CSV moeda,taxa ou JSON
+{moeda: taxa}) pelo comando carregar_cambio.
+"""
+import csv
+import hashlib
+import json
+import threading
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import models
+from django.db.models import Case, F, Value, When
+
+from .models import Perfil, TaxaCambio
+
+
+# Casas decimais dos fatores de conversão
+CASAS_FATOR = Decimal('0.0000000001')
+
+_trava = threading.Lock()
+_em_memoria = {'taxas': None, 'versao': None, 'expira': 0.0}
+
+
+def _carregar():
+    taxas = {settings.MOEDA_REFERENCIA: Decimal('1')}
+    taxas.update(TaxaCambio.objects.values_list('moeda', 'taxa'))
+    versao = hashlib.md5(
+        repr(sorted(taxas.items())).encode()
+    ).hexdigest()[:12]
+    return taxas, versao
+
+
+def taxas_de_cambio():
+    """
+    Retorna ({moeda: valor em MOEDA_REFERENCIA}, versão). A versão
+    muda quando as taxas mudam (entra nas chaves de cache dos totais).
+    """
+    with _trava:
+        expirada = time.monotonic() >= _em_memoria['expira']
+        if _em_memoria['taxas'] is None or expirada:
+            taxas, versao = _carregar()
+            _em_memoria.update(
+                taxas=taxas,
+                versao=versao,
+                expira=time.monotonic() + settings.CAMBIO_TTL,
+            )
+        return _em_memoria['taxas'], _em_memoria['versao']
+
+
+def invalidar_taxas():
+    """Descarta as taxas em memória deste processo"""
+    with _trava:
+        _em_memoria['taxas'] = None
+
+
+def fator(origem, destino, taxas=None):
+    """Fator de conversão de `origem` para `destino` (None sem taxa)"""
+    if origem == destino:
+        return Decimal('1')
+    if taxas is None:
+        taxas, _ = taxas_de_cambio()
+    if origem not in taxas or destino not in taxas:
+        return None
+    return (taxas[origem] / taxas[destino]).quantize(CASAS_FATOR)
+
+
+def converter(campo, destino, campo_moeda='moeda'):
+    """
+    Expressão SQL com `campo` convertido para a moeda `destino`, a
+    partir da moeda de cada linha em `campo_moeda`. Linhas em moedas
+    sem taxa (ou em qualquer outra moeda, se `destino` não tiver taxa)
+    dão NULL.
+    """
+    taxas, _ = taxas_de_cambio()
+    saida = models.DecimalField(max_digits=20, decimal_places=4)
+    casos = [When(**{campo_moeda: destino}, then=F(campo))]
+    if destino in taxas:
+        casos += [
+            When(
+                **{campo_moeda: moeda},
+                then=F(campo) * Value(
+                    fator(moeda, destino, taxas), output_field=saida
+                ),
+            )
+            for moeda in sorted(taxas) if moeda != destino
+        ]
+    return Case(*casos, default=Value(None), output_field=saida)
+
+
+def moedas_sem_taxa(moedas, destino):
+    """Moedas de `moedas` que não podem ser convertidas para `destino`"""
+    taxas, _ = taxas_de_cambio()
+    return sorted(
+        moeda for moeda in set(moedas) if fator(moeda, destino, taxas) is None
+    )
+
+
+def moeda_base(usuario):
+    """Moeda dos totais do usuário (MOEDA_REFERENCIA sem perfil)"""
+    usuario_id = getattr(usuario, 'pk', usuario)
+    moeda = Perfil.objects.filter(usuario_id=usuario_id).values_list(
+        'moeda_base', flat=True
+    ).first()
+    return moeda or settings.MOEDA_REFERENCIA
+
+
+def moedas_disponiveis():
+    """Moedas com taxa conhecida, para a escolha da moeda base"""
+    taxas, _ = taxas_de_cambio()
+    return sorted(taxas)
+
+
+def ler_taxas(arquivo, formato):
+    """
+    Lê {moeda: taxa} de um arquivo aberto em texto, no `formato` 'csv'
+    (colunas moeda e taxa) ou 'json'. Levanta ValueError se inválido.
+    """
+    if formato == 'json':
+        try:
+            pares = json.load(arquivo).items()
+        except (json.JSONDecodeError, AttributeError):
+            raise ValueError('O JSON deve ser um objeto {"moeda": taxa}.')
+    else:
+        leitor = csv.DictReader(arquivo)
+        if not {'moeda', 'taxa'} <= set(leitor.fieldnames or ()):
+            raise ValueError('O CSV deve ter as colunas moeda e taxa.')
+        pares = ((linha['moeda'], linha['taxa']) for linha in leitor)
+
+    taxas = {}
+    for moeda, taxa in pares:
+        moeda = (moeda or '').strip().upper()
+        try:
+            taxa = Decimal(str(taxa).strip())
+        except InvalidOperation:
+            raise ValueError(f'Taxa inválida para {moeda}: {taxa}.')
+        if len(moeda) != 3 or not moeda.isalpha():
+            raise ValueError(f'Código de moeda inválido: {moeda}.')
+        if not taxa.is_finite() or taxa <= 0:
+            raise ValueError(f'Taxa inválida para {moeda}: {taxa}.')
+        taxas[moeda] = taxa.quantize(Decimal('0.00000001'))
+    return taxas
+
+
+def gravar_taxas(taxas):
+    """
+    Insere ou atualiza as taxas em uma consulta e descarta as taxas
+    em memória. Retorna a quantidade gravada.
+    """
+    TaxaCambio.objects.bulk_create(
+        [TaxaCambio(moeda=moeda, taxa=taxa) for moeda, taxa in taxas.items()],
+        update_conflicts=True,
+        unique_fields=['moeda'],
+        update_fields=['taxa', 'data_atualizacao'],
+    )
+    # bulk_create não envia post_save
+    invalidar_taxas()
+    return len(taxas)
@@ -0,0 +1,97 @@
+"""
+Aritmética de datas dos ciclos de pagamento
+
+Calcula datas de cobrança diretamente por contagem de meses, sem
+percorrer o calendário ciclo a ciclo.
+"""
+from calendar import monthrange
+from datetime import date
+
+
+# Quantidade de meses de cada ciclo de pagamento
+MESES_POR_CICLO = {
+    'MENSAL': 1,
+    'TRIMESTRAL': 3,
+    'SEMESTRAL': 6,
+    'ANUAL': 12,
+}
+
+
+def meses_do_ciclo(ciclo_pagamento):
+    """Retorna o número de meses do ciclo (mensal por padrão)"""
+    return MESES_POR_CICLO.get(ciclo_pagamento, 1)
+
+
+def somar_meses(data_base, meses, dia=None):
+    """
+    Soma `meses` a `data_base` mantendo o dia `dia` (ou o dia da data base).
+    Quando o mês de destino é mais curto, usa o último dia do mês
+    (ex.: dia 31 em fevereiro vira 28/29).
+    """
+    if dia is None:
+        dia = data_base.day
+
+    total = data_base.year * 12 + (data_base.month - 1) + meses
+    ano, mes = divmod(total, 12)
+    mes += 1
+
+    return date(ano, mes, min(dia, monthrange(ano, mes)[1]))
+
+
+def dia_ancora(data_base, dia_vencimento=None):
+    """
+    Define o dia do mês usado nos próximos ciclos.
+
+    O dia de vencimento só é considerado quando a data base é ele mesmo
+    ajustado ao fim do mês (ex.: base 28/02 com vencimento no dia 31);
+    caso contrário vale o dia da própria data base.
+    """
+    if dia_vencimento and dia_vencimento > data_base.day:
+        ultimo_dia = monthrange(data_base.year, data_base.month)[1]
+        if data_base.day == ultimo_dia:
+            return dia_vencimento
+    return data_base.day
+
+
+def proxima_cobranca(data_base, ciclo_pagamento, alvo, dia_vencimento=None):
+    """
+    Retorna a primeira data de cobrança igual ou posterior a `alvo`,
+    partindo de `data_base` e avançando ciclos inteiros.
+
+    O número de ciclos é obtido pela diferença em meses entre as datas,
+    então o custo é constante, independente de quão antiga é a data base.
+    """
+    if data_base >= alvo:
+        return data_base
+
+    meses = meses_do_ciclo(ciclo_pagamento)
+    dia = dia_ancora(data_base, dia_vencimento)
+
+    diferenca = (
+        (alvo.year - data_base.year) * 12 + (alvo.month - data_base.month)
+    )
+    ciclos = max(-(-diferenca // meses), 1)
+
+    proxima_data = somar_meses(data_base, ciclos * meses, dia)
+    if proxima_data < alvo:
+        proxima_data = somar_meses(data_base, (ciclos + 1) * meses, dia)
+
+    return proxima_data
+
+
+def cobrancas_ate(data_base, ciclo_pagamento, alvo, dia_vencimento=None):
+    """
+    Retorna as datas de cobrança de `data_base` (inclusive) até antes
+    de `alvo`, ou seja, as cobranças vencidas que proxima_cobranca pula.
+    """
+    meses = meses_do_ciclo(ciclo_pagamento)
+    dia = dia_ancora(data_base, dia_vencimento)
+
+    datas = []
+    ciclos = 0
+    data = data_base
+    while data < alvo:
+        datas.append(data)
+        ciclos += 1
+        data = somar_meses(data_base, ciclos * meses, dia)
+    return datas
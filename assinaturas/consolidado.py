@@ -0,0 +1,173 @@
+"""
+Gastos consolidados por (usuário, categoria, status, ciclo, moeda)
+
+Cada save/delete de Assinatura aplica em GastoConsolidado a diferença
+entre o estado carregado do banco e o novo estado: no máximo duas
+linhas atualizadas. bulk_create, bulk_update, update(), as exclusões
+por queryset e a exclusão de categorias reconstroem as linhas dos
+usuários afetados (descartando também o resumo do dashboard em cache
+de cada um), e o comando reconstruir_consolidado reconcilia tudo
+periodicamente.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+from .models import Assinatura, GastoConsolidado
+from .resumo import invalidar_resumo
+
+
+CAMPOS_CHAVE = (
+    'usuario_id', 'categoria_id', 'status', 'ciclo_pagamento', 'moeda',
+)
+
+# Usuários reconstruídos por consulta (limite de parâmetros do SQLite)
+USUARIOS_POR_LOTE = 500
+
+# Usuários com reconstrução pendente dentro de reconstrucao_adiada()
+_adiadas = threading.local()
+
+
+def _aplicar(chave, quantidade, valor_mensal, valor_anual):
+    """Soma a diferença na linha da chave, criando-a se preciso"""
+    filtro = dict(zip(CAMPOS_CHAVE, chave))
+    atualizadas = GastoConsolidado.objects.filter(**filtro).update(
+        quantidade=F('quantidade') + quantidade,
+        valor_mensal=F('valor_mensal') + valor_mensal,
+        valor_anual=F('valor_anual') + valor_anual,
+    )
+    if atualizadas or quantidade <= 0:
+        # Sem linha para descontar: fica para a reconstrução
+        return
+
+    try:
+        with transaction.atomic():
+            GastoConsolidado.objects.create(
+                quantidade=quantidade,
+                valor_mensal=valor_mensal,
+                valor_anual=valor_anual,
+                **filtro,
+            )
+    except IntegrityError:
+        # Outra requisição criou a linha entre o UPDATE e o INSERT
+        _aplicar(chave, quantidade, valor_mensal, valor_anual)
+
+
+def registrar_alteracao(assinatura, criada, update_fields=None):
+    """Aplica o save de uma assinatura nos gastos consolidados"""
+    if update_fields is not None and not (
+        {'usuario', 'categoria', 'status', 'ciclo_pagamento', 'valor', 'moeda'}
+        & set(update_fields)
+    ):
+        return
+
+    novo = assinatura.estado_consolidado()
+    anterior = getattr(assinatura, '_estado_consolidado', None)
+    assinatura._estado_consolidado = novo
+
+    if criada:
+        _aplicar(novo[0], 1, novo[1], novo[2])
+    elif anterior is None:
+        # Instância sem estado carregado (ex.: only()): recalcula o dono
+        reconstruir_consolidado([assinatura.usuario_id])
+    elif anterior[0] == novo[0]:
+        if anterior[1:] != novo[1:]:
+            _aplicar(novo[0], 0, novo[1] - anterior[1], novo[2] - anterior[2])
+    else:
+        _aplicar(anterior[0], -1, -anterior[1], -anterior[2])
+        _aplicar(novo[0], 1, novo[1], novo[2])
+
+
+def registrar_exclusao(assinatura):
+    """Desconta uma assinatura excluída dos gastos consolidados"""
+    anterior = getattr(assinatura, '_estado_consolidado', None)
+    if anterior is None:
+        reconstruir_consolidado([assinatura.usuario_id])
+        return
+    _aplicar(anterior[0], -1, -anterior[1], -anterior[2])
+
+
+def calcular_consolidado(assinaturas=None):
+    """GROUP BY das assinaturas nos campos de GastoConsolidado"""
+    if assinaturas is None:
+        assinaturas = Assinatura.objects.all()
+    return assinaturas.order_by().values(*CAMPOS_CHAVE).annotate(
+        quantidade=Count('id'),
+        valor_mensal=Sum('valor_mensal_normalizado'),
+        valor_anual=Sum('valor_anual_normalizado'),
+    )
+
+
+@contextmanager
+def reconstrucao_adiada():
+    """
+    Junta as reconstruções por usuário feitas dentro do bloco (ex.: uma
+    por lote do bulk_update) em uma só, no final
+    """
+    if getattr(_adiadas, 'usuarios', None) is not None:
+        yield
+        return
+    _adiadas.usuarios = set()
+    try:
+        yield
+    finally:
+        usuarios, _adiadas.usuarios = _adiadas.usuarios, None
+    if usuarios:
+        reconstruir_consolidado(usuarios)
+
+
+def reconstruir_consolidado(usuario_ids=None, tamanho_lote=5000):
+    """
+    Recalcula GastoConsolidado a partir das assinaturas: de todos os
+    usuários (None) ou apenas dos usuários informados, e descarta o
+    resumo em cache de cada um. Retorna a quantidade de linhas gravadas.
+    """
+    pendentes = getattr(_adiadas, 'usuarios', None)
+    if pendentes is not None and usuario_ids is not None:
+        pendentes.update(usuario_ids)
+        return 0
+    if usuario_ids is None:
+        gravadas, usuarios = _reconstruir(
+            Assinatura.objects.all(),
+            GastoConsolidado.objects.all(),
+            tamanho_lote,
+        )
+        for usuario_id in usuarios:
+            invalidar_resumo(usuario_id)
+        return gravadas
+
+    usuario_ids = sorted(set(usuario_ids))
+    gravadas = 0
+    for inicio in range(0, len(usuario_ids), USUARIOS_POR_LOTE):
+        lote = usuario_ids[inicio:inicio + USUARIOS_POR_LOTE]
+        gravadas += _reconstruir(
+            Assinatura.objects.filter(usuario_id__in=lote),
+            GastoConsolidado.objects.filter(usuario_id__in=lote),
+            tamanho_lote,
+        )[0]
+    for usuario_id in usuario_ids:
+        invalidar_resumo(usuario_id)
+    return gravadas
+
+
+def _reconstruir(assinaturas, consolidados, tamanho_lote):
+    """(linhas gravadas, usuários com linhas)"""
+    gravadas = 0
+    usuarios = set()
+    with transaction.atomic():
+        consolidados.delete()
+        linhas = []
+        for grupo in calcular_consolidado(assinaturas).iterator(
+            chunk_size=tamanho_lote
+        ):
+            usuarios.add(grupo['usuario_id'])
+            linhas.append(GastoConsolidado(**grupo))
+            if len(linhas) >= tamanho_lote:
+                GastoConsolidado.objects.bulk_create(linhas)
+                gravadas += len(linhas)
+                linhas = []
+        GastoConsolidado.objects.bulk_create(linhas)
+        gravadas += len(linhas)
+    return gravadas, usuarios
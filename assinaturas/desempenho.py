@@ -0,0 +1,128 @@
+"""
+Histograma de desempenho por nome de URL
+
+Alimentado pelo MedicaoDesempenhoMiddleware (ver middleware.py). Cada
+processo acumula as medições em memória e as descarrega no cache
+configurado em DESEMPENHO_CACHE a cada DESEMPENHO_INTERVALO segundos,
+para que o comando `desempenho_views` consiga ler os números de todos
+os processos. A mescla não é atômica: sob concorrência alta algumas
+medições podem se perder, o que é aceitável para estatística.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+# Limites superiores (ms) das faixas do histograma de tempo; a última
+# faixa, acima de 2500 ms, é implícita
+FAIXAS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500)
+
+CHAVE_INDICE = 'desempenho:urls'
+
+_lock = threading.Lock()
+_pendentes = {}
+_ultima_descarga = time.monotonic()
+
+
+def _cache():
+    return caches[getattr(settings, 'DESEMPENHO_CACHE', 'default')]
+
+
+def _chave(nome_url):
+    return f'desempenho:url:{nome_url}'
+
+
+def _entrada_vazia():
+    return {
+        'requisicoes': 0,
+        'tempo_total_ms': 0.0,
+        'tempo_max_ms': 0.0,
+        'tempo_sql_ms': 0.0,
+        'consultas_total': 0,
+        'consultas_max': 0,
+        'faixas': [0] * (len(FAIXAS_MS) + 1),
+    }
+
+
+def _faixa(tempo_ms):
+    for indice, limite in enumerate(FAIXAS_MS):
+        if tempo_ms <= limite:
+            return indice
+    return len(FAIXAS_MS)
+
+
+def _mesclar(destino, origem):
+    destino['requisicoes'] += origem['requisicoes']
+    destino['tempo_total_ms'] += origem['tempo_total_ms']
+    destino['tempo_sql_ms'] += origem['tempo_sql_ms']
+    destino['consultas_total'] += origem['consultas_total']
+    destino['tempo_max_ms'] = max(destino['tempo_max_ms'], origem['tempo_max_ms'])
+    destino['consultas_max'] = max(destino['consultas_max'], origem['consultas_max'])
+    destino['faixas'] = [a + b for a, b in zip(destino['faixas'], origem['faixas'])]
+
+
+def registrar(nome_url, consultas, tempo_sql_ms, tempo_total_ms):
+    """Acumula a medição de uma requisição"""
+    global _ultima_descarga
+
+    with _lock:
+        entrada = _pendentes.setdefault(nome_url, _entrada_vazia())
+        entrada['requisicoes'] += 1
+        entrada['tempo_total_ms'] += tempo_total_ms
+        entrada['tempo_sql_ms'] += tempo_sql_ms
+        entrada['consultas_total'] += consultas
+        entrada['tempo_max_ms'] = max(entrada['tempo_max_ms'], tempo_total_ms)
+        entrada['consultas_max'] = max(entrada['consultas_max'], consultas)
+        entrada['faixas'][_faixa(tempo_total_ms)] += 1
+
+        intervalo = getattr(settings, 'DESEMPENHO_INTERVALO', 10)
+        if time.monotonic() - _ultima_descarga < intervalo:
+            return
+        _ultima_descarga = time.monotonic()
+
+    descarregar()
+
+
+def descarregar():
+    """Mescla as medições pendentes deste processo no cache"""
+    global _pendentes
+
+    with _lock:
+        pendentes, _pendentes = _pendentes, {}
+    if not pendentes:
+        return
+
+    cache = _cache()
+    armazenadas = cache.get_many([_chave(nome) for nome in pendentes])
+    for nome, entrada in pendentes.items():
+        atual = armazenadas.get(_chave(nome), _entrada_vazia())
+        _mesclar(atual, entrada)
+        armazenadas[_chave(nome)] = atual
+    cache.set_many(armazenadas, None)
+
+    indice = cache.get(CHAVE_INDICE, set())
+    if not indice.issuperset(pendentes):
+        cache.set(CHAVE_INDICE, indice | set(pendentes), None)
+
+
+def obter_histograma():
+    """Retorna {nome_url: entrada} com as medições já descarregadas"""
+    cache = _cache()
+    nomes = sorted(cache.get(CHAVE_INDICE, set()))
+    armazenadas = cache.get_many([_chave(nome) for nome in nomes])
+    return {
+        nome: armazenadas[_chave(nome)]
+        for nome in nomes
+        if _chave(nome) in armazenadas
+    }
+
+
+def limpar_histograma():
+    """Remove todas as medições (pendentes e em cache)"""
+    with _lock:
+        _pendentes.clear()
+    cache = _cache()
+    nomes = cache.get(CHAVE_INDICE, set())
+    cache.delete_many([_chave(nome) for nome in nomes] + [CHAVE_INDICE])
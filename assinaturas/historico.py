@@ -0,0 +1,171 @@
+"""
+Histórico de cobranças: registro em lote, consultas por período e
+arquivamento mensal
+
+As cobranças recentes ficam linha a linha em Cobranca, com índice
+(usuario, data); os meses antigos são resumidos em CobrancaMensal, uma
+linha por usuário, mês e moeda. As consultas somam as duas tabelas, então
+o custo depende do período pedido e não do tamanho do histórico.
+Meses arquivados entram inteiros quando se sobrepõem ao período. Os
+totais saem separados por moeda.
+
+O arquivamento é definitivo: sem as linhas detalhadas, a unicidade por
+assinatura e data não evita mais repetições, então as cobranças
+registradas de novo num mês já arquivado do usuário ficam fora das
+consultas e são descartadas no próximo arquivamento.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+from .ciclos import cobrancas_ate, somar_meses
+from .models import Cobranca, CobrancaMensal
+
+
+def inicio_do_mes(data):
+    """Primeiro dia do mês de `data`"""
+    return data.replace(day=1)
+
+
+def cobrancas_vencidas(assinatura, hoje):
+    """Cobranças de data_proxima_cobranca até antes de `hoje`"""
+    return [
+        Cobranca(
+            usuario_id=assinatura.usuario_id,
+            assinatura_id=assinatura.pk,
+            data=data,
+            valor=assinatura.valor,
+            moeda=assinatura.moeda,
+        )
+        for data in cobrancas_ate(
+            assinatura.data_proxima_cobranca,
+            assinatura.ciclo_pagamento,
+            hoje,
+            assinatura.dia_vencimento,
+        )
+    ]
+
+
+def registrar_cobrancas(cobrancas, tamanho_lote=5000):
+    """
+    Insere as cobranças em lote; as já registradas (mesma assinatura e
+    data) são ignoradas
+    """
+    Cobranca.objects.bulk_create(
+        cobrancas, batch_size=tamanho_lote, ignore_conflicts=True
+    )
+
+
+def _periodo(usuario, inicio, fim):
+    """
+    (cobranças detalhadas, meses arquivados) do período; as detalhadas
+    têm o mês anotado e excluem os meses já arquivados
+    """
+    arquivadas = CobrancaMensal.objects.filter(
+        usuario=usuario, mes__gte=inicio_do_mes(inicio), mes__lte=fim
+    ).order_by()
+    detalhadas = Cobranca.objects.filter(
+        usuario=usuario, data__gte=inicio, data__lte=fim
+    ).annotate(mes=TruncMonth('data')).exclude(
+        mes__in=arquivadas.values('mes')
+    ).order_by()
+    return detalhadas, arquivadas
+
+
+def _somar(totais, moeda, valor):
+    totais[moeda] = totais.get(moeda, Decimal('0')) + valor
+
+
+def gasto_no_periodo(usuario, inicio, fim):
+    """
+    Total cobrado do usuário entre `inicio` e `fim` (inclusive), por
+    moeda: {moeda: total}. Moedas diferentes não são somadas entre si.
+    """
+    detalhadas, arquivadas = _periodo(usuario, inicio, fim)
+    totais = {}
+    for grupo in (
+        list(detalhadas.values('moeda').annotate(total=Sum('valor')))
+        + list(arquivadas.values('moeda').annotate(total=Sum('total')))
+    ):
+        _somar(totais, grupo['moeda'], grupo['total'])
+    return totais
+
+
+def gasto_por_mes(usuario, inicio, fim):
+    """
+    Lista [{mes, quantidade, totais: {moeda: total}}] de todos os meses
+    do período, em ordem, com os meses sem cobrança zerados ({})
+    """
+    detalhadas, arquivadas = _periodo(usuario, inicio, fim)
+    meses = {}
+    grupos = list(
+        detalhadas.values('mes', 'moeda').annotate(
+            quantidade=Count('id'), total=Sum('valor')
+        )
+    ) + list(
+        arquivadas.values('mes', 'moeda').annotate(
+            quantidade=Sum('quantidade'), total=Sum('total')
+        )
+    )
+    for grupo in grupos:
+        mes = meses.setdefault(grupo['mes'], {'quantidade': 0, 'totais': {}})
+        mes['quantidade'] += grupo['quantidade']
+        _somar(mes['totais'], grupo['moeda'], grupo['total'])
+
+    resultado = []
+    mes = inicio_do_mes(inicio)
+    while mes <= fim:
+        resultado.append(
+            {'mes': mes, **meses.get(mes, {'quantidade': 0, 'totais': {}})}
+        )
+        mes = somar_meses(mes, 1)
+    return resultado
+
+
+def arquivar_mes(mes, tamanho_lote=5000):
+    """
+    Resume as cobranças de um mês em CobrancaMensal e remove as linhas
+    detalhadas. Usuários com o mês já arquivado são pulados (as linhas
+    deles são só removidas), então repetir o mês não soma nada.
+    Retorna a quantidade de cobranças arquivadas.
+    """
+    proximo = somar_meses(mes, 1)
+    cobrancas = Cobranca.objects.filter(data__gte=mes, data__lt=proximo)
+
+    with transaction.atomic():
+        ja_arquivados = CobrancaMensal.objects.filter(mes=mes).values(
+            'usuario_id'
+        )
+        grupos = (
+            cobrancas.exclude(usuario_id__in=ja_arquivados)
+            .order_by().values('usuario_id', 'moeda')
+            .annotate(quantidade=Count('id'), total=Sum('valor'))
+        )
+        novas, arquivadas = [], 0
+        for grupo in grupos.iterator(chunk_size=tamanho_lote):
+            arquivadas += grupo['quantidade']
+            novas.append(CobrancaMensal(mes=mes, **grupo))
+
+        CobrancaMensal.objects.bulk_create(novas, batch_size=tamanho_lote)
+        cobrancas.delete()
+    return arquivadas
+
+
+def arquivar_cobrancas(antes_de, tamanho_lote=5000):
+    """
+    Arquiva, mês a mês, as cobranças anteriores ao mês de `antes_de`.
+    Retorna [(mês, cobranças arquivadas)].
+    """
+    limite = inicio_do_mes(antes_de)
+    primeira = Cobranca.objects.filter(data__lt=limite).order_by('data').first()
+    if primeira is None:
+        return []
+
+    resultado = []
+    mes = inicio_do_mes(primeira.data)
+    while mes < limite:
+        resultado.append((mes, arquivar_mes(mes, tamanho_lote)))
+        mes = somar_meses(mes, 1)
+    return resultado
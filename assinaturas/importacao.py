@@ -0,0 +1,210 @@
+"""
+Importação em lote de assinaturas a partir de CSV
+
+O arquivo é lido linha a linha; cada linha passa pelas mesmas regras do
+formulário de criação (campos obrigatórios, valor com vírgula, data,
+categoria do próprio usuário) e pelas validações dos campos do modelo.
+As válidas são gravadas com bulk_create em lotes e as inválidas entram
+no relatório com o número da linha. O cabeçalho aceita as colunas da
+exportação (colunas desconhecidas são ignoradas).
+"""
+import csv
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from itertools import chain
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .models import Assinatura
+
+
+CAMPOS_OBRIGATORIOS = (
+    'nome', 'valor', 'ciclo_pagamento', 'data_primeira_cobranca',
+)
+
+# Além de ISO (formulário e exportação), o formato das planilhas brasileiras
+FORMATO_DATA_BR = '%d/%m/%Y'
+
+# Campos conferidos com os validators do modelo (tamanho, mínimo, dígitos)
+CAMPOS_VALIDADOS = ('nome', 'valor', 'moeda')
+
+# Opções aceitas (mesmas do select do formulário)
+CICLOS = dict(Assinatura.CICLO_CHOICES)
+STATUS = dict(Assinatura.STATUS_CHOICES)
+
+# Linhas com erro guardadas no relatório (as demais são só contadas)
+MAXIMO_ERROS = 1000
+
+TAMANHO_LOTE = 5000
+
+
+def _valor(texto):
+    """
+    '1.234,56', '1234,56' ou '1234.56' -> Decimal. NaN e infinito
+    levantam InvalidOperation, como um texto qualquer.
+    """
+    if ',' in texto:
+        texto = texto.replace('.', '').replace(',', '.')
+    valor = Decimal(texto)
+    if not valor.is_finite():
+        raise InvalidOperation
+    return valor
+
+
+def _data(texto):
+    if '/' in texto:
+        return datetime.strptime(texto, FORMATO_DATA_BR).date()
+    return date.fromisoformat(texto)
+
+
+def validar_linha(linha, categorias):
+    """
+    Valida uma linha do CSV (dict coluna -> texto). `categorias` mapeia
+    o nome em minúsculas para o id. Retorna (dados, erros).
+    """
+    # O DictReader guarda os campos além do cabeçalho em uma lista na
+    # chave None
+    excedentes = [valor for valor in linha.get(None) or () if valor.strip()]
+    linha = {
+        coluna: (valor or '').strip()
+        for coluna, valor in linha.items() if coluna is not None
+    }
+    erros = [
+        f'Campo obrigatório: {campo}.'
+        for campo in CAMPOS_OBRIGATORIOS if not linha.get(campo)
+    ]
+    if excedentes:
+        erros.append(f'Colunas a mais: {len(excedentes)} além do cabeçalho.')
+    if erros:
+        return None, erros
+
+    dados = {
+        'nome': linha['nome'],
+        'descricao': linha.get('descricao', ''),
+        'observacoes': linha.get('observacoes', ''),
+        'moeda': (linha.get('moeda') or 'BRL').upper(),
+        'ciclo_pagamento': linha['ciclo_pagamento'].upper(),
+        'status': (linha.get('status') or 'ATIVA').upper(),
+        'categoria_id': None,
+    }
+
+    try:
+        dados['valor'] = _valor(linha['valor'])
+    except InvalidOperation:
+        erros.append(f'Valor inválido: {linha["valor"]}.')
+
+    try:
+        dados['data_primeira_cobranca'] = _data(linha['data_primeira_cobranca'])
+    except ValueError:
+        erros.append(
+            f'Data inválida: {linha["data_primeira_cobranca"]} '
+            '(use AAAA-MM-DD ou DD/MM/AAAA).'
+        )
+
+    categoria = linha.get('categoria')
+    if categoria:
+        dados['categoria_id'] = categorias.get(categoria.lower())
+        if dados['categoria_id'] is None:
+            erros.append(f'Categoria inválida: {categoria}.')
+
+    if dados['ciclo_pagamento'] not in CICLOS:
+        erros.append(f'Ciclo de pagamento inválido: {linha["ciclo_pagamento"]}.')
+    if dados['status'] not in STATUS:
+        erros.append(f'Status inválido: {linha["status"]}.')
+    if not (len(dados['moeda']) == 3 and dados['moeda'].isalpha()):
+        erros.append(f'Moeda inválida: {linha["moeda"]}.')
+
+    for campo in CAMPOS_VALIDADOS:
+        if campo not in dados:
+            continue
+        try:
+            Assinatura._meta.get_field(campo).run_validators(dados[campo])
+        except ValidationError as erro:
+            erros.extend(f'{campo}: {mensagem}' for mensagem in erro.messages)
+        except InvalidOperation:
+            erros.append(f'{campo}: valor inválido.')
+
+    return (None if erros else dados), erros
+
+
+def _detectar_delimitador(cabecalho):
+    """Planilhas em português costumam exportar com ';'"""
+    return ';' if cabecalho.count(';') > cabecalho.count(',') else ','
+
+
+def importar_csv(usuario, arquivo, tamanho_lote=TAMANHO_LOTE, simular=False,
+                 progresso=None, ao_gravar=None):
+    """
+    Importa as assinaturas do arquivo de texto `arquivo` para o usuário.
+    Retorna {'importadas', 'total_erros', 'erros': [(linha, mensagens)]}.
+    Levanta ValueError se faltar alguma coluna obrigatória no cabeçalho.
+
+    `ao_gravar(progresso)` é chamada dentro da transação de cada lote
+    com o relatório até ali e a 'posicao' (registros do CSV já lidos);
+    se ela levantar, o lote é desfeito. Passar o último `progresso`
+    gravado retoma a importação depois dessa posição.
+    """
+    cabecalho = arquivo.readline()
+    leitor = csv.DictReader(
+        chain([cabecalho], arquivo),
+        delimiter=_detectar_delimitador(cabecalho),
+    )
+    leitor.fieldnames = [
+        coluna.strip().lower() for coluna in (leitor.fieldnames or [])
+    ]
+    ausentes = [c for c in CAMPOS_OBRIGATORIOS if c not in leitor.fieldnames]
+    if ausentes:
+        raise ValueError(f'Colunas obrigatórias ausentes: {", ".join(ausentes)}.')
+
+    # Uma consulta para todas as categorias do usuário
+    categorias = {
+        nome.lower(): categoria_id
+        for categoria_id, nome in usuario.categorias.values_list('id', 'nome')
+    }
+
+    relatorio = {'importadas': 0, 'total_erros': 0, 'erros': []}
+    inicio = 0
+    if progresso:
+        inicio = progresso['posicao']
+        relatorio = {
+            'importadas': progresso['importadas'],
+            'total_erros': progresso['total_erros'],
+            'erros': [tuple(erro) for erro in progresso['erros']],
+        }
+    lote = []
+    posicao = inicio
+
+    def gravar():
+        relatorio['importadas'] += len(lote)
+        if not simular:
+            with transaction.atomic():
+                Assinatura.objects.bulk_create(lote)
+                if ao_gravar is not None:
+                    ao_gravar({**relatorio, 'posicao': posicao})
+        lote.clear()
+
+    for posicao, linha in enumerate(leitor, 1):
+        if posicao <= inicio:
+            # Já gravada antes da interrupção
+            continue
+        dados, erros = validar_linha(linha, categorias)
+        if erros:
+            relatorio['total_erros'] += 1
+            if len(relatorio['erros']) < MAXIMO_ERROS:
+                relatorio['erros'].append((leitor.line_num, erros))
+            continue
+
+        assinatura = Assinatura(usuario_id=usuario.pk, **dados)
+        # O que save() preencheria (bulk_create não chama save)
+        assinatura.dia_vencimento = assinatura.data_primeira_cobranca.day
+        assinatura.data_proxima_cobranca = assinatura.calcular_proxima_cobranca(
+            assinatura.data_primeira_cobranca
+        )
+        lote.append(assinatura)
+        if len(lote) >= tamanho_lote:
+            gravar()
+
+    if lote:
+        gravar()
+    return relatorio
@@ -0,0 +1,175 @@
+"""
+Lembretes por email das cobranças dos próximos dias
+
+As assinaturas ativas com data_proxima_cobranca na janela (hoje até
+hoje + antecedência) são percorridas em lotes de usuários, paginados
+por usuario_id: cada lote busca só as cobranças desses usuários (índice
+usuario, data_proxima_cobranca), então a memória depende do tamanho do
+lote e não do total de cobranças. Cada usuário recebe um único email
+com todas as suas cobranças da janela, pela conexão de email informada
+(EMAIL_BACKEND por padrão: SMTP em produção, locmem nos testes).
+
+As cobranças avisadas ficam em LembreteCobranca, gravadas logo depois
+do envio de cada email (um INSERT por usuário): uma execução
+interrompida no meio do lote reenvia no máximo o email em andamento.
+Reexecuções e os dias seguintes da janela não avisam de novo a mesma
+cobrança.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage
+
+from .models import Assinatura, LembreteCobranca
+
+
+logger = logging.getLogger('assinaturas.lembretes')
+
+# Dias de antecedência do aviso
+ANTECEDENCIA_DIAS = 3
+
+# Usuários por lote
+TAMANHO_LOTE = 500
+
+CAMPOS_LEMBRETE = (
+    'id',
+    'usuario_id',
+    'usuario__username',
+    'usuario__first_name',
+    'usuario__email',
+    'nome',
+    'valor',
+    'moeda',
+    'data_proxima_cobranca',
+)
+
+
+def cobrancas_na_janela(hoje, dias=ANTECEDENCIA_DIAS):
+    """Assinaturas ativas com cobrança de `hoje` até `hoje + dias`"""
+    return Assinatura.objects.ativas().filter(
+        data_proxima_cobranca__gte=hoje,
+        data_proxima_cobranca__lte=hoje + timedelta(days=dias),
+    )
+
+
+def _valor(valor, moeda):
+    texto = f'{valor:,.2f}'.replace(',', '_').replace('.', ',').replace('_', '.')
+    return f'R$ {texto}' if moeda == 'BRL' else f'{moeda} {texto}'
+
+
+def montar_email(cobrancas):
+    """Email com as cobranças (dicionários de CAMPOS_LEMBRETE) de um usuário"""
+    primeira = cobrancas[0]
+    nome = primeira['usuario__first_name'] or primeira['usuario__username']
+    quantidade = len(cobrancas)
+    assunto = (
+        'Meu Bolso: 1 cobrança nos próximos dias' if quantidade == 1
+        else f'Meu Bolso: {quantidade} cobranças nos próximos dias'
+    )
+    linhas = [f'Olá, {nome}!', '', 'Estas assinaturas serão cobradas em breve:', '']
+    linhas += [
+        f"- {c['data_proxima_cobranca']:%d/%m/%Y}: {c['nome']} "
+        f"({_valor(c['valor'], c['moeda'])})"
+        for c in cobrancas
+    ]
+    linhas += ['', 'Meu Bolso']
+    return EmailMessage(
+        assunto,
+        '\n'.join(linhas),
+        settings.DEFAULT_FROM_EMAIL,
+        [primeira['usuario__email']],
+    )
+
+
+def _cobrancas_por_usuario(pendentes, janela, usuarios):
+    """{usuario_id: [cobranças ainda não avisadas]} dos usuários do lote"""
+    inicio, fim = janela
+    avisadas = set(
+        LembreteCobranca.objects.filter(
+            usuario_id__in=usuarios,
+            data_cobranca__gte=inicio,
+            data_cobranca__lte=fim,
+        ).values_list('assinatura_id', 'data_cobranca')
+    )
+    por_usuario = {}
+    cobrancas = pendentes.filter(usuario_id__in=usuarios).order_by(
+        'usuario_id', 'data_proxima_cobranca', 'nome'
+    ).values(*CAMPOS_LEMBRETE)
+    for cobranca in cobrancas:
+        if (cobranca['id'], cobranca['data_proxima_cobranca']) not in avisadas:
+            por_usuario.setdefault(cobranca['usuario_id'], []).append(cobranca)
+    return por_usuario
+
+
+def enviar_lembretes(hoje, conexao, dias=ANTECEDENCIA_DIAS,
+                     tamanho_lote=TAMANHO_LOTE, simular=False):
+    """
+    Envia os lembretes da janela, lote a lote. Gera, para cada lote,
+    {'usuarios', 'emails', 'cobrancas', 'sem_email', 'falhas'}.
+    Com `simular=True` nada é enviado nem gravado.
+    """
+    janela = (hoje, hoje + timedelta(days=dias))
+    pendentes = cobrancas_na_janela(hoje, dias)
+    ultimo = None
+
+    while True:
+        # Próximos usuários com cobrança na janela (paginação por id)
+        usuarios = pendentes.order_by('usuario_id')
+        if ultimo is not None:
+            usuarios = usuarios.filter(usuario_id__gt=ultimo)
+        usuarios = list(
+            usuarios.values_list('usuario_id', flat=True).distinct()[:tamanho_lote]
+        )
+        if not usuarios:
+            break
+        ultimo = usuarios[-1]
+
+        resultado = {
+            'usuarios': len(usuarios),
+            'emails': 0,
+            'cobrancas': 0,
+            'sem_email': 0,
+            'falhas': 0,
+        }
+        por_usuario = _cobrancas_por_usuario(pendentes, janela, usuarios)
+        for usuario_id, cobrancas in por_usuario.items():
+            if not cobrancas[0]['usuario__email']:
+                resultado['sem_email'] += 1
+                continue
+            if not simular:
+                try:
+                    conexao.send_messages([montar_email(cobrancas)])
+                except Exception:
+                    # Sem registro: o usuário entra de novo na próxima execução
+                    logger.exception(
+                        'Falha ao enviar lembrete ao usuário %s', usuario_id
+                    )
+                    resultado['falhas'] += 1
+                    continue
+                LembreteCobranca.objects.bulk_create(
+                    [
+                        LembreteCobranca(
+                            usuario_id=usuario_id,
+                            assinatura_id=c['id'],
+                            data_cobranca=c['data_proxima_cobranca'],
+                        )
+                        for c in cobrancas
+                    ],
+                    ignore_conflicts=True,
+                )
+            resultado['emails'] += 1
+            resultado['cobrancas'] += len(cobrancas)
+
+        yield resultado
+
+
+def limpar_lembretes(hoje):
+    """
+    Remove os registros de cobranças que já passaram (a janela só olha
+    para frente). Retorna a quantidade removida.
+    """
+    removidos, _ = LembreteCobranca.objects.filter(
+        data_cobranca__lt=hoje
+    ).delete()
+    return removidos
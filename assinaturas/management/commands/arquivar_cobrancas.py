@@ -0,0 +1,51 @@
+"""
+Resume em totais mensais as cobranças antigas do histórico
+
+Uso: python manage.py arquivar_cobrancas [--meses N] [--batch-size N]
+"""
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from assinaturas.ciclos import somar_meses
+from assinaturas.historico import arquivar_cobrancas, inicio_do_mes
+
+
+class Command(BaseCommand):
+    help = (
+        'Move as cobranças anteriores aos últimos N meses para '
+        'CobrancaMensal (uma linha por usuário, mês e moeda)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--meses',
+            type=int,
+            default=24,
+            help='Meses mantidos linha a linha, além do atual (padrão: 24)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Linhas gravadas por INSERT (padrão: 5000)',
+        )
+
+    def handle(self, *args, **options):
+        if options['meses'] < 0 or options['batch_size'] < 1:
+            raise CommandError('Valores numéricos inválidos.')
+
+        limite = somar_meses(inicio_do_mes(date.today()), -options['meses'])
+        inicio = time.monotonic()
+        arquivados = arquivar_cobrancas(limite, options['batch_size'])
+
+        for mes, quantidade in arquivados:
+            if quantidade:
+                self.stdout.write(f'{mes:%m/%Y}: {quantidade} cobranças')
+
+        total = sum(quantidade for _, quantidade in arquivados)
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} cobranças anteriores a {limite:%m/%Y} arquivadas '
+            f'({time.monotonic() - inicio:.2f}s).'
+        ))
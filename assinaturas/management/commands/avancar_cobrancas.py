@@ -0,0 +1,120 @@
+"""
+Avança em massa a próxima cobrança das assinaturas vencidas e registra
+as cobranças puladas no histórico (Cobranca)
+
+Uso: python manage.py avancar_cobrancas [--dry-run] [--batch-size N]
+"""
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from assinaturas.historico import cobrancas_vencidas, registrar_cobrancas
+from assinaturas.models import Assinatura
+
+
+class Command(BaseCommand):
+    help = (
+        'Avança data_proxima_cobranca de todas as assinaturas ativas '
+        'vencidas, em lotes com bulk_update, registrando as cobranças'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Apenas calcula e informa, sem gravar no banco',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Quantidade de assinaturas por lote (padrão: 1000)',
+        )
+        parser.add_argument(
+            '--data',
+            help='Data de referência no formato AAAA-MM-DD (padrão: hoje)',
+        )
+
+    def handle(self, *args, **options):
+        tamanho_lote = options['batch_size']
+        if tamanho_lote < 1:
+            raise CommandError('--batch-size deve ser maior que zero.')
+
+        hoje = date.today()
+        if options['data']:
+            try:
+                hoje = date.fromisoformat(options['data'])
+            except ValueError:
+                raise CommandError('--data deve estar no formato AAAA-MM-DD.')
+
+        simular = options['dry_run']
+        vencidas = Assinatura.objects.ativas().filter(
+            data_proxima_cobranca__lt=hoje
+        ).only(
+            'id',
+            'usuario_id',
+            'ciclo_pagamento',
+            'data_primeira_cobranca',
+            'data_proxima_cobranca',
+            'dia_vencimento',
+            'valor',
+            'moeda',
+        ).order_by('data_proxima_cobranca', 'id')
+
+        inicio = time.monotonic()
+        total = 0
+        total_cobrancas = 0
+        lotes = 0
+        ultimo = None
+
+        while True:
+            # Paginação por (data_proxima_cobranca, id): funciona tanto
+            # gravando (as linhas saem do filtro) quanto em --dry-run
+            lote = vencidas
+            if ultimo is not None:
+                lote = lote.filter(
+                    Q(data_proxima_cobranca__gt=ultimo[0])
+                    | Q(data_proxima_cobranca=ultimo[0], id__gt=ultimo[1])
+                )
+            lote = list(lote[:tamanho_lote])
+            if not lote:
+                break
+
+            ultimo = (lote[-1].data_proxima_cobranca, lote[-1].id)
+            agora = timezone.now()
+            cobrancas = []
+            for assinatura in lote:
+                cobrancas += cobrancas_vencidas(assinatura, hoje)
+                assinatura.data_proxima_cobranca = (
+                    assinatura.calcular_proxima_cobranca(hoje=hoje)
+                )
+                assinatura.data_atualizacao = agora
+
+            if not simular:
+                with transaction.atomic():
+                    registrar_cobrancas(cobrancas)
+                    Assinatura.objects.bulk_update(
+                        lote,
+                        ['data_proxima_cobranca', 'data_atualizacao'],
+                    )
+
+            total += len(lote)
+            total_cobrancas += len(cobrancas)
+            lotes += 1
+            decorrido = time.monotonic() - inicio
+            self.stdout.write(
+                f'Lote {lotes}: {len(lote)} assinaturas '
+                f'({total} no total, {total / max(decorrido, 1e-6):,.0f}/s)'
+            )
+
+        decorrido = time.monotonic() - inicio
+        acao = 'seriam avançadas' if simular else 'avançadas'
+        registro = 'seriam registradas' if simular else 'registradas'
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} assinaturas {acao} em {lotes} lote(s), '
+            f'{total_cobrancas} cobranças {registro} ({decorrido:.2f}s).'
+        ))
@@ -0,0 +1,129 @@
+"""
+Executa os benchmarks de benchmarks/ e compara com uma execução anterior
+
+Uso: python manage.py benchmark [--tamanhos 10,1000] [--saida atual.json]
+         [--comparar base.json --limite 10]
+"""
+import json
+import platform
+from datetime import datetime
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from benchmarks import modelos, paginas
+from benchmarks.medicao import comparar
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede os cálculos de Assinatura e cada URL do projeto em vários '
+        'volumes de dados; grava JSON e sinaliza regressões'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--apenas', choices=['micro', 'urls'],
+            help='Executa só os micro-benchmarks ou só as URLs',
+        )
+        parser.add_argument(
+            '--tamanhos', default='10,1000',
+            help='Assinaturas por usuário nas URLs (padrão: 10,1000)',
+        )
+        parser.add_argument(
+            '--repeticoes', type=int, default=5,
+            help='Repetições de cada medição (padrão: 5)',
+        )
+        parser.add_argument(
+            '--numero', type=int, default=100,
+            help='Chamadas por repetição nos micro-benchmarks (padrão: 100)',
+        )
+        parser.add_argument(
+            '--saida',
+            help='Arquivo JSON onde gravar os resultados',
+        )
+        parser.add_argument(
+            '--comparar',
+            help='JSON de uma execução anterior para comparação',
+        )
+        parser.add_argument(
+            '--limite', type=float, default=10.0,
+            help='Variação (%%) acima da qual um benchmark é lento (padrão: 10)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            tamanhos = [int(t) for t in options['tamanhos'].split(',')]
+        except ValueError:
+            raise CommandError('--tamanhos deve ser uma lista de inteiros.')
+        repeticoes = options['repeticoes']
+        if repeticoes < 1 or options['numero'] < 1 or min(tamanhos) < 0:
+            raise CommandError('Valores numéricos inválidos.')
+
+        base = None
+        if options['comparar']:
+            try:
+                with open(options['comparar'], encoding='utf-8') as arquivo:
+                    base = json.load(arquivo)['resultados']
+            except (OSError, ValueError, KeyError) as erro:
+                raise CommandError(f'Não foi possível ler --comparar: {erro}')
+
+        resultados = {}
+        if options['apenas'] != 'urls':
+            resultados.update(modelos.executar(options['numero'], repeticoes))
+        if options['apenas'] != 'micro':
+            resultados.update(paginas.executar(tamanhos, repeticoes))
+
+        self.exibir_resultados(resultados)
+
+        if options['saida']:
+            execucao = {
+                'data': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'banco': connection.vendor,
+                'tamanhos': tamanhos,
+                'resultados': resultados,
+            }
+            with open(options['saida'], 'w', encoding='utf-8') as arquivo:
+                json.dump(execucao, arquivo, indent=2)
+            self.stdout.write(f'Resultados gravados em {options["saida"]}.')
+
+        if base is not None:
+            lentos = self.exibir_comparacao(
+                comparar(base, resultados, options['limite'])
+            )
+            if lentos:
+                raise CommandError(
+                    f'{lentos} benchmark(s) mais de {options["limite"]:g}% '
+                    'mais lentos que a execução de base.'
+                )
+
+    def exibir_resultados(self, resultados):
+        self.stdout.write(
+            f'{"benchmark":<42} {"mediana µs":>12} {"mín µs":>12} {"queries":>8}'
+        )
+        for nome, resultado in resultados.items():
+            self.stdout.write(
+                f'{nome:<42} {resultado["mediana_us"]:>12.1f} '
+                f'{resultado["min_us"]:>12.1f} '
+                f'{resultado.get("consultas", ""):>8}'
+            )
+
+    def exibir_comparacao(self, comparacao):
+        """Exibe a comparação e retorna quantos benchmarks ficaram lentos"""
+        self.stdout.write('')
+        self.stdout.write(
+            f'{"benchmark":<42} {"base µs":>12} {"atual µs":>12} {"var.":>8}'
+        )
+        lentos = 0
+        for nome, antes, depois, variacao, lento in comparacao:
+            linha = (
+                f'{nome:<42} {antes:>12.1f} {depois:>12.1f} {variacao:>+7.1f}%'
+            )
+            if lento:
+                lentos += 1
+                linha = self.style.ERROR(linha + '  LENTO')
+            self.stdout.write(linha)
+        return lentos
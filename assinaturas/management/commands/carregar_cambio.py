@@ -0,0 +1,47 @@
+"""
+Carrega as taxas de câmbio de um arquivo CSV ou JSON
+
+Uso: python manage.py carregar_cambio ARQUIVO [--formato csv|json]
+
+Cada taxa é quanto vale uma unidade da moeda em MOEDA_REFERENCIA:
+CSV com as colunas moeda,taxa ou JSON {"USD": "5.10", ...}.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from assinaturas.cambio import gravar_taxas, ler_taxas
+
+
+class Command(BaseCommand):
+    help = (
+        'Insere ou atualiza as taxas de câmbio (valor de 1 unidade em '
+        'MOEDA_REFERENCIA) a partir de um arquivo CSV ou JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help='Caminho do arquivo (UTF-8)')
+        parser.add_argument(
+            '--formato',
+            choices=['csv', 'json'],
+            help='Formato do arquivo (padrão: pela extensão)',
+        )
+
+    def handle(self, *args, **options):
+        arquivo = options['arquivo']
+        formato = options['formato'] or (
+            'json' if arquivo.lower().endswith('.json') else 'csv'
+        )
+        try:
+            with open(arquivo, encoding='utf-8-sig', newline='') as texto:
+                taxas = ler_taxas(texto, formato)
+        except (OSError, UnicodeDecodeError, ValueError) as erro:
+            raise CommandError(str(erro))
+        if not taxas:
+            raise CommandError('Nenhuma taxa encontrada no arquivo.')
+
+        # A moeda de referência vale 1 por definição
+        taxas.pop(settings.MOEDA_REFERENCIA, None)
+        gravadas = gravar_taxas(taxas)
+        self.stdout.write(self.style.SUCCESS(
+            f'{gravadas} taxa(s) de câmbio carregada(s).'
+        ))
@@ -0,0 +1,73 @@
+"""
+Exibe o histograma de desempenho por nome de URL
+
+Uso: python manage.py desempenho_views [--json] [--limpar]
+"""
+import json
+
+from django.core.management.base import BaseCommand
+
+from assinaturas.desempenho import (
+    FAIXAS_MS, descarregar, limpar_histograma, obter_histograma,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Mostra consultas e tempo por URL coletados pelo '
+        'MedicaoDesempenhoMiddleware (DESEMPENHO_ATIVO = True)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--json', action='store_true',
+            help='Saída em JSON',
+        )
+        parser.add_argument(
+            '--limpar', action='store_true',
+            help='Zera o histograma depois de exibir',
+        )
+
+    def handle(self, *args, **options):
+        descarregar()
+        histograma = obter_histograma()
+
+        if options['json']:
+            self.stdout.write(json.dumps({
+                'faixas_ms': list(FAIXAS_MS),
+                'urls': histograma,
+            }, indent=2))
+        elif not histograma:
+            self.stdout.write('Nenhuma medição registrada.')
+        else:
+            self.exibir_tabela(histograma)
+
+        if options['limpar']:
+            limpar_histograma()
+            self.stdout.write(self.style.SUCCESS('Histograma zerado.'))
+
+    def exibir_tabela(self, histograma):
+        rotulos = [f'<={limite}' for limite in FAIXAS_MS] + [f'>{FAIXAS_MS[-1]}']
+        self.stdout.write(
+            f'{"URL":<24} {"req":>6} {"ms méd":>8} {"ms máx":>8} '
+            f'{"SQL méd":>8} {"cons méd":>8} {"cons máx":>8}  faixas (ms)'
+        )
+        # Mais custosas primeiro (tempo total acumulado)
+        ordenadas = sorted(
+            histograma.items(), key=lambda item: -item[1]['tempo_total_ms']
+        )
+        for nome, entrada in ordenadas:
+            n = entrada['requisicoes']
+            faixas = ' '.join(
+                f'{rotulo}:{quantidade}'
+                for rotulo, quantidade in zip(rotulos, entrada['faixas'])
+                if quantidade
+            )
+            self.stdout.write(
+                f'{nome:<24} {n:>6} '
+                f'{entrada["tempo_total_ms"] / n:>8.1f} '
+                f'{entrada["tempo_max_ms"]:>8.1f} '
+                f'{entrada["tempo_sql_ms"] / n:>8.1f} '
+                f'{entrada["consultas_total"] / n:>8.1f} '
+                f'{entrada["consultas_max"]:>8}  {faixas}'
+            )
@@ -0,0 +1,104 @@
+"""
+Envia um email por usuário com as cobranças dos próximos dias
+
+Uso: python manage.py enviar_lembretes [--dias N] [--dry-run]
+     [--batch-size N] [--backend caminho.do.EmailBackend]
+
+Feito para rodar uma vez por dia (cron); reexecuções no mesmo dia não
+reenviam os lembretes já enviados.
+"""
+import time
+from datetime import date
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand, CommandError
+
+from assinaturas.lembretes import (
+    ANTECEDENCIA_DIAS,
+    TAMANHO_LOTE,
+    enviar_lembretes,
+    limpar_lembretes,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Envia a cada usuário um resumo das cobranças dos próximos dias, '
+        'em lotes de usuários, sem repetir lembretes já enviados'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias',
+            type=int,
+            default=ANTECEDENCIA_DIAS,
+            help=f'Dias de antecedência (padrão: {ANTECEDENCIA_DIAS})',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Apenas calcula e informa, sem enviar nem gravar',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=TAMANHO_LOTE,
+            help=f'Usuários por lote (padrão: {TAMANHO_LOTE})',
+        )
+        parser.add_argument(
+            '--backend',
+            help='Backend de email (padrão: EMAIL_BACKEND das configurações)',
+        )
+        parser.add_argument(
+            '--data',
+            help='Data de referência no formato AAAA-MM-DD (padrão: hoje)',
+        )
+
+    def handle(self, *args, **options):
+        if options['dias'] < 0 or options['batch_size'] < 1:
+            raise CommandError('Valores numéricos inválidos.')
+
+        hoje = date.today()
+        if options['data']:
+            try:
+                hoje = date.fromisoformat(options['data'])
+            except ValueError:
+                raise CommandError('--data deve estar no formato AAAA-MM-DD.')
+
+        simular = options['dry_run']
+        if not simular:
+            removidos = limpar_lembretes(hoje)
+            if removidos:
+                self.stdout.write(f'{removidos} registros de lembretes antigos removidos')
+
+        inicio = time.monotonic()
+        totais = {'emails': 0, 'cobrancas': 0, 'sem_email': 0, 'falhas': 0}
+        lotes = 0
+        # Uma conexão (SMTP) para todos os envios
+        with get_connection(options['backend']) as conexao:
+            for resultado in enviar_lembretes(
+                hoje,
+                conexao,
+                dias=options['dias'],
+                tamanho_lote=options['batch_size'],
+                simular=simular,
+            ):
+                lotes += 1
+                for chave in totais:
+                    totais[chave] += resultado[chave]
+                self.stdout.write(
+                    f"Lote {lotes}: {resultado['usuarios']} usuários, "
+                    f"{resultado['emails']} emails"
+                )
+
+        acao = 'seriam enviados' if simular else 'enviados'
+        self.stdout.write(self.style.SUCCESS(
+            f"{totais['emails']} lembretes {acao} "
+            f"({totais['cobrancas']} cobranças) em {lotes} lote(s); "
+            f"{totais['sem_email']} usuários sem email "
+            f'({time.monotonic() - inicio:.2f}s).'
+        ))
+        if totais['falhas']:
+            self.stderr.write(
+                f"{totais['falhas']} envios falharam e serão tentados na próxima execução."
+            )
@@ -0,0 +1,199 @@
+"""
+Gera uma massa de dados sintética para testes de carga e escala
+
+Uso: python manage.py gerar_dados_carga --usuarios 100000 \\
+         --assinaturas-por-usuario 20 --seed 42
+"""
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from assinaturas.ciclos import MESES_POR_CICLO, proxima_cobranca
+from assinaturas.models import Assinatura, Categoria
+from assinaturas.signals import CATEGORIAS_PADRAO
+
+
+# Serviços usados como base: (nome, categoria, valor mensal de referência)
+SERVICOS = [
+    ('Netflix', 'Streaming', Decimal('44.90')),
+    ('Spotify', 'Streaming', Decimal('21.90')),
+    ('Amazon Prime', 'Streaming', Decimal('14.90')),
+    ('YouTube Premium', 'Streaming', Decimal('20.90')),
+    ('Disney+', 'Streaming', Decimal('33.90')),
+    ('Xbox Game Pass', 'Entretenimento', Decimal('45.00')),
+    ('PlayStation Plus', 'Entretenimento', Decimal('39.90')),
+    ('Kindle Unlimited', 'Lazer', Decimal('19.90')),
+    ('GitHub Pro', 'Produtividade', Decimal('4.00')),
+    ('ChatGPT Plus', 'Produtividade', Decimal('20.00')),
+    ('Adobe Creative Cloud', 'Produtividade', Decimal('254.00')),
+    ('Microsoft 365', 'Produtividade', Decimal('36.00')),
+    ('Duolingo Plus', 'Educação', Decimal('34.90')),
+    ('Alura', 'Educação', Decimal('85.00')),
+    ('Strava Premium', 'Saúde', Decimal('24.99')),
+    ('Academia', 'Saúde', Decimal('99.90')),
+    ('iFood Benefícios', 'Delivery', Decimal('19.90')),
+    ('Rappi Prime', 'Delivery', Decimal('19.90')),
+    ('Clube O Globo', 'Restaurante', Decimal('29.90')),
+    ('Seguro Celular', 'Assinatura', Decimal('29.90')),
+]
+
+# Distribuições aproximadas de ciclos e status (valores, pesos)
+CICLOS = (
+    ['MENSAL', 'ANUAL', 'TRIMESTRAL', 'SEMESTRAL'],
+    [70, 15, 8, 7],
+)
+STATUS = (
+    ['ATIVA', 'PAUSADA', 'CANCELADA'],
+    [80, 8, 12],
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera usuários, categorias e assinaturas sintéticas com '
+        'bulk_create em lotes (reprodutível via --seed)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--usuarios', type=int, default=1000,
+            help='Quantidade de usuários a gerar (padrão: 1000)',
+        )
+        parser.add_argument(
+            '--assinaturas-por-usuario', type=int, default=20,
+            help='Média de assinaturas por usuário (padrão: 20)',
+        )
+        parser.add_argument(
+            '--seed', type=int, default=42,
+            help='Semente do gerador aleatório (padrão: 42)',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Usuários por lote/transação (padrão: 1000)',
+        )
+        parser.add_argument(
+            '--prefixo', default='carga',
+            help='Prefixo dos usernames gerados (padrão: carga)',
+        )
+        parser.add_argument(
+            '--limpar', action='store_true',
+            help='Remove os usuários com o prefixo antes de gerar',
+        )
+
+    def handle(self, *args, **options):
+        total_usuarios = options['usuarios']
+        media = options['assinaturas_por_usuario']
+        tamanho_lote = options['batch_size']
+        prefixo = options['prefixo']
+
+        if total_usuarios < 0 or media < 0 or tamanho_lote < 1:
+            raise CommandError('Valores numéricos inválidos.')
+
+        if options['limpar']:
+            removidos, _ = User.objects.filter(
+                username__startswith=f'{prefixo}_'
+            ).delete()
+            self.stdout.write(f'{removidos} registros removidos.')
+
+        rng = random.Random(options['seed'])
+        # Mesmo hash para todos: gerar um hash por usuário levaria horas
+        senha = make_password('senha123')
+        hoje = date.today()
+
+        inicio = time.monotonic()
+        total_assinaturas = 0
+
+        for primeiro in range(0, total_usuarios, tamanho_lote):
+            ultimo = min(primeiro + tamanho_lote, total_usuarios)
+            with transaction.atomic():
+                total_assinaturas += self.gerar_lote(
+                    rng, range(primeiro, ultimo), prefixo, senha, media, hoje
+                )
+
+            decorrido = time.monotonic() - inicio
+            self.stdout.write(
+                f'{ultimo}/{total_usuarios} usuários, '
+                f'{total_assinaturas} assinaturas '
+                f'({total_assinaturas / max(decorrido, 1e-6):,.0f} assinaturas/s)'
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Gerados {total_usuarios} usuários e {total_assinaturas} '
+            f'assinaturas em {time.monotonic() - inicio:.1f}s.'
+        ))
+
+    def gerar_lote(self, rng, indices, prefixo, senha, media, hoje):
+        """Gera um lote de usuários com categorias e assinaturas"""
+        # bulk_create não dispara signals: categorias padrão criadas aqui
+        usuarios = User.objects.bulk_create([
+            User(
+                username=f'{prefixo}_{i:07d}',
+                email=f'{prefixo}_{i:07d}@example.com',
+                password=senha,
+            )
+            for i in indices
+        ])
+
+        categorias = Categoria.objects.bulk_create([
+            Categoria(usuario=usuario, **categoria_data)
+            for usuario in usuarios
+            for categoria_data in CATEGORIAS_PADRAO
+        ])
+        categorias_por_usuario = {}
+        for categoria in categorias:
+            categorias_por_usuario.setdefault(
+                categoria.usuario_id, {}
+            )[categoria.nome] = categoria
+
+        assinaturas = []
+        for usuario in usuarios:
+            categorias_usuario = categorias_por_usuario[usuario.pk]
+            # Cauda longa: a maioria tem poucas, alguns têm centenas
+            quantidade = 0
+            if media:
+                quantidade = min(int(rng.expovariate(1 / media)), media * 20)
+            for _ in range(quantidade):
+                assinaturas.append(self.gerar_assinatura(
+                    rng, usuario, categorias_usuario, hoje
+                ))
+
+        Assinatura.objects.bulk_create(assinaturas, batch_size=5000)
+        return len(assinaturas)
+
+    def gerar_assinatura(self, rng, usuario, categorias, hoje):
+        """Monta uma assinatura com ciclo, status, valor e datas aleatórios"""
+        nome, categoria, valor_mensal = rng.choice(SERVICOS)
+        ciclo = rng.choices(*CICLOS)[0]
+        status = rng.choices(*STATUS)[0]
+
+        meses = MESES_POR_CICLO[ciclo]
+        # Planos mais longos costumam ter desconto
+        desconto = Decimal('1') if meses == 1 else Decimal('0.85')
+        variacao = Decimal(rng.randint(80, 120)) / 100
+        valor = (valor_mensal * meses * desconto * variacao).quantize(
+            Decimal('0.01')
+        )
+
+        primeira = hoje - timedelta(days=rng.randint(0, 5 * 365))
+        proxima = proxima_cobranca(primeira, ciclo, hoje)
+        if status != 'ATIVA' and rng.random() < 0.5:
+            # Pausadas/canceladas costumam ter a data parada no passado
+            proxima = primeira
+
+        return Assinatura(
+            usuario=usuario,
+            categoria=categorias.get(categoria),
+            nome=nome,
+            valor=valor,
+            ciclo_pagamento=ciclo,
+            data_primeira_cobranca=primeira,
+            data_proxima_cobranca=proxima,
+            dia_vencimento=primeira.day,
+            status=status,
+        )
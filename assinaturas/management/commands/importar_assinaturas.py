@@ -0,0 +1,68 @@
+"""
+Importa assinaturas de um arquivo CSV para um usuário
+
+Uso: python manage.py importar_assinaturas USUARIO ARQUIVO.csv [--dry-run]
+"""
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from assinaturas.importacao import TAMANHO_LOTE, importar_csv
+
+
+class Command(BaseCommand):
+    help = (
+        'Valida e importa assinaturas de um CSV (colunas nome, valor, '
+        'ciclo_pagamento, data_primeira_cobranca e opcionais) com bulk_create'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('usuario', help='Nome de usuário (username)')
+        parser.add_argument('arquivo', help='Caminho do arquivo CSV (UTF-8)')
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Apenas valida e informa os erros, sem gravar',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=TAMANHO_LOTE,
+            help=f'Assinaturas por lote (padrão: {TAMANHO_LOTE})',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size deve ser maior que zero.')
+        try:
+            usuario = User.objects.get(username=options['usuario'])
+        except User.DoesNotExist:
+            raise CommandError(f'Usuário "{options["usuario"]}" não encontrado.')
+
+        inicio = time.monotonic()
+        try:
+            with open(
+                options['arquivo'], encoding='utf-8-sig', newline=''
+            ) as arquivo:
+                relatorio = importar_csv(
+                    usuario,
+                    arquivo,
+                    tamanho_lote=options['batch_size'],
+                    simular=options['dry_run'],
+                )
+        except (OSError, UnicodeDecodeError, ValueError) as erro:
+            raise CommandError(str(erro))
+
+        for linha, mensagens in relatorio['erros']:
+            self.stdout.write(f'Linha {linha}: {" ".join(mensagens)}')
+        omitidos = relatorio['total_erros'] - len(relatorio['erros'])
+        if omitidos:
+            self.stdout.write(f'... e mais {omitidos} linha(s) com erro.')
+
+        acao = 'seriam importadas' if options['dry_run'] else 'importadas'
+        self.stdout.write(self.style.SUCCESS(
+            f'{relatorio["importadas"]} assinaturas {acao}, '
+            f'{relatorio["total_erros"]} linha(s) com erro '
+            f'({time.monotonic() - inicio:.2f}s).'
+        ))
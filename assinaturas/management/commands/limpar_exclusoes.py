@@ -0,0 +1,35 @@
+"""
+Apaga as exclusões antigas guardadas para a sincronização da API
+
+Uso: python manage.py limpar_exclusoes [--dias N]
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from assinaturas.sincronizacao import limpar_exclusoes
+
+
+class Command(BaseCommand):
+    help = (
+        'Apaga as exclusões com mais de N dias; tokens de sincronização '
+        'mais antigos que isso passam a ser recusados'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias',
+            type=int,
+            default=settings.SINCRONIZACAO_RETENCAO,
+            help=(
+                'Dias mantidos (padrão: SINCRONIZACAO_RETENCAO, '
+                f'{settings.SINCRONIZACAO_RETENCAO})'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if options['dias'] < 1:
+            raise CommandError('Valores numéricos inválidos.')
+        removidas = limpar_exclusoes(options['dias'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{removidas} exclusões com mais de {options["dias"]} dias apagadas.'
+        ))
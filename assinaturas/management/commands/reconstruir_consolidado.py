@@ -0,0 +1,69 @@
+"""
+Reconcilia a tabela de gastos consolidados com as assinaturas
+
+Uso: python manage.py reconstruir_consolidado [--usuario ID ...] [--verificar]
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from assinaturas.consolidado import calcular_consolidado, reconstruir_consolidado
+from assinaturas.models import Assinatura, GastoConsolidado
+
+
+CAMPOS = (
+    'usuario_id', 'categoria_id', 'status', 'ciclo_pagamento', 'moeda',
+    'quantidade', 'valor_mensal', 'valor_anual',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara GastoConsolidado com um GROUP BY das assinaturas e '
+        'reconstrói as linhas (corrige divergências de update() e afins)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--usuario', type=int, action='append', dest='usuarios',
+            help='Apenas este usuário (pode ser repetido)',
+        )
+        parser.add_argument(
+            '--verificar', action='store_true',
+            help='Só informa divergências; falha se houver alguma',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Linhas gravadas por INSERT (padrão: 5000)',
+        )
+
+    def handle(self, *args, **options):
+        usuarios = options['usuarios']
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size deve ser positivo.')
+
+        divergentes = self.contar_divergencias(usuarios)
+        self.stdout.write(f'{divergentes} linha(s) divergente(s).')
+
+        if options['verificar']:
+            if divergentes:
+                raise CommandError('Gastos consolidados desatualizados.')
+            return
+
+        gravadas = reconstruir_consolidado(usuarios, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{gravadas} linha(s) de gastos consolidados gravada(s).'
+        ))
+
+    def contar_divergencias(self, usuarios):
+        """Linhas presentes em apenas um dos lados ou com valores diferentes"""
+        assinaturas = Assinatura.objects.all()
+        consolidados = GastoConsolidado.objects.filter(quantidade__gt=0)
+        if usuarios:
+            assinaturas = assinaturas.filter(usuario_id__in=usuarios)
+            consolidados = consolidados.filter(usuario_id__in=usuarios)
+
+        esperado = {
+            tuple(grupo[campo] for campo in CAMPOS)
+            for grupo in calcular_consolidado(assinaturas).iterator()
+        }
+        atual = set(consolidados.values_list(*CAMPOS).iterator())
+        return len(esperado ^ atual)
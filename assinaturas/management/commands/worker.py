@@ -0,0 +1,124 @@
+"""
+Executa as tarefas em segundo plano da fila (Tarefa)
+
+Uso: python manage.py worker [--concorrencia N] [--processos]
+     [--intervalo S] [--uma-vez]
+
+Cada trabalhador (thread ou processo) reserva e executa uma tarefa por
+vez; SIGINT/SIGTERM encerram depois das tarefas em andamento.
+"""
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from assinaturas.tarefas import liberar_abandonadas, processar_fila
+
+
+def _trabalhar(nome, parar, intervalo, uma_vez):
+    try:
+        processar_fila(nome, parar, intervalo, uma_vez)
+    finally:
+        # Cada thread/processo tem a própria conexão com o banco
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        'Processa a fila de tarefas em segundo plano com N trabalhadores '
+        '(threads ou processos)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concorrencia',
+            type=int,
+            default=1,
+            help='Quantidade de trabalhadores (padrão: 1)',
+        )
+        parser.add_argument(
+            '--processos',
+            action='store_true',
+            help='Usa processos em vez de threads (tarefas com muita CPU)',
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=1.0,
+            help='Segundos entre consultas com a fila vazia (padrão: 1)',
+        )
+        parser.add_argument(
+            '--uma-vez',
+            action='store_true',
+            help='Processa as tarefas disponíveis e encerra',
+        )
+
+    def handle(self, *args, **options):
+        concorrencia = options['concorrencia']
+        if concorrencia < 1 or options['intervalo'] <= 0:
+            raise CommandError('Valores numéricos inválidos.')
+
+        liberadas = liberar_abandonadas()
+        if liberadas:
+            self.stdout.write(f'{liberadas} tarefas abandonadas liberadas')
+
+        prefixo = f'{socket.gethostname()}:{os.getpid()}'
+        argumentos = (options['intervalo'], options['uma_vez'])
+
+        if concorrencia == 1:
+            parar = threading.Event()
+            self._ao_encerrar(parar, options['uma_vez'])
+            executadas = processar_fila(prefixo, parar, *argumentos)
+            self.stdout.write(self.style.SUCCESS(
+                f'{executadas} tarefas executadas.'
+            ))
+            return
+
+        if options['processos']:
+            # fork: os filhos herdam o Django configurado; as conexões
+            # abertas são fechadas antes para não serem compartilhadas
+            contexto = multiprocessing.get_context('fork')
+            connections.close_all()
+            parar = contexto.Event()
+            trabalhadores = [
+                contexto.Process(
+                    target=_trabalhar,
+                    args=(f'{prefixo}/{i}', parar, *argumentos),
+                )
+                for i in range(concorrencia)
+            ]
+        else:
+            parar = threading.Event()
+            trabalhadores = [
+                threading.Thread(
+                    target=_trabalhar,
+                    args=(f'{prefixo}/{i}', parar, *argumentos),
+                )
+                for i in range(concorrencia)
+            ]
+
+        self._ao_encerrar(parar, options['uma_vez'])
+        for trabalhador in trabalhadores:
+            trabalhador.start()
+        self.stdout.write(
+            f'{concorrencia} trabalhadores iniciados '
+            f"({'processos' if options['processos'] else 'threads'})."
+        )
+        for trabalhador in trabalhadores:
+            trabalhador.join()
+        self.stdout.write(self.style.SUCCESS('Trabalhadores encerrados.'))
+
+    def _ao_encerrar(self, parar, uma_vez):
+        """SIGINT/SIGTERM: termina as tarefas em andamento e sai"""
+        if uma_vez:
+            # Execução finita: mantém o comportamento padrão dos sinais
+            return
+
+        def encerrar(numero, quadro):
+            parar.set()
+        signal.signal(signal.SIGINT, encerrar)
+        signal.signal(signal.SIGTERM, encerrar)
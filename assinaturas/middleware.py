@@ -0,0 +1,65 @@
+"""
+Middleware de medição de consultas SQL e tempo por requisição
+
+Ativado com DESEMPENHO_ATIVO = True em settings.py. Para cada
+requisição registra a quantidade de consultas, o tempo gasto em SQL e
+o tempo total da view, devolve os números no cabeçalho Server-Timing
+e alimenta o histograma por nome de URL (ver desempenho.py).
+Requisições acima dos limites são registradas no log com o SQL.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from . import desempenho
+
+
+logger = logging.getLogger('assinaturas.desempenho')
+
+
+class MedicaoDesempenhoMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, 'DESEMPENHO_ATIVO', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.limite_consultas = getattr(settings, 'DESEMPENHO_LIMITE_CONSULTAS', 20)
+        self.limite_ms = getattr(settings, 'DESEMPENHO_LIMITE_MS', 500)
+
+    def __call__(self, request):
+        consultas = []
+
+        def medir_consulta(execute, sql, params, many, context):
+            inicio = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                consultas.append((sql, (time.perf_counter() - inicio) * 1000))
+
+        inicio = time.perf_counter()
+        with connection.execute_wrapper(medir_consulta):
+            response = self.get_response(request)
+        tempo_total_ms = (time.perf_counter() - inicio) * 1000
+        tempo_sql_ms = sum(duracao for _, duracao in consultas)
+
+        response['Server-Timing'] = (
+            f'db;dur={tempo_sql_ms:.1f};desc="{len(consultas)} consultas", '
+            f'view;dur={tempo_total_ms:.1f}'
+        )
+
+        match = request.resolver_match
+        nome_url = match.view_name if match else '<sem rota>'
+        desempenho.registrar(nome_url, len(consultas), tempo_sql_ms, tempo_total_ms)
+
+        if len(consultas) > self.limite_consultas or tempo_total_ms > self.limite_ms:
+            logger.warning(
+                'Requisição lenta %s %s (%s): %d consultas, %.1f ms '
+                '(SQL %.1f ms)\n%s',
+                request.method, request.path, nome_url, len(consultas),
+                tempo_total_ms, tempo_sql_ms,
+                '\n'.join(f'  [{duracao:.1f} ms] {sql}' for sql, duracao in consultas),
+            )
+
+        return response
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assinaturas', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assinatura',
+            index=models.Index(fields=['usuario', 'data_criacao', 'id'], name='assinaturas_usuario_e50b60_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assinatura',
+            index=models.Index(fields=['usuario', 'nome', 'id'], name='assinaturas_usuario_9d44b1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assinatura',
+            index=models.Index(fields=['usuario', 'valor', 'id'], name='assinaturas_usuario_6deac3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assinatura',
+            index=models.Index(fields=['usuario', 'data_proxima_cobranca', 'id'], name='assinaturas_usuario_2a8707_idx'),
+        ),
+    ]
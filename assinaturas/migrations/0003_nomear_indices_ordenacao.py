@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:44
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assinaturas', '0002_indices_paginacao_listagem'),
+    ]
+
+    operations = [
+        migrations.RenameIndex(
+            model_name='assinatura',
+            new_name='assinatura_usr_criacao_idx',
+            old_name='assinaturas_usuario_e50b60_idx',
+        ),
+        migrations.RenameIndex(
+            model_name='assinatura',
+            new_name='assinatura_usr_nome_idx',
+            old_name='assinaturas_usuario_9d44b1_idx',
+        ),
+        migrations.RenameIndex(
+            model_name='assinatura',
+            new_name='assinatura_usr_valor_idx',
+            old_name='assinaturas_usuario_6deac3_idx',
+        ),
+        migrations.RenameIndex(
+            model_name='assinatura',
+            new_name='assinatura_usr_proxima_idx',
+            old_name='assinaturas_usuario_2a8707_idx',
+        ),
+    ]
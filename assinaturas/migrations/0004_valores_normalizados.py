@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:46
+
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assinaturas', '0003_nomear_indices_ordenacao'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assinatura',
+            name='valor_anual_normalizado',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), editable=False, max_digits=14, verbose_name='Valor Anual Normalizado'),
+        ),
+        migrations.AddField(
+            model_name='assinatura',
+            name='valor_mensal_normalizado',
+            field=models.DecimalField(decimal_places=4, default=Decimal('0'), editable=False, max_digits=14, verbose_name='Valor Mensal Normalizado'),
+        ),
+        migrations.AddIndex(
+            model_name='assinatura',
+            index=models.Index(fields=['usuario', 'valor_mensal_normalizado'], name='assinatura_usr_mensal_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assinatura',
+            index=models.Index(fields=['status', 'valor_mensal_normalizado'], name='assinatura_status_mensal_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Cast
+
+
+MESES_POR_CICLO = {
+    'MENSAL': 1,
+    'TRIMESTRAL': 3,
+    'SEMESTRAL': 6,
+    'ANUAL': 12,
+}
+
+
+def preencher_valores_normalizados(apps, schema_editor):
+    """Calcula os valores normalizados das assinaturas existentes"""
+    Assinatura = apps.get_model('assinaturas', 'Assinatura')
+
+    def atualizar(queryset, meses):
+        queryset.update(
+            valor_anual_normalizado=F('valor') * (12 // meses),
+            valor_mensal_normalizado=(
+                Cast(F('valor'), models.FloatField()) / meses
+            ),
+        )
+
+    for ciclo, meses in MESES_POR_CICLO.items():
+        atualizar(Assinatura.objects.filter(ciclo_pagamento=ciclo), meses)
+
+    # Ciclos desconhecidos são tratados como mensais (igual ao model)
+    atualizar(
+        Assinatura.objects.exclude(ciclo_pagamento__in=MESES_POR_CICLO),
+        1,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assinaturas', '0004_valores_normalizados'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            preencher_valores_normalizados,
+            migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assinaturas', '0005_preencher_valores_normalizados'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GastoConsolidado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('ATIVA', 'Ativa'), ('PAUSADA', 'Pausada'), ('CANCELADA', 'Cancelada')], max_length=20, verbose_name='Status')),
+                ('ciclo_pagamento', models.CharField(choices=[('MENSAL', 'Mensal'), ('TRIMESTRAL', 'Trimestral'), ('SEMESTRAL', 'Semestral'), ('ANUAL', 'Anual')], max_length=20, verbose_name='Ciclo de Pagamento')),
+                ('quantidade', models.IntegerField(default=0, verbose_name='Quantidade de Assinaturas')),
+                ('valor_mensal', models.DecimalField(decimal_places=4, default=0, max_digits=16, verbose_name='Valor Mensal')),
+                ('valor_anual', models.DecimalField(decimal_places=2, default=0, max_digits=16, verbose_name='Valor Anual')),
+                ('categoria', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='gastos_consolidados', to='assinaturas.categoria', verbose_name='Categoria')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='gastos_consolidados', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Gasto Consolidado',
+                'verbose_name_plural': 'Gastos Consolidados',
+                'ordering': ['usuario', 'status', 'ciclo_pagamento'],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('categoria__isnull', False)), fields=('usuario', 'categoria', 'status', 'ciclo_pagamento'), name='gasto_consolidado_unico'), models.UniqueConstraint(condition=models.Q(('categoria__isnull', True)), fields=('usuario', 'status', 'ciclo_pagamento'), name='gasto_consolidado_sem_cat_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations
+from django.db.models import Count, Sum
+
+
+def preencher_gastos_consolidados(apps, schema_editor):
+    """Agrupa as assinaturas existentes em GastoConsolidado"""
+    Assinatura = apps.get_model('assinaturas', 'Assinatura')
+    GastoConsolidado = apps.get_model('assinaturas', 'GastoConsolidado')
+
+    grupos = Assinatura.objects.order_by().values(
+        'usuario_id', 'categoria_id', 'status', 'ciclo_pagamento'
+    ).annotate(
+        quantidade=Count('id'),
+        valor_mensal=Sum('valor_mensal_normalizado'),
+        valor_anual=Sum('valor_anual_normalizado'),
+    )
+    GastoConsolidado.objects.bulk_create(
+        (GastoConsolidado(**grupo) for grupo in grupos.iterator()),
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assinaturas', '0006_gastos_consolidados'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            preencher_gastos_consolidados,
+            migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assinaturas', '0007_preencher_gastos_consolidados'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Cobranca',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField(verbose_name='Data da Cobrança')),
+                ('valor', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Valor')),
+                ('moeda', models.CharField(default='BRL', max_length=3, verbose_name='Moeda')),
+                ('assinatura', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='cobrancas', to='assinaturas.assinatura', verbose_name='Assinatura')),
+                ('usuario', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='cobrancas', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Cobrança',
+                'verbose_name_plural': 'Cobranças',
+                'ordering': ['-data'],
+                'indexes': [models.Index(fields=['usuario', 'data'], name='cobranca_usr_data_idx'), models.Index(fields=['data'], name='cobranca_data_idx')],
+                'constraints': [models.UniqueConstraint(fields=('assinatura', 'data'), name='cobranca_unica')],
+            },
+        ),
+        migrations.CreateModel(
+            name='CobrancaMensal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(verbose_name='Mês (primeiro dia)')),
+                ('moeda', models.CharField(default='BRL', max_length=3, verbose_name='Moeda')),
+                ('quantidade', models.IntegerField(default=0, verbose_name='Quantidade de Cobranças')),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Total')),
+                ('usuario', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='cobrancas_mensais', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Cobrança Mensal Arquivada',
+                'verbose_name_plural': 'Cobranças Mensais Arquivadas',
+                'ordering': ['-mes'],
+                'constraints': [models.UniqueConstraint(fields=('usuario', 'mes', 'moeda'), name='cobranca_mensal_unica')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:26
+
+import assinaturas.models.feed_calendario
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assinaturas', '0008_historico_cobrancas'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedCalendario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(default=assinaturas.models.feed_calendario.gerar_token, max_length=64, unique=True, verbose_name='Token')),
+                ('data_atualizacao', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Data de Atualização')),
+            ],
+            options={
+                'verbose_name': 'Calendário de Cobranças',
+                'verbose_name_plural': 'Calendários de Cobranças',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='assinatura',
+            index=models.Index(fields=['usuario', 'data_atualizacao'], name='assinatura_usr_atualizacao_idx'),
+        ),
+        migrations.AddField(
+            model_name='feedcalendario',
+            name='usuario',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='feed_calendario', to=settings.AUTH_USER_MODEL, verbose_name='Usuário'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assinaturas', '0009_calendario_cobrancas'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LembreteCobranca',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data_cobranca', models.DateField(verbose_name='Data da Cobrança')),
+                ('data_envio', models.DateTimeField(auto_now_add=True, verbose_name='Data de Envio')),
+                ('assinatura', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='lembretes', to='assinaturas.assinatura', verbose_name='Assinatura')),
+                ('usuario', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='lembretes_cobranca', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Lembrete de Cobrança',
+                'verbose_name_plural': 'Lembretes de Cobrança',
+                'indexes': [models.Index(fields=['usuario', 'data_cobranca'], name='lembrete_usr_data_idx')],
+                'constraints': [models.UniqueConstraint(fields=('assinatura', 'data_cobranca'), name='lembrete_unico')],
+            },
+        ),
+    ]
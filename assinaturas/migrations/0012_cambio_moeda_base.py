@@ -0,0 +1,68 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:39
+
+import assinaturas.models.cambio
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assinaturas', '0011_tarefas'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Perfil',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('moeda_base', models.CharField(default=assinaturas.models.cambio.moeda_referencia, max_length=3, verbose_name='Moeda Base')),
+            ],
+            options={
+                'verbose_name': 'Perfil',
+                'verbose_name_plural': 'Perfis',
+            },
+        ),
+        migrations.CreateModel(
+            name='TaxaCambio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('moeda', models.CharField(max_length=3, unique=True, verbose_name='Moeda')),
+                ('taxa', models.DecimalField(decimal_places=8, max_digits=18, verbose_name='Taxa')),
+                ('data_atualizacao', models.DateTimeField(auto_now=True, verbose_name='Data de Atualização')),
+            ],
+            options={
+                'verbose_name': 'Taxa de Câmbio',
+                'verbose_name_plural': 'Taxas de Câmbio',
+                'ordering': ['moeda'],
+            },
+        ),
+        migrations.RemoveConstraint(
+            model_name='gastoconsolidado',
+            name='gasto_consolidado_unico',
+        ),
+        migrations.RemoveConstraint(
+            model_name='gastoconsolidado',
+            name='gasto_consolidado_sem_cat_unico',
+        ),
+        migrations.AddField(
+            model_name='gastoconsolidado',
+            name='moeda',
+            field=models.CharField(default='BRL', max_length=3, verbose_name='Moeda'),
+        ),
+        migrations.AddConstraint(
+            model_name='gastoconsolidado',
+            constraint=models.UniqueConstraint(condition=models.Q(('categoria__isnull', False)), fields=('usuario', 'categoria', 'status', 'ciclo_pagamento', 'moeda'), name='gasto_consolidado_unico'),
+        ),
+        migrations.AddConstraint(
+            model_name='gastoconsolidado',
+            constraint=models.UniqueConstraint(condition=models.Q(('categoria__isnull', True)), fields=('usuario', 'status', 'ciclo_pagamento', 'moeda'), name='gasto_consolidado_sem_cat_unico'),
+        ),
+        migrations.AddField(
+            model_name='perfil',
+            name='usuario',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='perfil', to=settings.AUTH_USER_MODEL, verbose_name='Usuário'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+from django.db import migrations
+from django.db.models import Count, Sum
+
+
+def reagrupar_gastos_por_moeda(apps, schema_editor):
+    """
+    Refaz GastoConsolidado separando as moedas: as linhas existentes
+    somavam valores de moedas diferentes e ficaram todas como BRL
+    """
+    Assinatura = apps.get_model('assinaturas', 'Assinatura')
+    GastoConsolidado = apps.get_model('assinaturas', 'GastoConsolidado')
+
+    GastoConsolidado.objects.all().delete()
+    grupos = Assinatura.objects.order_by().values(
+        'usuario_id', 'categoria_id', 'status', 'ciclo_pagamento', 'moeda'
+    ).annotate(
+        quantidade=Count('id'),
+        valor_mensal=Sum('valor_mensal_normalizado'),
+        valor_anual=Sum('valor_anual_normalizado'),
+    )
+    GastoConsolidado.objects.bulk_create(
+        (GastoConsolidado(**grupo) for grupo in grupos.iterator()),
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assinaturas', '0012_cambio_moeda_base'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            reagrupar_gastos_por_moeda,
+            migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:53
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assinaturas', '0013_reagrupar_gastos_por_moeda'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Exclusao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(choices=[('assinatura', 'Assinatura'), ('categoria', 'Categoria')], max_length=20, verbose_name='Modelo')),
+                ('objeto_id', models.BigIntegerField(verbose_name='Id do Registro')),
+                ('data_exclusao', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Data de Exclusão')),
+            ],
+            options={
+                'verbose_name': 'Exclusão',
+                'verbose_name_plural': 'Exclusões',
+            },
+        ),
+        migrations.AddField(
+            model_name='categoria',
+            name='data_atualizacao',
+            field=models.DateTimeField(auto_now=True, verbose_name='Data de Atualização'),
+        ),
+        migrations.AddIndex(
+            model_name='categoria',
+            index=models.Index(fields=['usuario', 'data_atualizacao', 'id'], name='categoria_usr_atualizacao_idx'),
+        ),
+        migrations.AddField(
+            model_name='exclusao',
+            name='usuario',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exclusoes', to=settings.AUTH_USER_MODEL, verbose_name='Usuário'),
+        ),
+        migrations.AddIndex(
+            model_name='exclusao',
+            index=models.Index(fields=['usuario', 'modelo', 'data_exclusao', 'id'], name='exclusao_usr_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exclusao',
+            index=models.Index(fields=['data_exclusao'], name='assinaturas_data_ex_8ac12e_idx'),
+        ),
+    ]
@@ -6,9 +6,25 @@ Organizados por entidade
 # Importar models
 from .categoria import Categoria
 from .assinatura import Assinatura
+from .gasto_consolidado import GastoConsolidado
+from .cobranca import Cobranca, CobrancaMensal
+from .feed_calendario import FeedCalendario
+from .lembrete import LembreteCobranca
+from .tarefa import Tarefa
+from .cambio import Perfil, TaxaCambio
+from .exclusao import Exclusao
 
 # Definir o que será exportado
 __all__ = [
     'Categoria',
     'Assinatura',
+    'GastoConsolidado',
+    'Cobranca',
+    'CobrancaMensal',
+    'FeedCalendario',
+    'LembreteCobranca',
+    'Tarefa',
+    'TaxaCambio',
+    'Perfil',
+    'Exclusao',
 ]
@@ -1,13 +1,251 @@
 """
 Modelo de Assinatura para gerenciar despesas recorrentes
 """
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, ExpressionWrapper, F, Value, When
+from django.db.models.functions import Cast
 from django.contrib.auth.models import User
+from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
 from decimal import Decimal
 from datetime import date
-from dateutil.relativedelta import relativedelta
 from .categoria import Categoria
+from ..ciclos import MESES_POR_CICLO, meses_do_ciclo, proxima_cobranca
+
+
+# Casas decimais dos valores normalizados (mensal tem dízimas: 10/3)
+CASAS_VALOR_MENSAL = Decimal('0.0001')
+
+# Colunas derivadas de valor e ciclo_pagamento
+CAMPOS_NORMALIZADOS = ('valor_mensal_normalizado', 'valor_anual_normalizado')
+
+# Colunas que definem a linha e os valores em GastoConsolidado
+CAMPOS_CONSOLIDADO = (
+    'usuario_id',
+    'categoria_id',
+    'status',
+    'ciclo_pagamento',
+    'moeda',
+) + CAMPOS_NORMALIZADOS
+
+# Campos que, alterados, mudam os gastos consolidados
+CAMPOS_AFETAM_CONSOLIDADO = {
+    'usuario', 'usuario_id', 'categoria', 'categoria_id',
+    'status', 'ciclo_pagamento', 'valor', 'moeda',
+}
+
+# Símbolos exibidos nos valores; outras moedas aparecem pelo código
+SIMBOLOS_MOEDA = {
+    'BRL': 'R$',
+    'USD': 'US$',
+    'EUR': '€',
+    'GBP': '£',
+}
+
+
+def simbolo_moeda(moeda):
+    """Símbolo da moeda (ex.: 'R$'), ou o próprio código"""
+    return SIMBOLOS_MOEDA.get(moeda, moeda)
+
+
+def _multiplicar_por_ciclo(valor, ciclo, fator):
+    """
+    Monta `valor * fator(meses)` para o ciclo informado ou, se o ciclo
+    não for conhecido de antemão, um Case sobre a coluna ciclo_pagamento
+    """
+    if ciclo is not None:
+        return fator(valor, meses_do_ciclo(ciclo))
+    return Case(
+        *[
+            When(ciclo_pagamento=ciclo, then=fator(valor, meses))
+            for ciclo, meses in MESES_POR_CICLO.items()
+        ],
+        default=fator(valor, 1),
+    )
+
+
+def valor_anual_expressao(valor=None, ciclo=None):
+    """
+    Expressão SQL equivalente a Assinatura.valor_anual(), para uso
+    em agregações e update() (ex.: Sum(valor_anual_expressao()))
+    """
+    if valor is None:
+        valor = F('valor')
+    return ExpressionWrapper(
+        _multiplicar_por_ciclo(
+            valor, ciclo, lambda valor, meses: valor * (12 // meses)
+        ),
+        output_field=models.DecimalField(max_digits=14, decimal_places=2),
+    )
+
+
+def valor_mensal_expressao(valor=None, ciclo=None):
+    """
+    Expressão SQL equivalente a Assinatura.valor_mensal().
+    A divisão é feita em ponto flutuante porque o SQLite guarda valores
+    inteiros (ex.: 31.00) como INTEGER e faria divisão inteira; o
+    resultado é arredondado pela coluna de 4 casas decimais.
+    """
+    if valor is None:
+        valor = F('valor')
+    return ExpressionWrapper(
+        _multiplicar_por_ciclo(
+            valor, ciclo,
+            lambda valor, meses: Cast(valor, models.FloatField()) / meses,
+        ),
+        output_field=models.DecimalField(max_digits=14, decimal_places=4),
+    )
+
+
+class AssinaturaQuerySet(models.QuerySet):
+    """
+    Consultas comuns de assinaturas, compartilhadas por views,
+    admin e scripts
+    """
+
+    def for_user(self, usuario):
+        """Assinaturas de um usuário"""
+        return self.filter(usuario=usuario)
+
+    def ativas(self):
+        """Apenas assinaturas com status ATIVA"""
+        return self.filter(status='ATIVA')
+
+    def with_categoria(self):
+        """Carrega a categoria no mesmo SELECT (evita uma query por linha)"""
+        return self.select_related('categoria')
+
+    def _usuarios_afetados(self, campos):
+        """Donos das assinaturas quando `campos` mudam o consolidado"""
+        if not CAMPOS_AFETAM_CONSOLIDADO & set(campos):
+            return None
+        return set(
+            self.order_by().values_list('usuario_id', flat=True).distinct()
+        )
+
+    def update(self, **kwargs):
+        """
+        Mantém os valores normalizados em dia quando valor ou ciclo
+        são alterados em massa, e reconstrói os gastos consolidados
+        dos usuários afetados (update() não dispara signals).
+        data_atualizacao também é atualizada, como no save(): o
+        calendário usa a última alteração como versão.
+        """
+        usuarios = self._usuarios_afetados(kwargs)
+        movidas = None
+        novo_dono = kwargs.get('usuario_id', kwargs.get('usuario'))
+        if usuarios is not None and novo_dono is not None:
+            if hasattr(novo_dono, 'resolve_expression'):
+                # bulk_update: o novo dono varia por linha (Case/When)
+                movidas = list(self.values_list('pk', flat=True))
+            else:
+                usuarios.add(getattr(novo_dono, 'pk', novo_dono))
+
+        if 'valor' in kwargs or 'ciclo_pagamento' in kwargs:
+            valor = kwargs.get('valor', F('valor'))
+            if not hasattr(valor, 'resolve_expression'):
+                valor = Value(
+                    Decimal(valor),
+                    output_field=models.DecimalField(
+                        max_digits=10, decimal_places=2
+                    ),
+                )
+            ciclo = kwargs.get('ciclo_pagamento')
+            kwargs.setdefault(
+                'valor_mensal_normalizado',
+                valor_mensal_expressao(valor, ciclo),
+            )
+            kwargs.setdefault(
+                'valor_anual_normalizado',
+                valor_anual_expressao(valor, ciclo),
+            )
+        kwargs.setdefault('data_atualizacao', timezone.now())
+        linhas = super().update(**kwargs)
+
+        if movidas:
+            usuarios |= set(
+                self.model._base_manager.filter(pk__in=movidas)
+                .order_by().values_list('usuario_id', flat=True).distinct()
+            )
+        if usuarios:
+            from ..consolidado import reconstruir_consolidado
+            reconstruir_consolidado(usuarios)
+        return linhas
+
+    def delete(self):
+        """
+        Exclusão em lote: os signals de cada assinatura não aplicam a
+        diferença nos gastos consolidados, não mudam a versão do
+        calendário nem gravam a Exclusao da sincronização (ver
+        signals.py); isso é feito aqui uma vez por usuário afetado e
+        com um único INSERT de exclusões
+        """
+        from ..calendario import registrar_alteracao_feed
+        from ..consolidado import reconstruir_consolidado
+        from ..sincronizacao import gravar_exclusoes
+
+        with transaction.atomic(using=self.db, savepoint=False):
+            excluidas = list(self.order_by().values_list('usuario_id', 'id'))
+            resultado = super().delete()
+            gravar_exclusoes('assinatura', excluidas)
+
+        usuarios = {usuario_id for usuario_id, _ in excluidas}
+        reconstruir_consolidado(usuarios)
+        for usuario_id in usuarios:
+            registrar_alteracao_feed(usuario_id)
+        return resultado
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """
+        bulk_create não chama save() nem dispara signals: normaliza os
+        valores antes e reconstrói os gastos consolidados depois
+        """
+        objs = list(objs)
+        for obj in objs:
+            obj.normalizar_valores()
+        criados = super().bulk_create(objs, *args, **kwargs)
+        for obj in objs:
+            obj._estado_consolidado = obj.estado_consolidado()
+
+        from ..consolidado import reconstruir_consolidado
+        reconstruir_consolidado({obj.usuario_id for obj in objs})
+        return criados
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        """
+        Inclui os valores normalizados quando valor/ciclo mudam; os
+        gastos consolidados são reconstruídos uma vez, depois de todos
+        os lotes (o update() de cada lote só acumula os usuários).
+        Sem reconstrução, o resumo dos donos é descartado aqui: nomes e
+        próximas cobranças também aparecem no dashboard
+        """
+        fields = list(fields)
+        objs = list(objs)
+        if {'valor', 'ciclo_pagamento'} & set(fields):
+            for obj in objs:
+                obj.normalizar_valores()
+            fields += [
+                campo for campo in CAMPOS_NORMALIZADOS if campo not in fields
+            ]
+
+        from ..consolidado import reconstrucao_adiada
+        with reconstrucao_adiada():
+            linhas = super().bulk_update(objs, fields, *args, **kwargs)
+        if CAMPOS_AFETAM_CONSOLIDADO & set(fields):
+            # Próximos save() aplicam a diferença a partir do estado gravado
+            for obj in objs:
+                if obj.get_deferred_fields() & set(CAMPOS_CONSOLIDADO):
+                    obj.__dict__.pop('_estado_consolidado', None)
+                else:
+                    obj._estado_consolidado = obj.estado_consolidado()
+        else:
+            from ..resumo import invalidar_resumo
+            for usuario_id in {obj.usuario_id for obj in objs}:
+                invalidar_resumo(usuario_id)
+        return linhas
 
 
 class Assinatura(models.Model):
@@ -28,6 +266,29 @@ class Assinatura(models.Model):
         ('CANCELADA', 'Cancelada'),
     ]
 
+    # Ordenações aceitas na listagem de assinaturas
+    ORDENACAO_CHOICES = [
+        ('-data_criacao', 'Mais recentes'),
+        ('data_criacao', 'Mais antigas'),
+        ('nome', 'Nome (A-Z)'),
+        ('-nome', 'Nome (Z-A)'),
+        ('valor', 'Menor valor'),
+        ('-valor', 'Maior valor'),
+        ('data_proxima_cobranca', 'Próxima cobrança'),
+    ]
+    ORDENACAO_PADRAO = '-data_criacao'
+
+    # Índice (usuario, campo, id) que atende cada ordenação
+    ORDENACAO_INDICES = {
+        '-data_criacao': 'assinatura_usr_criacao_idx',
+        'data_criacao': 'assinatura_usr_criacao_idx',
+        'nome': 'assinatura_usr_nome_idx',
+        '-nome': 'assinatura_usr_nome_idx',
+        'valor': 'assinatura_usr_valor_idx',
+        '-valor': 'assinatura_usr_valor_idx',
+        'data_proxima_cobranca': 'assinatura_usr_proxima_idx',
+    }
+
     usuario = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -99,6 +360,24 @@ class Assinatura(models.Model):
         null=True,
         verbose_name='Observações'
     )
+    # Valores derivados de valor e ciclo_pagamento, mantidos por save(),
+    # update(), bulk_create() e bulk_update() para agregações em SQL
+    valor_mensal_normalizado = models.DecimalField(
+        max_digits=14,
+        decimal_places=4,
+        default=Decimal('0'),
+        editable=False,
+        verbose_name='Valor Mensal Normalizado'
+    )
+    valor_anual_normalizado = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0'),
+        editable=False,
+        verbose_name='Valor Anual Normalizado'
+    )
+
+    objects = AssinaturaQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Assinatura'
@@ -108,11 +387,64 @@ class Assinatura(models.Model):
             models.Index(fields=['usuario', 'status']),
             models.Index(fields=['data_proxima_cobranca']),
             models.Index(fields=['categoria']),
+            # Ordenações da listagem (ver ORDENACAO_INDICES)
+            models.Index(
+                fields=['usuario', 'data_criacao', 'id'],
+                name='assinatura_usr_criacao_idx',
+            ),
+            models.Index(
+                fields=['usuario', 'nome', 'id'],
+                name='assinatura_usr_nome_idx',
+            ),
+            models.Index(
+                fields=['usuario', 'valor', 'id'],
+                name='assinatura_usr_valor_idx',
+            ),
+            models.Index(
+                fields=['usuario', 'data_proxima_cobranca', 'id'],
+                name='assinatura_usr_proxima_idx',
+            ),
+            # Última alteração por usuário (ETag do calendário)
+            models.Index(
+                fields=['usuario', 'data_atualizacao'],
+                name='assinatura_usr_atualizacao_idx',
+            ),
+            # Ranking por custo mensal (por usuário e geral)
+            models.Index(
+                fields=['usuario', 'valor_mensal_normalizado'],
+                name='assinatura_usr_mensal_idx',
+            ),
+            models.Index(
+                fields=['status', 'valor_mensal_normalizado'],
+                name='assinatura_status_mensal_idx',
+            ),
         ]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Guarda o estado consolidado carregado do banco, usado para
+        aplicar a diferença em GastoConsolidado ao salvar/excluir
+        (não guarda quando algum campo foi adiado com only/defer)
+        """
+        instancia = super().from_db(db, field_names, values)
+        if set(CAMPOS_CONSOLIDADO).issubset(field_names):
+            instancia._estado_consolidado = instancia.estado_consolidado()
+        return instancia
+
+    @classmethod
+    def ordenacao_valida(cls, ordenacao):
+        """
+        Retorna a ordenação se ela for uma das permitidas,
+        senão a ordenação padrão
+        """
+        if ordenacao in cls.ORDENACAO_INDICES:
+            return ordenacao
+        return cls.ORDENACAO_PADRAO
+
     def __str__(self):
         ciclo = self.get_ciclo_pagamento_display()
-        return f"{self.nome} - R$ {self.valor} ({ciclo})"
+        return f"{self.nome} - {self.simbolo_moeda} {self.valor} ({ciclo})"
 
     def save(self, *args, **kwargs):
         """
@@ -127,9 +459,47 @@ class Assinatura(models.Model):
         if not self.dia_vencimento:
             self.dia_vencimento = self.data_primeira_cobranca.day
 
+        self.normalizar_valores()
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields:
+            update_fields = set(update_fields)
+            if {'valor', 'ciclo_pagamento'} & update_fields:
+                update_fields |= set(CAMPOS_NORMALIZADOS)
+            # auto_now só é gravado se estiver em update_fields; a
+            # sincronização e o calendário dependem dele
+            kwargs['update_fields'] = update_fields | {'data_atualizacao'}
+
         super().save(*args, **kwargs)
 
-    def calcular_proxima_cobranca(self, data_base=None):
+    def normalizar_valores(self):
+        """
+        Atualiza valor_mensal_normalizado e valor_anual_normalizado
+        a partir do valor e do ciclo de pagamento
+        """
+        valor = Decimal(str(self.valor))
+        self.valor_anual_normalizado = valor * (
+            12 // meses_do_ciclo(self.ciclo_pagamento)
+        )
+        self.valor_mensal_normalizado = (
+            valor / meses_do_ciclo(self.ciclo_pagamento)
+        ).quantize(CASAS_VALOR_MENSAL)
+
+    def estado_consolidado(self):
+        """
+        Retorna ((usuario_id, categoria_id, status, ciclo, moeda),
+        valor mensal, valor anual) como contam em GastoConsolidado
+        """
+        chave = (
+            self.usuario_id,
+            self.categoria_id,
+            self.status,
+            self.ciclo_pagamento,
+            self.moeda,
+        )
+        return chave, self.valor_mensal_normalizado, self.valor_anual_normalizado
+
+    def calcular_proxima_cobranca(self, data_base=None, hoje=None):
         """
         Calcula a próxima data de cobrança baseada no ciclo de pagamento
         """
@@ -138,31 +508,24 @@ class Assinatura(models.Model):
                 self.data_proxima_cobranca or self.data_primeira_cobranca
             )
 
-        hoje = date.today()
-
-        if data_base >= hoje:
-            return data_base
+        if hoje is None:
+            hoje = date.today()
 
-        if self.ciclo_pagamento == 'MENSAL':
-            delta = relativedelta(months=1)
-        elif self.ciclo_pagamento == 'TRIMESTRAL':
-            delta = relativedelta(months=3)
-        elif self.ciclo_pagamento == 'SEMESTRAL':
-            delta = relativedelta(months=6)
-        elif self.ciclo_pagamento == 'ANUAL':
-            delta = relativedelta(years=1)
-        else:
-            delta = relativedelta(months=1)
-
-        proxima_data = data_base
-        while proxima_data < hoje:
-            proxima_data += delta
+        return proxima_cobranca(
+            data_base,
+            self.ciclo_pagamento,
+            hoje,
+            self.dia_vencimento,
+        )
 
-        return proxima_data
+    @property
+    def simbolo_moeda(self):
+        return simbolo_moeda(self.moeda)
 
     def valor_mensal(self):
         """
         Converte o valor da assinatura para base mensal para cálculos
+        (na moeda da assinatura; totais convertidos ficam em cambio.py)
         """
         if self.ciclo_pagamento == 'MENSAL':
             return self.valor
@@ -205,9 +568,15 @@ class Assinatura(models.Model):
 
     def atualizar_proxima_cobranca(self):
         """
-        Atualiza a data da próxima cobrança para o próximo ciclo
+        Registra no histórico as cobranças vencidas e avança a data da
+        próxima cobrança, como o comando avancar_cobrancas
         """
-        self.data_proxima_cobranca = self.calcular_proxima_cobranca(
-            self.data_proxima_cobranca
-        )
-        self.save()
+        from ..historico import cobrancas_vencidas, registrar_cobrancas
+
+        hoje = date.today()
+        with transaction.atomic():
+            registrar_cobrancas(cobrancas_vencidas(self, hoje))
+            self.data_proxima_cobranca = self.calcular_proxima_cobranca(
+                hoje=hoje
+            )
+            self.save()
@@ -0,0 +1,65 @@
+"""
+Modelos de câmbio: taxas por moeda e moeda base de cada usuário
+"""
+from django.conf import settings
+from django.db import models
+from django.contrib.auth.models import User
+
+
+def moeda_referencia():
+    return settings.MOEDA_REFERENCIA
+
+
+class TaxaCambio(models.Model):
+    """
+    Quanto vale uma unidade da moeda na moeda de referência
+    (MOEDA_REFERENCIA). Carregada de arquivo pelo comando
+    carregar_cambio; a conversão entre duas moedas quaisquer passa
+    pela referência (ver cambio.py).
+    """
+    moeda = models.CharField(
+        max_length=3,
+        unique=True,
+        verbose_name='Moeda'
+    )
+    taxa = models.DecimalField(
+        max_digits=18,
+        decimal_places=8,
+        verbose_name='Taxa'
+    )
+    data_atualizacao = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Data de Atualização'
+    )
+
+    class Meta:
+        verbose_name = 'Taxa de Câmbio'
+        verbose_name_plural = 'Taxas de Câmbio'
+        ordering = ['moeda']
+
+    def __str__(self):
+        return f"1 {self.moeda} = {self.taxa} {settings.MOEDA_REFERENCIA}"
+
+
+class Perfil(models.Model):
+    """
+    Preferências do usuário. Sem perfil, vale a moeda de referência.
+    """
+    usuario = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='perfil',
+        verbose_name='Usuário'
+    )
+    moeda_base = models.CharField(
+        max_length=3,
+        default=moeda_referencia,
+        verbose_name='Moeda Base'
+    )
+
+    class Meta:
+        verbose_name = 'Perfil'
+        verbose_name_plural = 'Perfis'
+
+    def __str__(self):
+        return f"Perfil de {self.usuario.username}"
@@ -1,8 +1,44 @@
 """
 Modelo de Categoria para organização de assinaturas
 """
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+
+class CategoriaQuerySet(models.QuerySet):
+
+    def update(self, **kwargs):
+        """
+        data_atualizacao também é atualizada, como no save() (e no
+        bulk_update, que passa por aqui): a sincronização da API lê as
+        categorias alteradas por ela
+        """
+        kwargs.setdefault('data_atualizacao', timezone.now())
+        return super().update(**kwargs)
+
+    def delete(self):
+        """
+        Exclusão em lote: as assinaturas das categorias ficam sem
+        categoria (com data_atualizacao nova), cada categoria deixa uma
+        Exclusao para a sincronização e os gastos consolidados de cada
+        usuário afetado são reconstruídos uma única vez (não um por
+        categoria, ver signals.py)
+        """
+        from ..consolidado import reconstruir_consolidado
+        from ..sincronizacao import gravar_exclusoes, tocar_assinaturas
+
+        with transaction.atomic(using=self.db, savepoint=False):
+            excluidas = list(self.order_by().values_list('usuario_id', 'id'))
+            tocar_assinaturas([id for _, id in excluidas])
+            resultado = super().delete()
+            gravar_exclusoes('categoria', excluidas)
+
+        reconstruir_consolidado({usuario_id for usuario_id, _ in excluidas})
+        return resultado
+
+    delete.alters_data = True
+    delete.queryset_only = True
 
 
 class Categoria(models.Model):
@@ -35,6 +71,12 @@ class Categoria(models.Model):
         auto_now_add=True,
         verbose_name='Data de Criação'
     )
+    data_atualizacao = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Data de Atualização'
+    )
+
+    objects = CategoriaQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Categoria'
@@ -43,6 +85,11 @@ class Categoria(models.Model):
         ordering = ['nome']
         indexes = [
             models.Index(fields=['usuario', 'nome']),
+            # Alteradas depois do token da sincronização
+            models.Index(
+                fields=['usuario', 'data_atualizacao', 'id'],
+                name='categoria_usr_atualizacao_idx',
+            ),
         ]
 
     def __str__(self):
@@ -50,4 +97,4 @@ class Categoria(models.Model):
 
     def total_assinaturas(self):
         """Retorna o número total de assinaturas nesta categoria"""
-        return self.assinaturas.filter(status='ATIVA').count()
+        return self.assinaturas.ativas().count()
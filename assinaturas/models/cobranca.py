@@ -0,0 +1,119 @@
+"""
+Modelos do histórico de cobranças (detalhado e arquivado por mês)
+"""
+from django.db import models
+from django.contrib.auth.models import User
+from .assinatura import Assinatura
+
+
+class Cobranca(models.Model):
+    """
+    Cobrança já ocorrida de uma assinatura. Histórico somente de
+    inserção: as linhas são gravadas em lote pelo comando
+    avancar_cobrancas e nunca alteradas. Meses antigos são resumidos
+    em CobrancaMensal pelo comando arquivar_cobrancas.
+    """
+    usuario = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='cobrancas',
+        # Coberto pelo índice (usuario, data)
+        db_index=False,
+        verbose_name='Usuário'
+    )
+    assinatura = models.ForeignKey(
+        Assinatura,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='cobrancas',
+        # Coberto pela restrição (assinatura, data)
+        db_index=False,
+        verbose_name='Assinatura'
+    )
+    data = models.DateField(verbose_name='Data da Cobrança')
+    valor = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        verbose_name='Valor'
+    )
+    moeda = models.CharField(
+        max_length=3,
+        default='BRL',
+        verbose_name='Moeda'
+    )
+
+    class Meta:
+        verbose_name = 'Cobrança'
+        verbose_name_plural = 'Cobranças'
+        ordering = ['-data']
+        indexes = [
+            # Consultas por período (ver historico.py)
+            models.Index(
+                fields=['usuario', 'data'],
+                name='cobranca_usr_data_idx',
+            ),
+            # Arquivamento por mês
+            models.Index(fields=['data'], name='cobranca_data_idx'),
+        ]
+        constraints = [
+            # Reexecuções do avanço de ciclos não duplicam cobranças
+            models.UniqueConstraint(
+                fields=['assinatura', 'data'],
+                name='cobranca_unica',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.data:%d/%m/%Y} - R$ {self.valor}"
+
+    def save(self, *args, **kwargs):
+        """Cobranças são imutáveis: apenas inserção"""
+        if not self._state.adding:
+            raise ValueError('Cobranças registradas não podem ser alteradas.')
+        super().save(*args, **kwargs)
+
+
+class CobrancaMensal(models.Model):
+    """
+    Total mensal das cobranças arquivadas de um usuário: substitui as
+    linhas de Cobranca dos meses antigos (ver arquivar_cobrancas)
+    """
+    usuario = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='cobrancas_mensais',
+        db_index=False,
+        verbose_name='Usuário'
+    )
+    mes = models.DateField(verbose_name='Mês (primeiro dia)')
+    moeda = models.CharField(
+        max_length=3,
+        default='BRL',
+        verbose_name='Moeda'
+    )
+    quantidade = models.IntegerField(
+        default=0,
+        verbose_name='Quantidade de Cobranças'
+    )
+    total = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        verbose_name='Total'
+    )
+
+    class Meta:
+        verbose_name = 'Cobrança Mensal Arquivada'
+        verbose_name_plural = 'Cobranças Mensais Arquivadas'
+        ordering = ['-mes']
+        constraints = [
+            # Também serve de índice (usuario, mes) para as consultas
+            models.UniqueConstraint(
+                fields=['usuario', 'mes', 'moeda'],
+                name='cobranca_mensal_unica',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.usuario.username} - {self.mes:%m/%Y}: R$ {self.total}"
@@ -0,0 +1,51 @@
+"""
+Modelo dos registros de exclusão usados pela sincronização da API
+"""
+from django.db import models
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+
+class Exclusao(models.Model):
+    """
+    Marca deixada por uma assinatura ou categoria excluída, para que os
+    clientes da sincronização incremental também removam a cópia local
+    (ver sincronizacao.py). Apagada depois de SINCRONIZACAO_RETENCAO dias.
+    """
+    MODELO_CHOICES = [
+        ('assinatura', 'Assinatura'),
+        ('categoria', 'Categoria'),
+    ]
+
+    usuario = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='exclusoes',
+        verbose_name='Usuário'
+    )
+    modelo = models.CharField(
+        max_length=20,
+        choices=MODELO_CHOICES,
+        verbose_name='Modelo'
+    )
+    objeto_id = models.BigIntegerField(verbose_name='Id do Registro')
+    data_exclusao = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Data de Exclusão'
+    )
+
+    class Meta:
+        verbose_name = 'Exclusão'
+        verbose_name_plural = 'Exclusões'
+        indexes = [
+            # Exclusões posteriores ao token, por usuário e modelo
+            models.Index(
+                fields=['usuario', 'modelo', 'data_exclusao', 'id'],
+                name='exclusao_usr_data_idx',
+            ),
+            # Limpeza das antigas (limpar_exclusoes)
+            models.Index(fields=['data_exclusao']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_modelo_display()} {self.objeto_id} excluída"
@@ -0,0 +1,52 @@
+"""
+Modelo do token do calendário (.ics) de cobranças do usuário
+"""
+import secrets
+
+from django.db import models
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+
+def gerar_token():
+    """Token aleatório usado na URL pública do calendário"""
+    return secrets.token_urlsafe(32)
+
+
+class FeedCalendario(models.Model):
+    """
+    Token secreto que dá acesso ao calendário de cobranças do usuário
+    sem login (aplicativos de calendário não enviam a sessão).
+    Regenerar o token invalida a URL anterior.
+    """
+    usuario = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_calendario',
+        verbose_name='Usuário'
+    )
+    token = models.CharField(
+        max_length=64,
+        unique=True,
+        default=gerar_token,
+        verbose_name='Token'
+    )
+    # Alterações que não aparecem em Assinatura.data_atualizacao
+    # (exclusões e troca do token); também entra na versão do calendário
+    data_atualizacao = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Data de Atualização'
+    )
+
+    class Meta:
+        verbose_name = 'Calendário de Cobranças'
+        verbose_name_plural = 'Calendários de Cobranças'
+
+    def __str__(self):
+        return f"Calendário de {self.usuario.username}"
+
+    def regenerar(self):
+        """Troca o token: a URL antiga deixa de funcionar"""
+        self.token = gerar_token()
+        self.data_atualizacao = timezone.now()
+        self.save(update_fields=['token', 'data_atualizacao'])
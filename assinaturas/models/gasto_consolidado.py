@@ -0,0 +1,91 @@
+"""
+Modelo de gastos consolidados por usuário, categoria, status, ciclo
+e moeda
+"""
+from django.db import models
+from django.contrib.auth.models import User
+from .categoria import Categoria
+from .assinatura import Assinatura
+
+
+class GastoConsolidado(models.Model):
+    """
+    Quantidade de assinaturas e soma dos valores normalizados de cada
+    combinação (usuário, categoria, status, ciclo, moeda), com os
+    valores na moeda das assinaturas (convertidos na consulta, ver
+    cambio.py). Mantido pelos
+    signals de Assinatura e reconciliado pelo comando
+    reconstruir_consolidado (ver consolidado.py).
+    """
+    usuario = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='gastos_consolidados',
+        verbose_name='Usuário'
+    )
+    categoria = models.ForeignKey(
+        Categoria,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='gastos_consolidados',
+        verbose_name='Categoria'
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=Assinatura.STATUS_CHOICES,
+        verbose_name='Status'
+    )
+    ciclo_pagamento = models.CharField(
+        max_length=20,
+        choices=Assinatura.CICLO_CHOICES,
+        verbose_name='Ciclo de Pagamento'
+    )
+    moeda = models.CharField(
+        max_length=3,
+        default='BRL',
+        verbose_name='Moeda'
+    )
+    quantidade = models.IntegerField(
+        default=0,
+        verbose_name='Quantidade de Assinaturas'
+    )
+    valor_mensal = models.DecimalField(
+        max_digits=16,
+        decimal_places=4,
+        default=0,
+        verbose_name='Valor Mensal'
+    )
+    valor_anual = models.DecimalField(
+        max_digits=16,
+        decimal_places=2,
+        default=0,
+        verbose_name='Valor Anual'
+    )
+
+    class Meta:
+        verbose_name = 'Gasto Consolidado'
+        verbose_name_plural = 'Gastos Consolidados'
+        ordering = ['usuario', 'status', 'ciclo_pagamento']
+        constraints = [
+            # NULL não conflita em UNIQUE: "sem categoria" tem a sua
+            models.UniqueConstraint(
+                fields=[
+                    'usuario', 'categoria', 'status', 'ciclo_pagamento', 'moeda',
+                ],
+                condition=models.Q(categoria__isnull=False),
+                name='gasto_consolidado_unico',
+            ),
+            models.UniqueConstraint(
+                fields=['usuario', 'status', 'ciclo_pagamento', 'moeda'],
+                condition=models.Q(categoria__isnull=True),
+                name='gasto_consolidado_sem_cat_unico',
+            ),
+        ]
+
+    def __str__(self):
+        categoria = self.categoria.nome if self.categoria else 'Sem categoria'
+        return (
+            f"{self.usuario.username} - {categoria} - {self.status} - "
+            f"{self.ciclo_pagamento} - {self.moeda}: {self.quantidade}"
+        )
@@ -0,0 +1,55 @@
+"""
+Modelo dos lembretes de cobrança já enviados
+"""
+from django.db import models
+from django.contrib.auth.models import User
+from .assinatura import Assinatura
+
+
+class LembreteCobranca(models.Model):
+    """
+    Cobrança já avisada por email (ver enviar_lembretes). Impede que
+    reexecuções do comando, ou a mesma cobrança vista em dias seguidos
+    da janela de antecedência, gerem um segundo aviso.
+    """
+    usuario = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='lembretes_cobranca',
+        # Coberto pelo índice (usuario, data_cobranca)
+        db_index=False,
+        verbose_name='Usuário'
+    )
+    assinatura = models.ForeignKey(
+        Assinatura,
+        on_delete=models.CASCADE,
+        related_name='lembretes',
+        # Coberto pela restrição (assinatura, data_cobranca)
+        db_index=False,
+        verbose_name='Assinatura'
+    )
+    data_cobranca = models.DateField(verbose_name='Data da Cobrança')
+    data_envio = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Data de Envio'
+    )
+
+    class Meta:
+        verbose_name = 'Lembrete de Cobrança'
+        verbose_name_plural = 'Lembretes de Cobrança'
+        indexes = [
+            # Lembretes já enviados de um lote de usuários
+            models.Index(
+                fields=['usuario', 'data_cobranca'],
+                name='lembrete_usr_data_idx',
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['assinatura', 'data_cobranca'],
+                name='lembrete_unico',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.assinatura_id} - {self.data_cobranca:%d/%m/%Y}"
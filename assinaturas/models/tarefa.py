@@ -0,0 +1,89 @@
+"""
+Modelo da fila de tarefas em segundo plano
+"""
+from django.db import models
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+
+class Tarefa(models.Model):
+    """
+    Trabalho pesado executado fora da requisição pelo comando worker
+    (ver tarefas.py). A própria tabela é a fila: não há broker externo.
+    """
+    STATUS_CHOICES = [
+        ('PENDENTE', 'Pendente'),
+        ('EXECUTANDO', 'Executando'),
+        ('CONCLUIDA', 'Concluída'),
+        ('FALHOU', 'Falhou'),
+    ]
+
+    # Status em que a tarefa não muda mais
+    STATUS_FINAIS = ('CONCLUIDA', 'FALHOU')
+
+    usuario = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='tarefas',
+        verbose_name='Usuário'
+    )
+    tipo = models.CharField(max_length=50, verbose_name='Tipo')
+    parametros = models.JSONField(default=dict, blank=True, verbose_name='Parâmetros')
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='PENDENTE',
+        verbose_name='Status'
+    )
+    tentativas = models.PositiveIntegerField(default=0, verbose_name='Tentativas')
+    max_tentativas = models.PositiveIntegerField(
+        default=3,
+        verbose_name='Máximo de Tentativas'
+    )
+    # Início do primeiro processamento ou da próxima tentativa (espera)
+    executar_apos = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Executar Após'
+    )
+    trabalhador = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name='Trabalhador'
+    )
+    resultado = models.JSONField(null=True, blank=True, verbose_name='Resultado')
+    erro = models.TextField(blank=True, verbose_name='Último Erro')
+    data_criacao = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Data de Criação'
+    )
+    data_inicio = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Início da Execução'
+    )
+    data_fim = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Fim da Execução'
+    )
+
+    class Meta:
+        verbose_name = 'Tarefa'
+        verbose_name_plural = 'Tarefas'
+        ordering = ['-data_criacao']
+        indexes = [
+            # Próxima tarefa disponível para os trabalhadores
+            models.Index(
+                fields=['status', 'executar_apos', 'id'],
+                name='tarefa_fila_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} #{self.pk} ({self.get_status_display()})"
+
+    @property
+    def finalizada(self):
+        return self.status in self.STATUS_FINAIS
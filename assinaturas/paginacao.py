@@ -0,0 +1,121 @@
+"""
+Paginação por cursor (keyset) para listagens
+
+Em vez de OFFSET, cada página filtra a partir do último registro da
+página anterior: (campo, id) > (valor, id_anterior). Com um índice
+composto sobre a ordenação, o custo da página N é o mesmo da página 1.
+Aceita querysets de instâncias ou de values() (que precisam incluir o
+id e o campo da ordenação).
+"""
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class CursorInvalido(ValueError):
+    """Cursor que não foi gerado por paginar_keyset() para esta ordenação"""
+
+
+def _codificar_cursor(ordenacao, direcao, valor, pk):
+    dados = json.dumps([ordenacao, direcao, str(valor), pk])
+    return base64.urlsafe_b64encode(dados.encode()).decode().rstrip('=')
+
+
+def _decodificar_cursor(cursor, ordenacao, field):
+    """
+    Retorna (direcao, valor, pk) ou None se o cursor for inválido
+    ou tiver sido gerado para outra ordenação
+    """
+    try:
+        preenchimento = '=' * (-len(cursor) % 4)
+        dados = base64.urlsafe_b64decode(cursor + preenchimento)
+        ordenacao_cursor, direcao, valor, pk = json.loads(dados)
+        if ordenacao_cursor != ordenacao:
+            return None
+        if direcao not in ('proxima', 'anterior'):
+            return None
+        return direcao, field.to_python(valor), int(pk)
+    except (binascii.Error, ValueError, TypeError, ValidationError):
+        return None
+
+
+def _posicao(item, campo):
+    """(valor do campo, id) de uma instância ou de um dicionário de values()"""
+    if isinstance(item, dict):
+        return item[campo], item['id']
+    return getattr(item, campo), item.pk
+
+
+def _filtro_apos(campo, valor, pk, descendente):
+    """Registros posicionados depois de (valor, pk) na ordenação"""
+    operador = 'lt' if descendente else 'gt'
+    return (
+        Q(**{f'{campo}__{operador}': valor})
+        | Q(**{campo: valor, f'pk__{operador}': pk})
+    )
+
+
+def paginar_keyset(queryset, ordenacao, cursor=None, tamanho=25,
+                   estrito=False):
+    """
+    Pagina `queryset` pela `ordenacao` (ex.: 'nome' ou '-valor'),
+    usando o id como desempate. Um cursor inválido volta à primeira
+    página, ou levanta CursorInvalido com `estrito=True`.
+
+    Retorna um dicionário com os itens da página e os cursores
+    da próxima página e da anterior (None quando não existirem).
+    """
+    descendente = ordenacao.startswith('-')
+    campo = ordenacao.lstrip('-')
+    field = queryset.model._meta.get_field(campo)
+    prefixo = '-' if descendente else ''
+    inverso = '' if descendente else '-'
+
+    posicao = None
+    if cursor:
+        posicao = _decodificar_cursor(cursor, ordenacao, field)
+        if posicao is None and estrito:
+            raise CursorInvalido('Cursor inválido.')
+    direcao = posicao[0] if posicao else 'proxima'
+
+    if direcao == 'proxima':
+        queryset = queryset.order_by(f'{prefixo}{campo}', f'{prefixo}pk')
+        if posicao:
+            queryset = queryset.filter(
+                _filtro_apos(campo, posicao[1], posicao[2], descendente)
+            )
+    else:
+        # Página anterior: percorre a ordenação invertida e desfaz no final
+        queryset = queryset.order_by(f'{inverso}{campo}', f'{inverso}pk')
+        queryset = queryset.filter(
+            _filtro_apos(campo, posicao[1], posicao[2], not descendente)
+        )
+
+    itens = list(queryset[:tamanho + 1])
+    tem_mais = len(itens) > tamanho
+    itens = itens[:tamanho]
+
+    if direcao == 'anterior':
+        itens.reverse()
+        tem_proxima, tem_anterior = True, tem_mais
+    else:
+        tem_proxima, tem_anterior = tem_mais, posicao is not None
+
+    proxima = anterior = None
+    if itens and tem_proxima:
+        proxima = _codificar_cursor(
+            ordenacao, 'proxima', *_posicao(itens[-1], campo)
+        )
+    if itens and tem_anterior:
+        anterior = _codificar_cursor(
+            ordenacao, 'anterior', *_posicao(itens[0], campo)
+        )
+
+    return {
+        'itens': itens,
+        'proxima': proxima,
+        'anterior': anterior,
+    }
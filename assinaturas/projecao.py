@@ -0,0 +1,185 @@
+"""
+Projeção das cobranças futuras (fluxo de caixa) por mês e categoria
+
+As datas são tratadas como índices inteiros de mês (ano * 12 + mês).
+As assinaturas ativas são lidas em uma única consulta e agrupadas por
+(mês da próxima cobrança, ciclo, categoria), somando os valores; só
+então cada grupo é expandido pelo horizonte, de `passo` em `passo`
+meses. O custo da expansão depende do número de grupos, limitado a
+meses × ciclos × categorias, e não do número de assinaturas. Os
+valores já vêm do banco convertidos para a moeda base do usuário; as
+assinaturas em moedas sem taxa ficam fora dos totais (listadas em
+sem_taxa) e, no detalhamento, aparecem com o valor na moeda original.
+"""
+from calendar import monthrange
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from .cambio import converter, moeda_base
+from .ciclos import dia_ancora, meses_do_ciclo, proxima_cobranca
+from .models import Assinatura
+
+
+# Horizontes de projeção oferecidos (meses)
+HORIZONTES = (12, 24)
+
+SEM_CATEGORIA = ('Sem categoria', '#6c757d')
+
+# valor_base: valor na moeda base (anotado por carregar_assinaturas),
+# None se a moeda da assinatura não tiver taxa
+CAMPOS_PROJECAO = (
+    'id',
+    'nome',
+    'valor',
+    'moeda',
+    'valor_base',
+    'ciclo_pagamento',
+    'data_proxima_cobranca',
+    'dia_vencimento',
+    'categoria_id',
+    'categoria__nome',
+    'categoria__cor',
+)
+
+
+def _indice_mes(data):
+    return data.year * 12 + data.month - 1
+
+
+def _data_do_indice(indice, dia=1):
+    ano, mes = divmod(indice, 12)
+    return date(ano, mes + 1, min(dia, monthrange(ano, mes + 1)[1]))
+
+
+def carregar_assinaturas(usuario, moeda):
+    """
+    Assinaturas ativas do usuário, com a categoria e o valor convertido
+    para `moeda`, em uma consulta
+    """
+    return list(
+        Assinatura.objects.for_user(usuario).ativas().annotate(
+            valor_base=converter('valor', moeda)
+        ).values(*CAMPOS_PROJECAO)
+    )
+
+
+def projetar(assinaturas, inicio, meses=12, detalhar=False):
+    """
+    Projeta as cobranças de `assinaturas` (dicionários com os campos de
+    CAMPOS_PROJECAO) do dia `inicio` até o fim do `meses`-ésimo mês.
+
+    Retorna o total do período, o total por categoria, as moedas sem
+    taxa (fora dos totais) e, para cada mês, o total e a divisão por
+    categoria. Com `detalhar=True` cada mês traz também a lista de
+    cobranças (data, assinatura, valor e moeda, None quando o valor já
+    está na moeda base).
+    """
+    base = _indice_mes(inicio)
+    grupos = defaultdict(Decimal)
+    sem_taxa = set()
+    categorias = {None: SEM_CATEGORIA}
+    cobrancas = [[] for _ in range(meses)] if detalhar else None
+    # Primeiro dia e último dia de cada mês do horizonte
+    meses_horizonte = [_data_do_indice(base + i) for i in range(meses)]
+    ultimos_dias = [monthrange(m.year, m.month)[1] for m in meses_horizonte]
+
+    for assinatura in assinaturas:
+        ciclo = assinatura['ciclo_pagamento']
+        proxima = assinatura['data_proxima_cobranca']
+        if proxima < inicio:
+            # Cobrança vencida ainda não avançada
+            proxima = proxima_cobranca(
+                proxima, ciclo, inicio, assinatura['dia_vencimento']
+            )
+
+        indice = _indice_mes(proxima) - base
+        if indice >= meses:
+            continue
+
+        passo = meses_do_ciclo(ciclo)
+        categoria = assinatura['categoria_id']
+        if categoria not in categorias:
+            categorias[categoria] = (
+                assinatura['categoria__nome'], assinatura['categoria__cor']
+            )
+        valor, moeda = assinatura['valor_base'], None
+        if valor is None:
+            valor, moeda = assinatura['valor'], assinatura['moeda']
+            sem_taxa.add(moeda)
+        else:
+            grupos[indice, passo, categoria] += valor
+
+        if detalhar:
+            dia = dia_ancora(proxima, assinatura['dia_vencimento'])
+            for i in range(indice, meses, passo):
+                cobrancas[i].append({
+                    'data': meses_horizonte[i].replace(
+                        day=min(dia, ultimos_dias[i])
+                    ),
+                    'assinatura_id': assinatura['id'],
+                    'nome': assinatura['nome'],
+                    'valor': valor,
+                    'moeda': moeda,
+                    'categoria': categorias[categoria][0],
+                })
+
+    # Expansão dos grupos pelo horizonte
+    por_mes = [defaultdict(Decimal) for _ in range(meses)]
+    for (indice, passo, categoria), valor in grupos.items():
+        for i in range(indice, meses, passo):
+            por_mes[i][categoria] += valor
+
+    total_categorias = defaultdict(Decimal)
+    lista_meses = []
+    for i, totais in enumerate(por_mes):
+        for categoria, valor in totais.items():
+            total_categorias[categoria] += valor
+        mes = {
+            'mes': meses_horizonte[i],
+            'total': sum(totais.values(), Decimal('0')),
+            'categorias': _lista_categorias(totais, categorias),
+        }
+        if detalhar:
+            mes['cobrancas'] = sorted(
+                cobrancas[i], key=lambda c: (c['data'], c['nome'])
+            )
+        lista_meses.append(mes)
+
+    return {
+        'inicio': inicio,
+        'fim': _data_do_indice(base + meses - 1, 31),
+        'total': sum(total_categorias.values(), Decimal('0')),
+        'categorias': _lista_categorias(total_categorias, categorias),
+        'sem_taxa': sorted(sem_taxa),
+        'meses': lista_meses,
+    }
+
+
+def _lista_categorias(totais, categorias):
+    """Totais por categoria, do maior para o menor"""
+    return [
+        {
+            'nome': categorias[categoria][0],
+            'cor': categorias[categoria][1],
+            'total': valor,
+        }
+        for categoria, valor in sorted(
+            totais.items(), key=lambda item: -item[1]
+        )
+    ]
+
+
+def projetar_usuario(usuario, meses=12, hoje=None, detalhar=False):
+    """
+    Projeção das assinaturas ativas do usuário a partir de hoje, na
+    moeda base dele
+    """
+    if hoje is None:
+        hoje = date.today()
+    moeda = moeda_base(usuario)
+    projecao = projetar(
+        carregar_assinaturas(usuario, moeda), hoje, meses, detalhar
+    )
+    projecao['moeda'] = moeda
+    return projecao
@@ -0,0 +1,145 @@
+"""
+Resumo do dashboard por usuário, mantido no cache do Django
+
+O resumo é invalidado pelos signals de Assinatura e Categoria
+(ver signals.py). A data do dia faz parte da chave, então a janela
+de "próximos 30 dias" é recalculada na virada do dia, e a versão das
+taxas de câmbio, para os totais seguirem novas cotações. Totais e
+categorias vêm de GastoConsolidado (ver consolidado.py), convertidos
+para a moeda base do usuário na própria consulta (ver cambio.py); os
+valores em moedas sem taxa ficam fora dos totais e aparecem à parte,
+na moeda original, em sem_conversao.
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import F, Q, Sum
+
+from .cambio import converter, moeda_base, taxas_de_cambio
+from .models import Assinatura, GastoConsolidado
+from .models.assinatura import simbolo_moeda
+
+
+# Tempo máximo que um resumo fica em cache (segundos)
+RESUMO_TIMEOUT = 60 * 60 * 24
+
+
+def chave_resumo(usuario_id, hoje=None):
+    """
+    Chave de cache do resumo do usuário para o dia informado e as
+    taxas de câmbio atuais
+    """
+    if hoje is None:
+        hoje = date.today()
+    _, versao_taxas = taxas_de_cambio()
+    return f'dashboard_resumo:{usuario_id}:{hoje.isoformat()}:{versao_taxas}'
+
+
+def calcular_resumo(usuario, hoje=None):
+    """
+    Calcula o resumo do dashboard direto no banco de dados
+    """
+    if hoje is None:
+        hoje = date.today()
+
+    # Assinaturas ativas do usuário
+    assinaturas_ativas = (
+        Assinatura.objects.for_user(usuario).ativas().with_categoria()
+    )
+
+    # Janela de próximas cobranças (próximos 30 dias)
+    proximos_30_dias = hoje + timedelta(days=30)
+    janela_proximas = Q(
+        data_proxima_cobranca__gte=hoje,
+        data_proxima_cobranca__lte=proximos_30_dias
+    )
+
+    # Totais por categoria e moeda das ativas: O(categorias × moedas)
+    # linhas consolidadas, convertidas no SUM (NULL sem taxa). O gasto
+    # mensal é derivado do anual, que é exato (o mensal normalizado é
+    # arredondado).
+    moeda = moeda_base(usuario)
+    linhas = GastoConsolidado.objects.filter(
+        usuario=usuario, status='ATIVA', quantidade__gt=0
+    ).values('categoria_id', 'moeda').annotate(
+        nome=F('categoria__nome'),
+        cor=F('categoria__cor'),
+        total_assinaturas=Sum('quantidade'),
+        valor_original=Sum('valor_anual'),
+        gasto_anual=Sum(converter('valor_anual', moeda)),
+    ).order_by('nome', 'categoria_id', 'moeda')
+
+    categorias = {}
+    sem_conversao = defaultdict(Decimal)
+    for linha in linhas:
+        categoria = categorias.setdefault(linha['categoria_id'], {
+            'categoria_id': linha['categoria_id'],
+            'nome': linha['nome'],
+            'cor': linha['cor'],
+            'total_assinaturas': 0,
+            'gasto_anual': Decimal('0'),
+        })
+        categoria['total_assinaturas'] += linha['total_assinaturas']
+        if linha['gasto_anual'] is None:
+            sem_conversao[linha['moeda']] += linha['valor_original']
+        else:
+            categoria['gasto_anual'] += linha['gasto_anual']
+    por_categoria = list(categorias.values())
+    total_assinaturas = sum(c['total_assinaturas'] for c in por_categoria)
+    gasto_anual = sum((c['gasto_anual'] for c in por_categoria), Decimal('0'))
+
+    total_proximas_cobrancas = assinaturas_ativas.filter(
+        janela_proximas
+    ).count()
+
+    proximas_cobrancas = assinaturas_ativas.filter(
+        janela_proximas
+    ).order_by('data_proxima_cobranca')[:5]
+
+    # Distribuição por categoria
+    categorias_stats = [
+        c for c in por_categoria if c['categoria_id'] is not None
+    ]
+
+    return {
+        'moeda': moeda,
+        'simbolo_moeda': simbolo_moeda(moeda),
+        'total_assinaturas': total_assinaturas,
+        'gasto_mensal': gasto_anual / 12,
+        'gasto_anual': gasto_anual,
+        'sem_conversao': [
+            {
+                'moeda': codigo,
+                'simbolo': simbolo_moeda(codigo),
+                'gasto_anual': valor,
+            }
+            for codigo, valor in sorted(sem_conversao.items())
+        ],
+        'total_proximas_cobrancas': total_proximas_cobrancas,
+        'proximas_cobrancas': list(proximas_cobrancas),
+        'categorias_stats': categorias_stats,
+        'assinaturas_ativas': list(assinaturas_ativas[:5]),
+    }
+
+
+def obter_resumo(usuario):
+    """
+    Retorna o resumo do dashboard, calculando e guardando em cache
+    quando ainda não existir para o dia atual
+    """
+    hoje = date.today()
+    chave = chave_resumo(usuario.pk, hoje)
+
+    resumo = cache.get(chave)
+    if resumo is None:
+        resumo = calcular_resumo(usuario, hoje)
+        cache.set(chave, resumo, RESUMO_TIMEOUT)
+
+    return resumo
+
+
+def invalidar_resumo(usuario_id):
+    """Remove o resumo em cache do usuário"""
+    cache.delete(chave_resumo(usuario_id))
@@ -1,11 +1,25 @@
 """
-Signals para criação automática de categorias padrão
+Signals para criação automática de categorias padrão,
+invalidação do resumo do dashboard, gastos consolidados, versão
+do calendário, taxas de câmbio em memória e exclusões da
+sincronização
 """
 
-from django.db.models.signals import post_save
+from django.conf import settings
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import Categoria
+from .models import Assinatura, Categoria, Perfil, TaxaCambio
+from .calendario import registrar_alteracao_feed
+from .cambio import invalidar_taxas
+from .consolidado import (
+    reconstruir_consolidado,
+    registrar_alteracao,
+    registrar_exclusao,
+)
+from .resumo import invalidar_resumo
+from .sincronizacao import gravar_exclusoes, tocar_assinaturas
 
 
 # Categorias padrão que serão criadas para novos usuários
@@ -50,17 +64,157 @@ CATEGORIAS_PADRAO = [
 ]
 
 
+def criar_categorias_padrao_para(usuario):
+    """
+    Cria as categorias padrão do usuário com um único INSERT.
+    Nomes já existentes são ignorados (unique_together usuario/nome).
+    """
+    Categoria.objects.bulk_create(
+        [
+            Categoria(usuario=usuario, **categoria_data)
+            for categoria_data in CATEGORIAS_PADRAO
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def garantir_categorias_padrao(usuario):
+    """
+    No modo sob demanda (CATEGORIAS_PADRAO_SOB_DEMANDA), cria as
+    categorias padrão na primeira vez que o usuário precisa delas.
+    Um usuário que excluir todas as categorias as receberá de novo.
+    """
+    if not getattr(settings, 'CATEGORIAS_PADRAO_SOB_DEMANDA', False):
+        return
+    if not Categoria.objects.filter(usuario=usuario).exists():
+        criar_categorias_padrao_para(usuario)
+
+
 @receiver(post_save, sender=User)
 def criar_categorias_padrao(sender, instance, created, **kwargs):
     """
     Cria categorias padrão quando um novo usuário é criado
     """
-    if created:
-        # Criar categorias padrão para o novo usuário
-        for categoria_data in CATEGORIAS_PADRAO:
-            Categoria.objects.create(
-                usuario=instance,
-                nome=categoria_data["nome"],
-                descricao=categoria_data["descricao"],
-                cor=categoria_data["cor"],
-            )
+    if created and not getattr(
+        settings, 'CATEGORIAS_PADRAO_SOB_DEMANDA', False
+    ):
+        criar_categorias_padrao_para(instance)
+
+
+@receiver(post_save, sender=Assinatura)
+@receiver(post_delete, sender=Assinatura)
+@receiver(post_save, sender=Categoria)
+@receiver(post_delete, sender=Categoria)
+def invalidar_resumo_dashboard(sender, instance, **kwargs):
+    """
+    Descarta o resumo do dashboard em cache do dono do registro
+    """
+    invalidar_resumo(instance.usuario_id)
+
+
+@receiver(post_save, sender=Assinatura)
+def consolidar_assinatura_salva(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Aplica a diferença da assinatura salva nos gastos consolidados
+    """
+    registrar_alteracao(instance, created, update_fields)
+
+
+def _excluindo_usuario(origin):
+    """A exclusão em cascata partiu de um usuário (ou queryset de usuários)"""
+    modelo = getattr(origin, 'model', type(origin))
+    return issubclass(modelo, User)
+
+
+def _excluindo_em_lote(origin, modelo):
+    """
+    A exclusão partiu de um queryset do modelo, que refaz os gastos
+    consolidados uma vez por usuário e grava as exclusões de uma vez
+    (ver AssinaturaQuerySet.delete)
+    """
+    return isinstance(origin, QuerySet) and issubclass(origin.model, modelo)
+
+
+@receiver(post_delete, sender=Assinatura)
+def consolidar_assinatura_excluida(sender, instance, origin=None, **kwargs):
+    """
+    Desconta a assinatura excluída dos gastos consolidados
+    """
+    # Os gastos consolidados do usuário são excluídos na mesma cascata
+    if not (
+        _excluindo_usuario(origin)
+        or _excluindo_em_lote(origin, Assinatura)
+    ):
+        registrar_exclusao(instance)
+
+
+@receiver(post_delete, sender=Assinatura)
+def atualizar_calendario_exclusao(sender, instance, origin=None, **kwargs):
+    """
+    Exclusões não deixam data_atualizacao para trás: muda a versão
+    do calendário pelo próprio feed
+    """
+    if not (
+        _excluindo_usuario(origin)
+        or _excluindo_em_lote(origin, Assinatura)
+    ):
+        registrar_alteracao_feed(instance.usuario_id)
+
+
+@receiver(post_delete, sender=Categoria)
+def consolidar_categoria_excluida(sender, instance, origin=None, **kwargs):
+    """
+    As assinaturas da categoria ficam sem categoria (SET_NULL, sem
+    signals): recalcula os gastos consolidados do dono
+    """
+    if not (
+        _excluindo_usuario(origin)
+        or _excluindo_em_lote(origin, Categoria)
+    ):
+        reconstruir_consolidado([instance.usuario_id])
+
+
+@receiver(pre_delete, sender=Categoria)
+def tocar_assinaturas_da_categoria(sender, instance, origin=None, **kwargs):
+    """
+    As assinaturas da categoria vão ficar sem categoria: a
+    sincronização precisa enviá-las de novo
+    """
+    if not (
+        _excluindo_usuario(origin)
+        or _excluindo_em_lote(origin, Categoria)
+    ):
+        tocar_assinaturas([instance.pk])
+
+
+@receiver(post_delete, sender=Assinatura)
+@receiver(post_delete, sender=Categoria)
+def gravar_exclusao_sincronizacao(sender, instance, origin=None, **kwargs):
+    """
+    Deixa a Exclusao que avisa os clientes da sincronização (as
+    exclusões em lote gravam as suas de uma vez)
+    """
+    if not (
+        _excluindo_usuario(origin)
+        or _excluindo_em_lote(origin, sender)
+    ):
+        gravar_exclusoes(sender._meta.model_name, [
+            (instance.usuario_id, instance.pk)
+        ])
+
+
+@receiver(post_save, sender=TaxaCambio)
+@receiver(post_delete, sender=TaxaCambio)
+def invalidar_taxas_cambio(sender, **kwargs):
+    """
+    Relê as taxas na próxima conversão (neste processo; os demais
+    relêem quando vence CAMBIO_TTL)
+    """
+    invalidar_taxas()
+
+
+@receiver(post_save, sender=Perfil)
+def moeda_base_alterada(sender, instance, **kwargs):
+    """Resumo e calendário em cache estão na moeda base anterior"""
+    invalidar_resumo(instance.usuario_id)
+    registrar_alteracao_feed(instance.usuario_id)
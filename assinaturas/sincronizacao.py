@@ -0,0 +1,220 @@
+"""
+Sincronização incremental da API (GET api/sincronizar/?token=)
+
+O cliente guarda o token de cada resposta e o envia na próxima: recebe
+só as assinaturas e categorias alteradas depois dele (pela coluna
+data_atualizacao) e os ids excluídos desde então (Exclusao, gravada
+pelos signals e pelas exclusões em lote). Sem token vem tudo, sem
+exclusões.
+
+As mudanças das quatro origens (assinaturas, categorias e exclusões de
+cada uma) saem de uma única consulta: um UNION ALL de (data, tipo, id)
+em que cada parte percorre um índice (usuario, data, id) a partir do
+token, ordenado e limitado a TAMANHO_SINCRONIZACAO + 1 linhas. Só as
+linhas alteradas são lidas inteiras depois, então uma sondagem sem
+mudanças custa essa consulta e não devolve nada.
+
+O token é a posição (data, tipo, id) da última mudança entregue e não
+passa de agora - SINCRONIZACAO_MARGEM: uma transação ainda aberta pode
+gravar uma data_atualizacao anterior ao próprio commit. As mudanças
+mais recentes que isso voltam na sondagem seguinte; reaplicá-las não
+altera nada no cliente.
+
+As exclusões são apagadas depois de SINCRONIZACAO_RETENCAO dias
+(comando limpar_exclusoes); tokens mais antigos que isso são recusados
+e o cliente recomeça sem token.
+"""
+import base64
+import json
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import F, IntegerField, Value
+from django.utils import timezone
+
+from .api import CAMPOS_ASSINATURA, CAMPOS_CATEGORIA
+from .models import Assinatura, Categoria, Exclusao
+
+
+# Mudanças por resposta
+TAMANHO_SINCRONIZACAO = 500
+
+# Tipos de mudança, na ordem de desempate dentro da mesma data
+ASSINATURA, CATEGORIA, ASSINATURA_EXCLUIDA, CATEGORIA_EXCLUIDA = range(4)
+
+
+class TokenInvalido(Exception):
+    """Token que não foi gerado por sincronizar()"""
+
+
+class TokenExpirado(Exception):
+    """Token anterior às exclusões guardadas: sincronize do zero"""
+
+
+def codificar_token(posicao):
+    data, tipo, id = posicao
+    bruto = json.dumps([data.isoformat(), tipo, id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(bruto.encode()).decode().rstrip('=')
+
+
+def decodificar_token(token):
+    """Posição (data, tipo, id) do token; levanta TokenInvalido"""
+    try:
+        bruto = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        data, tipo, id = json.loads(bruto)
+        data = datetime.fromisoformat(data)
+    except (ValueError, TypeError):
+        raise TokenInvalido('Token inválido.')
+    if (
+        timezone.is_naive(data)
+        or not isinstance(tipo, int)
+        or not isinstance(id, int)
+    ):
+        raise TokenInvalido('Token inválido.')
+    return data, tipo, id
+
+
+def _mudancas(queryset, tipo, campo_data, campo_objeto, posicao):
+    """
+    (data, tipo, id, objeto) das linhas depois da `posicao`. A
+    comparação começa por `campo_data >=` para o banco percorrer o
+    índice só a partir do token.
+    """
+    if posicao is not None:
+        data, tipo_token, id_token = posicao
+        if tipo > tipo_token:
+            queryset = queryset.filter(**{f'{campo_data}__gte': data})
+        elif tipo < tipo_token:
+            queryset = queryset.filter(**{f'{campo_data}__gt': data})
+        else:
+            queryset = queryset.filter(**{f'{campo_data}__gte': data}).exclude(
+                **{campo_data: data, 'id__lte': id_token}
+            )
+    return queryset.order_by().annotate(
+        data=F(campo_data),
+        tipo=Value(tipo, output_field=IntegerField()),
+        objeto=F(campo_objeto),
+    ).values_list('data', 'tipo', 'id', 'objeto')
+
+
+def _consulta(usuario, posicao, limite):
+    partes = [
+        _mudancas(
+            Assinatura.objects.filter(usuario=usuario),
+            ASSINATURA, 'data_atualizacao', 'id', posicao,
+        ),
+        _mudancas(
+            Categoria.objects.filter(usuario=usuario),
+            CATEGORIA, 'data_atualizacao', 'id', posicao,
+        ),
+    ]
+    if posicao is not None:
+        # Quem começa do zero não tem o que remover
+        exclusoes = Exclusao.objects.filter(usuario=usuario)
+        partes += [
+            _mudancas(
+                exclusoes.filter(modelo='assinatura'),
+                ASSINATURA_EXCLUIDA, 'data_exclusao', 'objeto_id', posicao,
+            ),
+            _mudancas(
+                exclusoes.filter(modelo='categoria'),
+                CATEGORIA_EXCLUIDA, 'data_exclusao', 'objeto_id', posicao,
+            ),
+        ]
+    primeira, *demais = partes
+    return list(
+        primeira.union(*demais, all=True).order_by('data', 'tipo', 'id')[
+            :limite + 1
+        ]
+    )
+
+
+def sincronizar(usuario, token=None, limite=TAMANHO_SINCRONIZACAO):
+    """
+    Mudanças do usuário depois do `token`:
+    {'assinaturas': [...], 'categorias': [...],
+     'excluidas': {'assinaturas': [ids], 'categorias': [ids]},
+     'token': próximo token, 'mais': há mais mudanças já disponíveis}.
+    Levanta TokenInvalido ou TokenExpirado.
+    """
+    agora = timezone.now()
+    posicao = None
+    if token:
+        posicao = decodificar_token(token)
+        if posicao[0] < agora - timedelta(days=settings.SINCRONIZACAO_RETENCAO):
+            raise TokenExpirado('Token expirado; sincronize sem token.')
+
+    linhas = _consulta(usuario, posicao, limite)
+    mais = len(linhas) > limite
+    linhas = linhas[:limite]
+
+    ids = {tipo: [] for tipo in range(4)}
+    for _, tipo, _, objeto in linhas:
+        ids[tipo].append(objeto)
+
+    # Próxima posição: a última mudança entregue, se ainda há mais, ou
+    # agora; nos dois casos no máximo até a margem, e nunca para trás
+    limite_seguro = (
+        agora - timedelta(seconds=settings.SINCRONIZACAO_MARGEM), -1, 0
+    )
+    proxima = limite_seguro
+    if mais:
+        ultima = tuple(linhas[-1][:3])
+        mais = ultima <= limite_seguro
+        proxima = min(ultima, limite_seguro)
+    if posicao is not None:
+        proxima = max(proxima, posicao)
+
+    return {
+        'assinaturas': _ler(Assinatura, CAMPOS_ASSINATURA, ids[ASSINATURA]),
+        'categorias': _ler(Categoria, CAMPOS_CATEGORIA, ids[CATEGORIA]),
+        'excluidas': {
+            'assinaturas': ids[ASSINATURA_EXCLUIDA],
+            'categorias': ids[CATEGORIA_EXCLUIDA],
+        },
+        'token': codificar_token(proxima),
+        'mais': mais,
+    }
+
+
+def _ler(modelo, campos, ids):
+    """Linhas completas das mudanças (excluídas nesse meio tempo somem)"""
+    if not ids:
+        return []
+    return list(
+        modelo.objects.filter(id__in=ids).order_by('id').values(*campos)
+    )
+
+
+def gravar_exclusoes(modelo, excluidos):
+    """Grava as Exclusao de [(usuario_id, objeto_id)] em um INSERT"""
+    agora = timezone.now()
+    Exclusao.objects.bulk_create([
+        Exclusao(
+            usuario_id=usuario_id,
+            modelo=modelo,
+            objeto_id=objeto_id,
+            data_exclusao=agora,
+        )
+        for usuario_id, objeto_id in excluidos
+    ])
+
+
+def tocar_assinaturas(categorias):
+    """
+    Nova data_atualizacao para as assinaturas das `categorias` antes
+    da exclusão delas: o SET_NULL da categoria não passa por update()
+    """
+    if categorias:
+        Assinatura.objects.filter(categoria_id__in=categorias).update(
+            data_atualizacao=timezone.now()
+        )
+
+
+def limpar_exclusoes(dias=None):
+    """Apaga as exclusões com mais de `dias` dias. Retorna a quantidade."""
+    if dias is None:
+        dias = settings.SINCRONIZACAO_RETENCAO
+    limite = timezone.now() - timedelta(days=dias)
+    removidas, _ = Exclusao.objects.filter(data_exclusao__lt=limite).delete()
+    return removidas
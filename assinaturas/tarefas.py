@@ -0,0 +1,283 @@
+"""
+Fila de tarefas em segundo plano, guardada no próprio banco (Tarefa)
+
+As views enfileiram com enfileirar() e respondem na hora; o comando
+worker reserva as tarefas pendentes e executa a função registrada
+para o tipo com @registrar_tarefa. A reserva usa SELECT ... FOR UPDATE
+SKIP LOCKED quando o banco oferece (PostgreSQL); no SQLite, que
+serializa as escritas, um UPDATE condicional no status faz o mesmo
+papel: só um trabalhador consegue mudar a tarefa de PENDENTE para
+EXECUTANDO.
+
+Falhas são repetidas com espera exponencial até max_tentativas;
+ErroDefinitivo encerra a tarefa sem novas tentativas. Toda gravação
+da execução (progresso, desfecho, nova tentativa) é um UPDATE
+condicional à reserva (status, trabalhador e tentativas): uma execução
+devolvida à fila por liberar_abandonadas não sobrescreve a seguinte.
+Tarefas que gravam em partes (importação) guardam o progresso em
+resultado na mesma transação de cada parte, para a repetição continuar
+dali.
+"""
+import contextlib
+import io
+import logging
+import os
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .importacao import TAMANHO_LOTE, importar_csv
+from .models import Tarefa
+
+
+logger = logging.getLogger('assinaturas.tarefas')
+
+# Espera antes da tentativa n: ESPERA_BASE * 2 ** (n - 1), até ESPERA_MAXIMA
+ESPERA_BASE = 30
+ESPERA_MAXIMA = 60 * 60
+
+# Tarefas em execução há mais tempo que isso são dadas como abandonadas
+# (trabalhador encerrado no meio) e voltam para a fila
+TEMPO_LIMITE = 60 * 60
+
+# Funções registradas por tipo
+TIPOS = {}
+
+
+class ErroDefinitivo(Exception):
+    """Falha que não se resolve repetindo (ex.: arquivo inválido)"""
+
+
+class TarefaPerdida(Exception):
+    """Tarefa devolvida à fila (ou reservada de novo) durante a execução"""
+
+
+def registrar_tarefa(tipo):
+    """Registra a função que executa as tarefas do `tipo`"""
+    def registrar(funcao):
+        TIPOS[tipo] = funcao
+        return funcao
+    return registrar
+
+
+def enfileirar(tipo, usuario=None, max_tentativas=3, **parametros):
+    """Cria a tarefa pendente; `parametros` precisa ser serializável em JSON"""
+    if tipo not in TIPOS:
+        raise ValueError(f'Tipo de tarefa desconhecido: {tipo}.')
+    return Tarefa.objects.create(
+        tipo=tipo,
+        usuario=usuario,
+        parametros=parametros,
+        max_tentativas=max_tentativas,
+    )
+
+
+def espera(tentativas):
+    """Intervalo até a próxima tentativa depois de `tentativas` falhas"""
+    return timedelta(
+        seconds=min(ESPERA_BASE * 2 ** (tentativas - 1), ESPERA_MAXIMA)
+    )
+
+
+def reservar_tarefa(trabalhador):
+    """
+    Marca a próxima tarefa disponível como EXECUTANDO para o
+    `trabalhador` e a retorna (None se a fila estiver vazia)
+    """
+    agora = timezone.now()
+    disponiveis = Tarefa.objects.filter(
+        status='PENDENTE', executar_apos__lte=agora
+    ).order_by('executar_apos', 'id')
+    reserva = {
+        'status': 'EXECUTANDO',
+        'trabalhador': trabalhador,
+        'data_inicio': agora,
+        'tentativas': F('tentativas') + 1,
+    }
+
+    if connection.features.has_select_for_update_skip_locked:
+        # Linhas já travadas por outro trabalhador são puladas
+        with transaction.atomic():
+            pk = disponiveis.select_for_update(skip_locked=True).values_list(
+                'pk', flat=True
+            ).first()
+            if pk is None:
+                return None
+            Tarefa.objects.filter(pk=pk).update(**reserva)
+        return Tarefa.objects.get(pk=pk)
+
+    # Sem SKIP LOCKED: o UPDATE só altera a linha se ela ainda estiver
+    # PENDENTE; quem perder a disputa tenta a próxima candidata
+    for pk in disponiveis.values_list('pk', flat=True)[:10]:
+        if Tarefa.objects.filter(pk=pk, status='PENDENTE').update(**reserva):
+            return Tarefa.objects.get(pk=pk)
+    return None
+
+
+def _gravar(tarefa, **campos):
+    """
+    Grava `campos` se a tarefa ainda estiver reservada para esta
+    execução; senão levanta TarefaPerdida (desfazendo a transação em
+    que foi chamada, se houver)
+    """
+    atualizadas = Tarefa.objects.filter(
+        pk=tarefa.pk,
+        status='EXECUTANDO',
+        trabalhador=tarefa.trabalhador,
+        tentativas=tarefa.tentativas,
+    ).update(**campos)
+    if not atualizadas:
+        raise TarefaPerdida(f'Tarefa {tarefa.pk} liberada durante a execução.')
+    for campo, valor in campos.items():
+        setattr(tarefa, campo, valor)
+
+
+def _salvar_progresso(tarefa, progresso):
+    """Progresso parcial em resultado, na transação da parte gravada"""
+    _gravar(tarefa, resultado=progresso)
+
+
+def _finalizar(tarefa, status, **campos):
+    _gravar(tarefa, status=status, data_fim=timezone.now(), **campos)
+
+
+def executar_tarefa(tarefa):
+    """Executa a tarefa reservada e grava o resultado ou a falha"""
+    funcao = TIPOS.get(tarefa.tipo)
+    try:
+        try:
+            if funcao is None:
+                raise ErroDefinitivo(
+                    f'Tipo de tarefa desconhecido: {tarefa.tipo}.'
+                )
+            resultado = funcao(tarefa, **tarefa.parametros)
+        except ErroDefinitivo as erro:
+            _finalizar(tarefa, 'FALHOU', erro=str(erro))
+        except TarefaPerdida:
+            raise
+        except Exception as excecao:
+            # O traceback fica no log; a tarefa guarda só a mensagem
+            logger.exception('Falha na tarefa %s (%s)', tarefa.pk, tarefa.tipo)
+            erro = f'{type(excecao).__name__}: {excecao}'
+            if tarefa.tentativas < tarefa.max_tentativas:
+                _gravar(
+                    tarefa,
+                    status='PENDENTE',
+                    erro=erro,
+                    executar_apos=timezone.now() + espera(tarefa.tentativas),
+                )
+            else:
+                _finalizar(tarefa, 'FALHOU', erro=erro)
+        else:
+            _finalizar(tarefa, 'CONCLUIDA', resultado=resultado, erro='')
+    except TarefaPerdida:
+        # Quem tem a reserva agora é que grava o desfecho
+        logger.warning('Tarefa %s liberada durante a execução', tarefa.pk)
+    return tarefa
+
+
+def liberar_abandonadas(limite=TEMPO_LIMITE):
+    """
+    Devolve à fila as tarefas em execução há mais de `limite` segundos
+    (ou as encerra, se já esgotaram as tentativas). Retorna a quantidade.
+    """
+    agora = timezone.now()
+    antigas = Tarefa.objects.filter(
+        status='EXECUTANDO',
+        data_inicio__lt=agora - timedelta(seconds=limite),
+    )
+    liberadas = antigas.filter(tentativas__lt=F('max_tentativas')).update(
+        status='PENDENTE', executar_apos=agora, erro='Execução abandonada.'
+    )
+    # As importações encerradas aqui não vão mais ler o arquivo
+    for parametros in antigas.filter(tipo='importar_assinaturas').values_list(
+        'parametros', flat=True
+    ):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(parametros['arquivo'])
+    return liberadas + antigas.update(
+        status='FALHOU', data_fim=agora, erro='Execução abandonada.'
+    )
+
+
+def processar_fila(trabalhador, parar=None, intervalo=1.0, uma_vez=False):
+    """
+    Laço de um trabalhador: reserva e executa tarefas até `parar` (um
+    Event) ser sinalizado ou, com `uma_vez`, até a fila esvaziar.
+    Retorna a quantidade de tarefas executadas.
+    """
+    executadas = 0
+    while parar is None or not parar.is_set():
+        tarefa = reservar_tarefa(trabalhador)
+        if tarefa is None:
+            if uma_vez:
+                break
+            liberar_abandonadas()
+            if parar is not None:
+                parar.wait(intervalo)
+            continue
+        executar_tarefa(tarefa)
+        executadas += 1
+    return executadas
+
+
+# Tipos de tarefa
+
+@registrar_tarefa('importar_assinaturas')
+def importar_assinaturas(tarefa, arquivo, tamanho_lote=TAMANHO_LOTE):
+    """
+    Importa o CSV salvo pela view de importação (ver importacao.py).
+    O arquivo é mantido enquanto a tarefa ainda puder ser repetida, e
+    cada lote grava o progresso junto: a repetição continua do último
+    lote gravado em vez de importar tudo de novo.
+    """
+    try:
+        with open(arquivo, encoding='utf-8-sig', newline='') as texto:
+            relatorio = importar_csv(
+                tarefa.usuario,
+                texto,
+                tamanho_lote=tamanho_lote,
+                progresso=tarefa.resultado,
+                ao_gravar=lambda progresso: _salvar_progresso(tarefa, progresso),
+            )
+    except FileNotFoundError:
+        raise ErroDefinitivo('Arquivo da importação não encontrado.')
+    except UnicodeDecodeError:
+        os.remove(arquivo)
+        raise ErroDefinitivo('O arquivo deve estar em UTF-8.')
+    except ValueError as erro:
+        os.remove(arquivo)
+        raise ErroDefinitivo(str(erro))
+    except TarefaPerdida:
+        # A execução que tem a reserva ainda precisa do arquivo
+        raise
+    except Exception:
+        # Sem novas tentativas, o arquivo não será mais lido
+        if tarefa.tentativas >= tarefa.max_tentativas:
+            os.remove(arquivo)
+        raise
+    os.remove(arquivo)
+    return relatorio
+
+
+# Comandos de manutenção que podem ser enfileirados
+COMANDOS = (
+    'avancar_cobrancas',
+    'arquivar_cobrancas',
+    'enviar_lembretes',
+    'limpar_exclusoes',
+    'reconstruir_consolidado',
+)
+
+
+@registrar_tarefa('comando')
+def executar_comando(tarefa, nome, argumentos=()):
+    """Executa um dos COMANDOS, guardando a saída como resultado"""
+    if nome not in COMANDOS:
+        raise ErroDefinitivo(f'Comando não permitido: {nome}.')
+    saida = io.StringIO()
+    call_command(nome, *argumentos, stdout=saida)
+    return {'saida': saida.getvalue()}
@@ -1,3 +1,2714 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import random
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+from datetime import date, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from dateutil.relativedelta import relativedelta
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import F, Sum
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver, reverse
+from django.utils import timezone
+
+from .ciclos import MESES_POR_CICLO, cobrancas_ate, proxima_cobranca, somar_meses
+from .desempenho import limpar_histograma, obter_histograma
+from .consolidado import calcular_consolidado, reconstruir_consolidado
+from .historico import (
+    arquivar_cobrancas, cobrancas_vencidas, gasto_no_periodo, gasto_por_mes,
+    inicio_do_mes, registrar_cobrancas,
+)
+from . import api, importacao
+from .calendario import _dobrar, gerar_ics
+from .cambio import converter, fator, invalidar_taxas, ler_taxas, taxas_de_cambio
+from .importacao import TAMANHO_LOTE, importar_csv
+from .lembretes import enviar_lembretes
+from .models import (
+    Assinatura, Categoria, Cobranca, Exclusao, FeedCalendario,
+    GastoConsolidado, LembreteCobranca, Perfil, Tarefa, TaxaCambio,
+)
+from .models.assinatura import valor_anual_expressao, valor_mensal_expressao
+from .paginacao import paginar_keyset
+from .projecao import projetar, projetar_usuario
+from .resumo import chave_resumo, obter_resumo
+from .signals import CATEGORIAS_PADRAO
+from .sincronizacao import codificar_token, sincronizar
+from .tarefas import (
+    ESPERA_BASE, TIPOS, ErroDefinitivo, enfileirar, executar_tarefa,
+    liberar_abandonadas, registrar_tarefa, reservar_tarefa,
+)
+
+
+def criar_assinaturas(usuario, quantidade, **extra):
+    """Cria `quantidade` assinaturas variando ciclo, valor e categoria"""
+    categorias = list(Categoria.objects.filter(usuario=usuario))
+    ciclos = [ciclo for ciclo, _ in Assinatura.CICLO_CHOICES]
+    hoje = date.today()
+    assinaturas = []
+    for i in range(quantidade):
+        data = hoje + timedelta(days=i % 40)
+        dados = {
+            'usuario': usuario,
+            'categoria': categorias[i % len(categorias)] if categorias else None,
+            'nome': f'Assinatura {i}',
+            'valor': Decimal('10.00') + i,
+            'ciclo_pagamento': ciclos[i % len(ciclos)],
+            'data_primeira_cobranca': data,
+            'data_proxima_cobranca': data,
+            'dia_vencimento': data.day,
+        }
+        dados.update(extra)
+        assinaturas.append(Assinatura(**dados))
+    return Assinatura.objects.bulk_create(assinaturas)
+
+
+def proxima_cobranca_iterativa(data_base, ciclo_pagamento, alvo):
+    """Implementação original: soma um ciclo por vez até passar do alvo"""
+    delta = relativedelta(months=MESES_POR_CICLO[ciclo_pagamento])
+    proxima_data = data_base
+    while proxima_data < alvo:
+        proxima_data += delta
+    return proxima_data
+
+
+def proxima_cobranca_ancorada(data_base, ciclo_pagamento, alvo, dia):
+    """Referência sem deriva: cada ciclo é contado a partir da data base"""
+    meses = MESES_POR_CICLO[ciclo_pagamento]
+    ciclos = 0
+    proxima_data = data_base
+    while proxima_data < alvo:
+        ciclos += 1
+        proxima_data = data_base + relativedelta(
+            months=ciclos * meses, day=dia
+        )
+    return proxima_data
+
+
+class ProximaCobrancaTests(SimpleTestCase):
+    """Compara o cálculo direto com o laço ciclo a ciclo"""
+
+    def setUp(self):
+        self.rng = random.Random(2024)
+
+    def datas_aleatorias(self, quantidade, dia_maximo=31):
+        inicio = date(1990, 1, 1)
+        for _ in range(quantidade):
+            data_base = inicio + timedelta(days=self.rng.randint(0, 14000))
+            if data_base.day > dia_maximo:
+                data_base = data_base.replace(day=dia_maximo)
+            alvo = data_base + timedelta(days=self.rng.randint(-60, 4000))
+            yield data_base, alvo
+
+    def test_igual_ao_laco_original_para_todos_os_ciclos(self):
+        for ciclo, _ in Assinatura.CICLO_CHOICES:
+            for data_base, alvo in self.datas_aleatorias(1000, dia_maximo=28):
+                self.assertEqual(
+                    proxima_cobranca(data_base, ciclo, alvo),
+                    proxima_cobranca_iterativa(data_base, ciclo, alvo),
+                    (ciclo, data_base, alvo),
+                )
+
+    def test_fim_de_mes_nao_deriva(self):
+        for ciclo, _ in Assinatura.CICLO_CHOICES:
+            for data_base, alvo in self.datas_aleatorias(1000):
+                self.assertEqual(
+                    proxima_cobranca(data_base, ciclo, alvo),
+                    proxima_cobranca_ancorada(
+                        data_base, ciclo, alvo, data_base.day
+                    ),
+                    (ciclo, data_base, alvo),
+                )
+
+    def test_resultado_e_primeira_data_nao_anterior_ao_alvo(self):
+        for ciclo, _ in Assinatura.CICLO_CHOICES:
+            for data_base, alvo in self.datas_aleatorias(500):
+                resultado = proxima_cobranca(data_base, ciclo, alvo)
+                self.assertGreaterEqual(resultado, alvo)
+                if resultado != data_base:
+                    anterior = somar_meses(
+                        resultado, -MESES_POR_CICLO[ciclo], data_base.day
+                    )
+                    self.assertLess(anterior, alvo)
+
+    def test_dia_vencimento_31_em_fevereiro(self):
+        self.assertEqual(
+            proxima_cobranca(date(2025, 1, 31), 'MENSAL', date(2025, 2, 1)),
+            date(2025, 2, 28),
+        )
+        self.assertEqual(
+            proxima_cobranca(date(2024, 1, 31), 'MENSAL', date(2024, 2, 1)),
+            date(2024, 2, 29),
+        )
+        # Base já ajustada para fevereiro volta ao dia 31 em março
+        self.assertEqual(
+            proxima_cobranca(
+                date(2025, 2, 28), 'MENSAL', date(2025, 3, 1),
+                dia_vencimento=31,
+            ),
+            date(2025, 3, 31),
+        )
+
+    def test_metodo_do_model_usa_dia_vencimento(self):
+        assinatura = Assinatura(
+            ciclo_pagamento='MENSAL',
+            data_primeira_cobranca=date(2025, 1, 31),
+            data_proxima_cobranca=date(2025, 2, 28),
+            dia_vencimento=31,
+        )
+        self.assertEqual(
+            assinatura.calcular_proxima_cobranca(hoje=date(2025, 4, 15)),
+            date(2025, 4, 30),
+        )
+        self.assertEqual(
+            assinatura.calcular_proxima_cobranca(hoje=date(2025, 2, 10)),
+            date(2025, 2, 28),
+        )
+
+
+class DashboardTests(TestCase):
+    """Totais do dashboard e número fixo de queries"""
+
+    def setUp(self):
+        cache.clear()
+        taxas_de_cambio()  # taxas em memória, fora da contagem
+        self.usuario = User.objects.create_user('dash', password='senha123')
+        self.client.force_login(self.usuario)
+
+    def test_totais_iguais_aos_metodos_do_model(self):
+        criar_assinaturas(self.usuario, 12)
+        criar_assinaturas(self.usuario, 3, status='CANCELADA')
+        ativas = Assinatura.objects.filter(
+            usuario=self.usuario, status='ATIVA'
+        )
+
+        response = self.client.get(reverse('dashboard'))
+
+        self.assertEqual(response.context['total_assinaturas'], 12)
+        self.assertEqual(
+            response.context['gasto_anual'],
+            sum(a.valor_anual() for a in ativas),
+        )
+        self.assertAlmostEqual(
+            response.context['gasto_mensal'],
+            sum(a.valor_mensal() for a in ativas),
+            places=10,
+        )
+
+    def test_numero_de_queries_nao_depende_do_volume(self):
+        # sessão, usuário, moeda base, totais, próximas cobranças,
+        # categorias, top 5
+        criar_assinaturas(self.usuario, 5)
+        with self.assertNumQueries(7):
+            self.client.get(reverse('dashboard'))
+
+        criar_assinaturas(self.usuario, 100)
+        cache.clear()
+        with self.assertNumQueries(7):
+            self.client.get(reverse('dashboard'))
+
+
+class ResumoCacheTests(TestCase):
+    """Cache do resumo do dashboard e sua invalidação via signals"""
+
+    def setUp(self):
+        cache.clear()
+        self.usuario = User.objects.create_user('cache', password='senha123')
+        self.client.force_login(self.usuario)
+        criar_assinaturas(self.usuario, 5)
+
+    def test_segunda_visita_usa_cache(self):
+        self.client.get(reverse('dashboard'))
+        # apenas sessão e usuário
+        with self.assertNumQueries(2):
+            self.client.get(reverse('dashboard'))
+
+    def test_salvar_assinatura_invalida_resumo(self):
+        obter_resumo(self.usuario)
+        assinatura = Assinatura.objects.filter(usuario=self.usuario).first()
+        assinatura.status = 'CANCELADA'
+        assinatura.save()
+
+        self.assertIsNone(cache.get(chave_resumo(self.usuario.pk)))
+        self.assertEqual(obter_resumo(self.usuario)['total_assinaturas'], 4)
+
+    def test_excluir_assinatura_invalida_resumo(self):
+        obter_resumo(self.usuario)
+        Assinatura.objects.filter(usuario=self.usuario).first().delete()
+        self.assertEqual(obter_resumo(self.usuario)['total_assinaturas'], 4)
+
+    def test_alterar_categoria_invalida_resumo(self):
+        obter_resumo(self.usuario)
+        categoria = Categoria.objects.filter(usuario=self.usuario).first()
+        categoria.cor = '#000000'
+        categoria.save()
+        self.assertIsNone(cache.get(chave_resumo(self.usuario.pk)))
+
+    def test_alteracoes_em_massa_invalidam_resumo(self):
+        assinaturas = Assinatura.objects.filter(usuario=self.usuario)
+        modelo = assinaturas.first()
+
+        obter_resumo(self.usuario)
+        assinaturas.filter(pk=modelo.pk).update(status='CANCELADA')
+        self.assertEqual(obter_resumo(self.usuario)['total_assinaturas'], 4)
+
+        Assinatura.objects.bulk_create([Assinatura(
+            usuario=self.usuario, categoria=modelo.categoria, nome='Nova',
+            valor=Decimal('10.00'), ciclo_pagamento='MENSAL',
+            data_primeira_cobranca=modelo.data_primeira_cobranca,
+            data_proxima_cobranca=modelo.data_proxima_cobranca,
+        )])
+        self.assertEqual(obter_resumo(self.usuario)['total_assinaturas'], 5)
+
+        # Sem campo do consolidado: não reconstrói, mas o nome aparece
+        obter_resumo(self.usuario)
+        modelo.nome = 'Renomeada'
+        Assinatura.objects.bulk_update([modelo], ['nome'])
+        self.assertIsNone(cache.get(chave_resumo(self.usuario.pk)))
+
+        obter_resumo(self.usuario)
+        assinaturas.filter(pk=modelo.pk).delete()
+        self.assertIsNone(cache.get(chave_resumo(self.usuario.pk)))
+
+    def test_chave_muda_na_virada_do_dia(self):
+        hoje = date.today()
+        self.assertNotEqual(
+            chave_resumo(self.usuario.pk, hoje),
+            chave_resumo(self.usuario.pk, hoje + timedelta(days=1)),
+        )
+
+
+class PaginacaoKeysetTests(TestCase):
+    """Paginação por cursor da listagem de assinaturas"""
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('pag', password='senha123')
+        self.client.force_login(self.usuario)
+        # valores repetidos para exercitar o desempate por id
+        criar_assinaturas(self.usuario, 60, valor=Decimal('19.90'))
+        criar_assinaturas(self.usuario, 20)
+
+    def percorrer(self, order_by):
+        ids, cursor, paginas = [], None, 0
+        while True:
+            params = {'order_by': order_by}
+            if cursor:
+                params['cursor'] = cursor
+            response = self.client.get(reverse('assinaturas'), params)
+            pagina = response.context['pagina']
+            ids.extend(a.pk for a in pagina['itens'])
+            paginas += 1
+            cursor = pagina['proxima']
+            if not cursor:
+                return ids, paginas, pagina
+
+    def test_percorre_todas_as_ordenacoes_sem_repetir(self):
+        campos = ['-data_criacao', 'nome', 'valor', 'data_proxima_cobranca']
+        for order_by in campos:
+            with self.subTest(order_by=order_by):
+                ids, paginas, _ = self.percorrer(order_by)
+                esperado = list(
+                    Assinatura.objects.filter(usuario=self.usuario)
+                    .order_by(order_by, f"{'-' if order_by[0] == '-' else ''}id")
+                    .values_list('id', flat=True)
+                )
+                self.assertEqual(ids, esperado)
+                self.assertEqual(paginas, 4)
+
+    def test_pagina_anterior(self):
+        primeira = self.client.get(
+            reverse('assinaturas'), {'order_by': 'valor'}
+        ).context['pagina']
+        segunda = self.client.get(
+            reverse('assinaturas'),
+            {'order_by': 'valor', 'cursor': primeira['proxima']},
+        ).context['pagina']
+        volta = self.client.get(
+            reverse('assinaturas'),
+            {'order_by': 'valor', 'cursor': segunda['anterior']},
+        ).context['pagina']
+
+        self.assertEqual(volta['itens'], primeira['itens'])
+        self.assertIsNone(volta['anterior'])
+
+    def test_pagina_n_custa_o_mesmo_que_a_primeira(self):
+        with CaptureQueriesContext(connection) as primeira:
+            pagina = self.client.get(reverse('assinaturas')).context['pagina']
+        with CaptureQueriesContext(connection) as seguinte:
+            self.client.get(reverse('assinaturas'), {'cursor': pagina['proxima']})
+        self.assertEqual(len(primeira), len(seguinte))
+        for query in seguinte.captured_queries:
+            self.assertNotIn('OFFSET', query['sql'])
+
+    def test_cursor_invalido_volta_para_primeira_pagina(self):
+        response = self.client.get(reverse('assinaturas'), {'cursor': '???'})
+        self.assertEqual(len(response.context['pagina']['itens']), 25)
+
+    def test_categoria_invalida_e_ignorada(self):
+        for categoria in ('abc', '1.5', '-1'):
+            response = self.client.get(
+                reverse('assinaturas'), {'categoria': categoria}
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.context['categoria_filter'], '')
+            self.assertEqual(len(response.context['pagina']['itens']), 25)
+
+
+class OrdenacaoListagemTests(TestCase):
+    """Ordenações declaradas e índices que as atendem"""
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('ord', password='senha123')
+        self.client.force_login(self.usuario)
+        criar_assinaturas(self.usuario, 3)
+
+    def test_cada_ordenacao_tem_indice_iniciado_por_usuario(self):
+        indices = {
+            indice.name: indice.fields
+            for indice in Assinatura._meta.indexes
+        }
+        for ordenacao, _ in Assinatura.ORDENACAO_CHOICES:
+            with self.subTest(ordenacao=ordenacao):
+                campos = indices[Assinatura.ORDENACAO_INDICES[ordenacao]]
+                self.assertEqual(
+                    campos,
+                    ['usuario', ordenacao.lstrip('-'), 'id'],
+                )
+
+    def test_ordenacao_desconhecida_usa_padrao(self):
+        for order_by in ['usuario__password', 'descricao', '?', '']:
+            with self.subTest(order_by=order_by):
+                response = self.client.get(
+                    reverse('assinaturas'), {'order_by': order_by}
+                )
+                self.assertEqual(
+                    response.context['order_by'],
+                    Assinatura.ORDENACAO_PADRAO,
+                )
+
+    def test_cursor_de_outra_ordenacao_e_ignorado(self):
+        cursor = paginar_keyset(
+            Assinatura.objects.filter(usuario=self.usuario), 'nome', tamanho=1
+        )['proxima']
+        pagina = paginar_keyset(
+            Assinatura.objects.filter(usuario=self.usuario), 'valor',
+            cursor=cursor, tamanho=1,
+        )
+        self.assertIsNone(pagina['anterior'])
+
+
+class ConsultasSemNMaisUmTests(TestCase):
+    """Categoria carregada junto das assinaturas (sem uma query por linha)"""
+
+    def setUp(self):
+        self.usuario = User.objects.create_user(
+            'n1', password='senha123', is_staff=True, is_superuser=True
+        )
+        self.client.force_login(self.usuario)
+
+    def test_listagem_com_500_assinaturas(self):
+        criar_assinaturas(self.usuario, 500)
+        # sessão, usuário, totais, página (com categoria), filtro de categorias
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('assinaturas'))
+        self.assertContains(response, 'bi-tag-fill')
+
+    def test_queryset_compartilhado(self):
+        criar_assinaturas(self.usuario, 3)
+        criar_assinaturas(self.usuario, 2, status='PAUSADA')
+        outro = User.objects.create_user('outro', password='senha123')
+        criar_assinaturas(outro, 4)
+
+        assinaturas = Assinatura.objects.for_user(self.usuario)
+        self.assertEqual(assinaturas.count(), 5)
+        self.assertEqual(assinaturas.ativas().count(), 3)
+        with self.assertNumQueries(1):
+            nomes = [a.categoria.nome for a in assinaturas.with_categoria()]
+        self.assertEqual(len(nomes), 5)
+
+    def test_admin_nao_depende_do_volume(self):
+        criar_assinaturas(self.usuario, 5)
+        url = reverse('admin:assinaturas_assinatura_changelist')
+        with CaptureQueriesContext(connection) as poucas:
+            self.client.get(url)
+        criar_assinaturas(self.usuario, 50)
+        # Mais categorias (as padrão de cada usuário) no filtro lateral
+        for i in range(10):
+            User.objects.create_user(f'dono{i}')
+        with CaptureQueriesContext(connection) as muitas:
+            response = self.client.get(url)
+        self.assertEqual(len(poucas), len(muitas))
+        self.assertContains(response, 'Streaming (dono9)')
+
+        url = reverse('admin:assinaturas_categoria_changelist')
+        with CaptureQueriesContext(connection) as categorias:
+            self.client.get(url)
+        self.assertLess(len(categorias), 15)
+
+
+class ValoresNormalizadosTests(TestCase):
+    """Colunas valor_mensal_normalizado/valor_anual_normalizado"""
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('norm', password='senha123')
+
+    def assertNormalizado(self, assinatura):
+        assinatura.refresh_from_db()
+        self.assertEqual(
+            assinatura.valor_anual_normalizado, assinatura.valor_anual()
+        )
+        self.assertEqual(
+            assinatura.valor_mensal_normalizado,
+            assinatura.valor_mensal().quantize(Decimal('0.0001')),
+        )
+
+    def test_save_calcula_valores(self):
+        assinatura = Assinatura.objects.create(
+            usuario=self.usuario,
+            nome='Anual',
+            valor=Decimal('31.00'),
+            ciclo_pagamento='TRIMESTRAL',
+            data_primeira_cobranca=date.today(),
+        )
+        self.assertNormalizado(assinatura)
+
+        assinatura.ciclo_pagamento = 'ANUAL'
+        assinatura.save(update_fields=['ciclo_pagamento'])
+        self.assertNormalizado(assinatura)
+
+    def test_bulk_create_e_bulk_update(self):
+        assinaturas = criar_assinaturas(self.usuario, 8)
+        for assinatura in assinaturas:
+            self.assertNormalizado(assinatura)
+
+        for assinatura in assinaturas:
+            assinatura.valor = Decimal('7.77')
+        Assinatura.objects.bulk_update(assinaturas, ['valor'])
+        for assinatura in assinaturas:
+            self.assertNormalizado(assinatura)
+
+    def test_update_em_massa_recalcula_no_banco(self):
+        assinaturas = criar_assinaturas(self.usuario, 40)
+        Assinatura.objects.filter(usuario=self.usuario).update(
+            valor=F('valor') + Decimal('0.01')
+        )
+        for assinatura in assinaturas:
+            self.assertNormalizado(assinatura)
+
+        Assinatura.objects.filter(usuario=self.usuario).update(
+            ciclo_pagamento='SEMESTRAL'
+        )
+        for assinatura in assinaturas:
+            self.assertNormalizado(assinatura)
+
+        Assinatura.objects.filter(usuario=self.usuario).update(valor='31.00')
+        for assinatura in assinaturas:
+            self.assertNormalizado(assinatura)
+
+    def test_expressao_sql_igual_ao_python(self):
+        assinaturas = criar_assinaturas(self.usuario, 48)
+        Assinatura.objects.update(
+            valor_mensal_normalizado=valor_mensal_expressao(),
+            valor_anual_normalizado=valor_anual_expressao(),
+        )
+        for assinatura in assinaturas:
+            self.assertNormalizado(assinatura)
+
+
+class AvancarCobrancasCommandTests(TestCase):
+    """Comando avancar_cobrancas"""
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('rolar', password='senha123')
+        self.hoje = date.today()
+        base = self.hoje - timedelta(days=400)
+        self.vencidas = criar_assinaturas(
+            self.usuario, 7,
+            data_primeira_cobranca=base, data_proxima_cobranca=base,
+            dia_vencimento=base.day,
+        )
+        self.pausada = criar_assinaturas(
+            self.usuario, 1, status='PAUSADA',
+            data_primeira_cobranca=base, data_proxima_cobranca=base,
+        )[0]
+
+    def executar(self, *args):
+        saida = StringIO()
+        call_command('avancar_cobrancas', *args, stdout=saida)
+        return saida.getvalue()
+
+    def test_avanca_vencidas_em_lotes(self):
+        saida = self.executar('--batch-size', '3')
+
+        self.assertIn('Lote 3: 1 assinaturas', saida)
+        for assinatura in self.vencidas:
+            esperado = assinatura.calcular_proxima_cobranca(hoje=self.hoje)
+            assinatura.refresh_from_db()
+            self.assertEqual(assinatura.data_proxima_cobranca, esperado)
+            self.assertGreaterEqual(assinatura.data_proxima_cobranca, self.hoje)
+
+        self.pausada.refresh_from_db()
+        self.assertLess(self.pausada.data_proxima_cobranca, self.hoje)
+
+    def test_dry_run_nao_grava(self):
+        saida = self.executar('--dry-run', '--batch-size', '2')
+
+        self.assertIn('7 assinaturas seriam avançadas em 4 lote(s)', saida)
+        self.assertEqual(
+            Assinatura.objects.filter(
+                data_proxima_cobranca__lt=self.hoje
+            ).count(),
+            8,
+        )
+
+    def test_registra_cobrancas_puladas(self):
+        self.executar()
+
+        for assinatura in self.vencidas:
+            esperadas = cobrancas_ate(
+                assinatura.data_proxima_cobranca,
+                assinatura.ciclo_pagamento,
+                self.hoje,
+                assinatura.dia_vencimento,
+            )
+            self.assertEqual(
+                list(assinatura.cobrancas.order_by('data').values_list(
+                    'data', 'valor'
+                )),
+                [(data, assinatura.valor) for data in esperadas],
+            )
+        self.assertFalse(self.pausada.cobrancas.exists())
+
+        # Reexecutar não duplica o histórico
+        total = Cobranca.objects.count()
+        self.executar()
+        self.assertEqual(Cobranca.objects.count(), total)
+
+    def test_numero_de_queries_por_lote(self):
+        # por lote: SELECT, SAVEPOINT, INSERT, UPDATE, RELEASE; mais o SELECT final
+        with self.assertNumQueries(5 * 3 + 1):
+            self.executar('--batch-size', '3')
+
+
+class CategoriasPadraoTests(TestCase):
+    """Criação das categorias padrão no cadastro ou sob demanda"""
+
+    def test_cadastro_cria_categorias_com_um_insert(self):
+        with CaptureQueriesContext(connection) as consultas:
+            usuario = User.objects.create(username='novo')
+        inserts = [
+            q for q in consultas.captured_queries
+            if q['sql'].startswith('INSERT')
+            and '"assinaturas_categoria"' in q['sql']
+        ]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(
+            Categoria.objects.filter(usuario=usuario).count(),
+            len(CATEGORIAS_PADRAO),
+        )
+
+    def test_signup_cria_usuario_e_categorias(self):
+        self.client.post(reverse('signup'), {
+            'username': 'cadastro',
+            'email': 'cadastro@example.com',
+            'password': 'senha-forte-123',
+            'password_confirm': 'senha-forte-123',
+        })
+        usuario = User.objects.get(username='cadastro')
+        self.assertEqual(usuario.categorias.count(), len(CATEGORIAS_PADRAO))
+
+    @override_settings(CATEGORIAS_PADRAO_SOB_DEMANDA=True)
+    def test_modo_sob_demanda(self):
+        usuario = User.objects.create_user('preguicoso', password='senha123')
+        self.assertFalse(usuario.categorias.exists())
+
+        self.client.force_login(usuario)
+        response = self.client.get(reverse('criar_assinatura'))
+        self.assertEqual(
+            len(response.context['categorias']), len(CATEGORIAS_PADRAO)
+        )
+
+        # Segunda visita não recria nada
+        self.client.get(reverse('categorias'))
+        self.assertEqual(usuario.categorias.count(), len(CATEGORIAS_PADRAO))
+
+
+class GerarDadosCargaCommandTests(TestCase):
+    """Comando gerar_dados_carga"""
+
+    def gerar(self, *args):
+        call_command(
+            'gerar_dados_carga', '--usuarios', '12', '--batch-size', '5',
+            '--assinaturas-por-usuario', '6', *args, stdout=StringIO(),
+        )
+        return list(
+            Assinatura.objects.order_by('usuario__username', 'id').values_list(
+                'usuario__username', 'nome', 'valor', 'ciclo_pagamento',
+                'status', 'data_primeira_cobranca', 'categoria__nome',
+            )
+        )
+
+    def test_gera_usuarios_categorias_e_assinaturas(self):
+        dados = self.gerar()
+
+        self.assertEqual(
+            User.objects.filter(username__startswith='carga_').count(), 12
+        )
+        self.assertEqual(
+            Categoria.objects.count(), 12 * len(CATEGORIAS_PADRAO)
+        )
+        self.assertTrue(dados)
+        self.assertFalse(
+            Assinatura.objects.filter(valor_anual_normalizado=0).exists()
+        )
+
+    def test_mesma_seed_gera_os_mesmos_dados(self):
+        primeira = self.gerar('--seed', '7')
+        segunda = self.gerar('--seed', '7', '--limpar')
+        self.assertEqual(primeira, segunda)
+
+
+@override_settings(
+    DESEMPENHO_ATIVO=True,
+    DESEMPENHO_CACHE='default',
+    DESEMPENHO_INTERVALO=0,
+)
+class MedicaoDesempenhoTests(TestCase):
+    """Middleware de consultas/tempo e histograma por URL"""
+
+    def setUp(self):
+        cache.clear()
+        limpar_histograma()
+        taxas_de_cambio()
+        self.usuario = User.objects.create_user('medido', password='senha123')
+        self.client.force_login(self.usuario)
+
+    def test_cabecalho_server_timing(self):
+        response = self.client.get(reverse('dashboard'))
+
+        self.assertRegex(
+            response['Server-Timing'],
+            r'^db;dur=[\d.]+;desc="7 consultas", view;dur=[\d.]+$',
+        )
+
+    @override_settings(DESEMPENHO_ATIVO=False)
+    def test_desativado_por_padrao(self):
+        response = self.client.get(reverse('dashboard'))
+
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(obter_histograma(), {})
+
+    def test_histograma_por_nome_de_url(self):
+        self.client.get(reverse('dashboard'))
+        self.client.get(reverse('dashboard'))
+        self.client.get(reverse('assinaturas'))
+
+        histograma = obter_histograma()
+        self.assertEqual(histograma['dashboard']['requisicoes'], 2)
+        self.assertEqual(histograma['dashboard']['consultas_max'], 7)
+        self.assertEqual(sum(histograma['dashboard']['faixas']), 2)
+        self.assertEqual(histograma['assinaturas']['requisicoes'], 1)
+
+        saida = StringIO()
+        call_command('desempenho_views', '--json', '--limpar', stdout=saida)
+        self.assertIn('"dashboard"', saida.getvalue())
+        self.assertEqual(obter_histograma(), {})
+
+    @override_settings(DESEMPENHO_LIMITE_CONSULTAS=3)
+    def test_requisicao_acima_do_limite_vai_para_o_log(self):
+        with self.assertLogs('assinaturas.desempenho', 'WARNING') as logs:
+            self.client.get(reverse('dashboard'))
+
+        self.assertIn('7 consultas', logs.output[0])
+        self.assertIn('assinaturas_assinatura', logs.output[0])
+
+
+class RegressaoConsultasTests(TestCase):
+    """
+    Número de queries por view fixo em 10, 1.000 e 10.000 assinaturas
+    por usuário. Uma view que passe a fazer uma query por linha (N+1)
+    ou a carregar todas as assinaturas em Python falha aqui.
+    """
+
+    TAMANHOS = (10, 1000, 10000)
+    # Tempo máximo da maior massa em relação à menor (com piso em segundos)
+    FATOR_TEMPO = 20
+    PISO_TEMPO = 0.25
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuarios = {}
+        for tamanho in cls.TAMANHOS:
+            usuario = User.objects.create_user(
+                f'volume_{tamanho}', password='senha123'
+            )
+            canceladas = tamanho // 10
+            criar_assinaturas(usuario, tamanho - canceladas)
+            criar_assinaturas(usuario, canceladas, status='CANCELADA')
+            cls.usuarios[tamanho] = usuario
+
+    def medir(self, usuario, requisicao, preparar, repeticoes):
+        """Retorna (queries, menor tempo) da requisição feita pelo usuário"""
+        self.client.force_login(usuario)
+        consultas = set()
+        tempos = []
+        for _ in range(repeticoes):
+            cache.clear()
+            # Dados da requisição (ids, formulário) buscados fora da medição
+            dados = preparar(usuario) if preparar else None
+            with CaptureQueriesContext(connection) as capturadas:
+                inicio = time.perf_counter()
+                response = requisicao(dados)
+                tempos.append(time.perf_counter() - inicio)
+            self.assertLess(response.status_code, 400)
+            consultas.add(len(capturadas))
+        self.assertEqual(len(consultas), 1)
+        return consultas.pop(), min(tempos)
+
+    def verificar(self, limite, requisicao, preparar=None, repeticoes=3):
+        # Aquecimento: templates e URLs carregados fora da medição
+        self.medir(self.usuarios[self.TAMANHOS[0]], requisicao, preparar, 1)
+
+        medicoes = {
+            tamanho: self.medir(usuario, requisicao, preparar, repeticoes)
+            for tamanho, usuario in self.usuarios.items()
+        }
+        consultas = {tamanho: m[0] for tamanho, m in medicoes.items()}
+        tempos = {tamanho: m[1] for tamanho, m in medicoes.items()}
+
+        self.assertEqual(
+            set(consultas.values()), {limite},
+            f'queries por volume de dados: {consultas}',
+        )
+        menor, maior = self.TAMANHOS[0], self.TAMANHOS[-1]
+        self.assertLess(
+            tempos[maior],
+            max(tempos[menor] * self.FATOR_TEMPO, self.PISO_TEMPO),
+            f'tempo por volume de dados: {tempos}',
+        )
+
+    def dados_formulario(self, usuario):
+        return {
+            'nome': 'Nova',
+            'valor': '19,90',
+            'ciclo_pagamento': 'MENSAL',
+            'data_primeira_cobranca': date.today().isoformat(),
+            'categoria': usuario.categorias.values_list('id', flat=True)[0],
+            'status': 'ATIVA',
+        }
+
+    def dados_edicao(self, usuario):
+        """Mesma categoria, status e ciclo; valor diferente a cada repetição"""
+        assinatura = usuario.assinaturas.values(
+            'id', 'valor', 'categoria_id', 'status', 'ciclo_pagamento'
+        )[0]
+        return {
+            **self.dados_formulario(usuario),
+            'id': assinatura['id'],
+            'valor': str(assinatura['valor'] + 1).replace('.', ','),
+            'categoria': assinatura['categoria_id'],
+            'status': assinatura['status'],
+            'ciclo_pagamento': assinatura['ciclo_pagamento'],
+        }
+
+    def primeira_assinatura(self, usuario):
+        return usuario.assinaturas.values_list('id', flat=True)[0]
+
+    def test_dashboard(self):
+        # sessão, usuário, moeda base, totais, próximas cobranças,
+        # categorias, top 5
+        self.verificar(7, lambda _: self.client.get(reverse('dashboard')))
+
+    def test_listar_assinaturas(self):
+        # sessão, usuário, totais, página (com categoria), categorias
+        self.verificar(5, lambda _: self.client.get(reverse('assinaturas')))
+        self.verificar(5, lambda _: self.client.get(
+            reverse('assinaturas'),
+            {'status': 'ATIVA', 'search': 'Assinatura', 'order_by': '-valor'},
+        ))
+
+    def test_listar_categorias(self):
+        self.verificar(4, lambda _: self.client.get(reverse('categorias')))
+
+    def test_configuracoes(self):
+        # sessão, usuário, moeda base, totais das assinaturas, total de
+        # categorias, feed do calendário
+        self.verificar(6, lambda _: self.client.get(reverse('configuracoes')))
+
+    def test_criar_assinatura(self):
+        self.verificar(3, lambda _: self.client.get(
+            reverse('criar_assinatura')
+        ))
+        # sessão, usuário, categoria, INSERT, gasto consolidado
+        self.verificar(5, lambda dados: self.client.post(
+            reverse('criar_assinatura'), dados
+        ), self.dados_formulario)
+
+    def test_editar_assinatura(self):
+        self.verificar(4, lambda id: self.client.get(
+            reverse('editar_assinatura', args=[id])
+        ), self.primeira_assinatura)
+        # sessão, usuário, assinatura, categoria, UPDATE, gasto consolidado
+        self.verificar(6, lambda dados: self.client.post(
+            reverse('editar_assinatura', args=[dados['id']]), dados
+        ), self.dados_edicao)
+
+    def test_deletar_assinatura(self):
+        # sessão, usuário, assinatura, histórico (SET NULL), lembretes
+        # (CASCADE), DELETE, gasto consolidado, versão do calendário,
+        # exclusão da sincronização
+        self.verificar(9, lambda id: self.client.post(
+            reverse('deletar_assinatura', args=[id])
+        ), self.primeira_assinatura)
+
+
+class BenchmarkCommandTests(TestCase):
+    """Comando benchmark: JSON de saída e comparação entre execuções"""
+
+    def setUp(self):
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        self.saida = os.path.join(diretorio.name, 'atual.json')
+        self.base = os.path.join(diretorio.name, 'base.json')
+        taxas_de_cambio()
+
+    def executar(self, *args):
+        call_command(
+            'benchmark', '--tamanhos', '3', '--repeticoes', '1',
+            '--numero', '1', *args, stdout=StringIO(),
+        )
+
+    def test_grava_resultados_sem_deixar_dados(self):
+        self.executar('--saida', self.saida)
+
+        with open(self.saida, encoding='utf-8') as arquivo:
+            resultados = json.load(arquivo)['resultados']
+        self.assertIn('modelo.calcular_proxima_cobranca', resultados)
+        self.assertIn('signals.criar_categorias_padrao', resultados)
+        self.assertEqual(resultados['url.dashboard[3]']['consultas'], 7)
+        self.assertEqual(resultados['url.dashboard[3]']['status'], 200)
+        self.assertEqual(
+            {nome: r['status'] for nome, r in resultados.items()
+             if nome.startswith('url.') and r['status'] >= 500},
+            {},
+        )
+        self.assertFalse(User.objects.exists())
+
+    def test_rotas_cobrem_todas_as_urls(self):
+        from benchmarks.paginas import criar_massa, montar_rotas
+
+        rotas = montar_rotas(criar_massa(3), repeticoes=1)
+        cobertas = {nome.split(':')[0] for nome, _, _ in rotas}
+        urls = {
+            nome for nome in get_resolver().reverse_dict
+            if isinstance(nome, str)
+        }
+        self.assertEqual(urls - cobertas, set())
+
+    def test_sinaliza_benchmark_mais_lento_que_a_base(self):
+        self.executar('--apenas', 'micro', '--saida', self.base)
+        with open(self.base, encoding='utf-8') as arquivo:
+            execucao = json.load(arquivo)
+        execucao['resultados']['modelo.valor_anual']['mediana_us'] = 1e-6
+        with open(self.base, 'w', encoding='utf-8') as arquivo:
+            json.dump(execucao, arquivo)
+
+        with self.assertRaisesMessage(CommandError, '1 benchmark(s)'):
+            self.executar('--apenas', 'micro', '--comparar', self.base,
+                          '--limite', '1000000')
+
+
+class ProjecaoTests(TestCase):
+    """Projeção mês a mês igual a avançar um ciclo por vez"""
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('projecao', password='senha123')
+        self.client.force_login(self.usuario)
+        taxas_de_cambio()
+
+    def assinaturas_aleatorias(self, quantidade, hoje, seed=3):
+        rng = random.Random(seed)
+        ciclos = list(MESES_POR_CICLO)
+        assinaturas = []
+        for i in range(quantidade):
+            proxima = hoje + timedelta(days=rng.randint(-500, 800))
+            assinaturas.append({
+                'id': i,
+                'nome': f'Assinatura {i}',
+                'valor_base': Decimal(rng.randint(100, 99999)) / 100,
+                'ciclo_pagamento': rng.choice(ciclos),
+                'data_proxima_cobranca': proxima,
+                'dia_vencimento': rng.choice([proxima.day, 29, 30, 31]),
+                'categoria_id': i % 5 or None,
+                'categoria__nome': f'Categoria {i % 5}' if i % 5 else None,
+                'categoria__cor': '#123456' if i % 5 else None,
+            })
+        return assinaturas
+
+    def test_cobrancas_iguais_a_avancar_ciclo_a_ciclo(self):
+        hoje = date(2025, 1, 31)
+        assinaturas = self.assinaturas_aleatorias(300, hoje)
+        resultado = projetar(assinaturas, hoje, 24, detalhar=True)
+
+        esperadas = []
+        for a in assinaturas:
+            data = proxima_cobranca(
+                a['data_proxima_cobranca'], a['ciclo_pagamento'], hoje,
+                a['dia_vencimento'],
+            )
+            base, dia = data, a['dia_vencimento']
+            while data <= resultado['fim']:
+                esperadas.append((data, a['id'], a['valor_base']))
+                data = proxima_cobranca(
+                    base, a['ciclo_pagamento'], data + timedelta(days=1), dia
+                )
+        projetadas = [
+            (c['data'], c['assinatura_id'], c['valor'])
+            for mes in resultado['meses']
+            for c in mes['cobrancas']
+        ]
+        self.assertEqual(sorted(projetadas), sorted(esperadas))
+
+        for mes in resultado['meses']:
+            self.assertEqual(
+                mes['total'], sum(c['valor'] for c in mes['cobrancas'])
+            )
+            self.assertEqual(
+                mes['total'], sum(c['total'] for c in mes['categorias'])
+            )
+        self.assertEqual(resultado['total'], sum(v for _, _, v in esperadas))
+
+    def test_ciclos_no_horizonte_de_12_meses(self):
+        hoje = date(2025, 3, 10)
+        assinaturas = [
+            {
+                'id': i, 'nome': ciclo, 'valor_base': Decimal('12.00'),
+                'ciclo_pagamento': ciclo, 'data_proxima_cobranca': hoje,
+                'dia_vencimento': hoje.day, 'categoria_id': None,
+                'categoria__nome': None, 'categoria__cor': None,
+            }
+            for i, ciclo in enumerate(MESES_POR_CICLO)
+        ]
+        resultado = projetar(assinaturas, hoje, 12)
+
+        # 12 mensais + 4 trimestrais + 2 semestrais + 1 anual
+        self.assertEqual(resultado['total'], Decimal('12.00') * 19)
+        self.assertEqual(resultado['meses'][0]['total'], Decimal('48.00'))
+        self.assertEqual(resultado['meses'][1]['total'], Decimal('12.00'))
+        self.assertEqual(resultado['categorias'][0]['nome'], 'Sem categoria')
+
+    def test_10_mil_assinaturas_em_24_meses(self):
+        hoje = date(2025, 6, 15)
+        assinaturas = self.assinaturas_aleatorias(10000, hoje)
+        inicio = time.perf_counter()
+        projetar(assinaturas, hoje, 24)
+        self.assertLess(time.perf_counter() - inicio, 0.1)
+
+    def test_views_em_consultas_fixas(self):
+        criar_assinaturas(self.usuario, 30)
+        criar_assinaturas(self.usuario, 5, status='CANCELADA')
+
+        # sessão, usuário, moeda base, assinaturas ativas com categoria
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('projecao'), {'meses': 24})
+        self.assertEqual(len(response.context['projecao']['meses']), 24)
+
+        with self.assertNumQueries(4):
+            response = self.client.get(
+                reverse('projecao_json'), {'meses': 'x', 'detalhar': '1'}
+            )
+        dados = response.json()
+        self.assertEqual(len(dados['meses']), 12)
+        self.assertIn('cobrancas', dados['meses'][0])
+
+
+class GastoConsolidadoTests(TestCase):
+    """Manutenção incremental igual à reconstrução a partir das assinaturas"""
+
+    CAMPOS = (
+        'usuario_id', 'categoria_id', 'status', 'ciclo_pagamento', 'moeda',
+        'quantidade', 'valor_mensal', 'valor_anual',
+    )
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('consolidado', password='senha123')
+        self.outro = User.objects.create_user('outro', password='senha123')
+        self.categorias = list(self.usuario.categorias.order_by('nome'))
+
+    def linhas(self):
+        return set(GastoConsolidado.objects.filter(
+            quantidade__gt=0
+        ).values_list(*self.CAMPOS))
+
+    def assertConsolidadoCorreto(self):
+        esperado = {
+            tuple(grupo[campo] for campo in self.CAMPOS)
+            for grupo in calcular_consolidado()
+        }
+        self.assertEqual(self.linhas(), esperado)
+
+    def criar(self, **extra):
+        dados = {
+            'usuario': self.usuario,
+            'nome': 'Assinatura',
+            'valor': Decimal('29.90'),
+            'ciclo_pagamento': 'MENSAL',
+            'data_primeira_cobranca': date.today(),
+            'categoria': self.categorias[0],
+        }
+        dados.update(extra)
+        return Assinatura.objects.create(**dados)
+
+    def test_saves_e_exclusoes_aleatorios(self):
+        rng = random.Random(5)
+        ciclos = [ciclo for ciclo, _ in Assinatura.CICLO_CHOICES]
+        status = [codigo for codigo, _ in Assinatura.STATUS_CHOICES]
+        ids = [self.criar(valor=Decimal(i + 1)).pk for i in range(20)]
+
+        for _ in range(150):
+            assinatura = Assinatura.objects.get(pk=rng.choice(ids))
+            operacao = rng.random()
+            if operacao < 0.1:
+                ids.remove(assinatura.pk)
+                assinatura.delete()
+                ids.append(self.criar(valor=Decimal(rng.randint(1, 500))).pk)
+                continue
+            assinatura.valor = Decimal(rng.randint(100, 99999)) / 100
+            assinatura.status = rng.choice(status)
+            assinatura.ciclo_pagamento = rng.choice(ciclos)
+            assinatura.categoria = rng.choice(self.categorias + [None])
+            assinatura.moeda = rng.choice(['BRL', 'USD'])
+            if operacao < 0.3:
+                assinatura.usuario = rng.choice([self.usuario, self.outro])
+                assinatura.categoria = None
+            assinatura.save()
+
+        self.assertConsolidadoCorreto()
+
+    def test_operacoes_em_lote_reconstroem(self):
+        assinaturas = criar_assinaturas(self.usuario, 30)
+        self.assertConsolidadoCorreto()
+
+        Assinatura.objects.filter(pk__in=[a.pk for a in assinaturas[:10]]).update(
+            status='CANCELADA'
+        )
+        self.assertConsolidadoCorreto()
+
+        for assinatura in assinaturas[10:20]:
+            assinatura.valor += 5
+            assinatura.usuario = self.outro
+            assinatura.categoria = None
+        Assinatura.objects.bulk_update(
+            assinaturas[10:20], ['valor', 'usuario', 'categoria']
+        )
+        self.assertConsolidadoCorreto()
+
+        Assinatura.objects.filter(pk__in=[a.pk for a in assinaturas[20:]]).delete()
+        self.assertConsolidadoCorreto()
+
+    def test_exclusao_de_categoria_e_usuario(self):
+        criar_assinaturas(self.usuario, 12)
+        criar_assinaturas(self.outro, 5)
+
+        self.categorias[0].delete()
+        self.assertConsolidadoCorreto()
+
+        self.usuario.delete()
+        self.assertConsolidadoCorreto()
+        self.assertFalse(GastoConsolidado.objects.filter(usuario_id=self.usuario.pk).exists())
+
+    def test_save_parcial_sem_campos_de_valor_nao_consulta(self):
+        assinatura = self.criar()
+        assinatura.observacoes = 'nota'
+        with self.assertNumQueries(1):
+            assinatura.save(update_fields=['observacoes'])
+
+    def test_comando_reconstroi_divergencias(self):
+        criar_assinaturas(self.usuario, 10)
+        GastoConsolidado.objects.update(quantidade=F('quantidade') + 1)
+
+        with self.assertRaises(CommandError):
+            call_command('reconstruir_consolidado', '--verificar', stdout=StringIO())
+
+        saida = StringIO()
+        call_command('reconstruir_consolidado', stdout=saida)
+        self.assertIn('divergente', saida.getvalue())
+        self.assertConsolidadoCorreto()
+        call_command('reconstruir_consolidado', '--verificar', stdout=StringIO())
+
+    def test_resumo_usa_consolidado(self):
+        self.criar(valor=Decimal('120.00'), ciclo_pagamento='ANUAL')
+        self.criar(valor=Decimal('10.00'), status='CANCELADA')
+        resumo = obter_resumo(self.usuario)
+        self.assertEqual(resumo['total_assinaturas'], 1)
+        self.assertEqual(resumo['gasto_mensal'], Decimal('10'))
+
+
+class EstatisticasScriptTests(TestCase):
+    """scripts/ver_estatisticas.py: agregações e modo --usuarios em fluxo"""
+
+    def setUp(self):
+        invalidar_taxas()
+        self.addCleanup(invalidar_taxas)
+        # b e d, sem assinaturas ativas, ficam no meio e no fim dos ids
+        self.a = User.objects.create_user('a_est')
+        self.b = User.objects.create_user('b_est')
+        self.c = User.objects.create_user('c_est')
+        self.d = User.objects.create_user('d_est', is_active=False)
+        self.criar(self.a, 'A1', '25.00', 'MENSAL')
+        self.criar(self.a, 'A2', '120.00', 'ANUAL')
+        self.criar(self.c, 'C1', '60.00', 'TRIMESTRAL')
+        self.criar(self.c, 'C2', '99.00', 'MENSAL', status='PAUSADA')
+
+    def criar(self, usuario, nome, valor, ciclo, **extra):
+        Assinatura.objects.create(
+            usuario=usuario,
+            categoria=usuario.categorias.get(nome='Streaming'),
+            nome=nome,
+            valor=Decimal(valor),
+            ciclo_pagamento=ciclo,
+            data_primeira_cobranca=date.today(),
+            **extra,
+        )
+
+    def test_coletar_estatisticas(self):
+        from scripts.ver_estatisticas import coletar_estatisticas
+
+        estatisticas = coletar_estatisticas()
+        self.assertEqual(
+            estatisticas['usuarios'], {'total': 4, 'ativos': 3, 'inativos': 1}
+        )
+        self.assertEqual(estatisticas['assinaturas'], {
+            'total': 4, 'ativas': 3, 'pausadas': 1, 'canceladas': 0,
+        })
+        self.assertEqual(estatisticas['categorias']['total'], 4 * len(CATEGORIAS_PADRAO))
+        self.assertEqual(
+            estatisticas['categorias']['mais_usadas'],
+            [{'nome': 'Streaming', 'assinaturas': 3}],
+        )
+        financeiro = estatisticas['financeiro']
+        self.assertEqual(financeiro['total_mensal'], 55.0)
+        self.assertEqual(financeiro['total_anual'], 660.0)
+        self.assertEqual(financeiro['media_por_usuario_mensal'], 27.5)
+        self.assertEqual(
+            [(a['nome'], a['valor_mensal']) for a in financeiro['mais_caras']],
+            [('A1', 25.0), ('C1', 20.0), ('A2', 10.0)],
+        )
+        self.assertEqual(
+            estatisticas['ciclos'], {'MENSAL': 1, 'ANUAL': 1, 'TRIMESTRAL': 1}
+        )
+        self.assertEqual(
+            [(u['username'], u['assinaturas'], u['gasto_mensal'])
+             for u in estatisticas['usuarios_top']],
+            [('a_est', 2, 35.0), ('c_est', 1, 20.0)],
+        )
+
+    def test_iterar_usuarios_detalhados(self):
+        from scripts.ver_estatisticas import iterar_usuarios_detalhados
+
+        # chunk_size=1: a combinação dos fluxos atravessa vários lotes
+        usuarios = list(iterar_usuarios_detalhados(chunk_size=1))
+        self.assertEqual(
+            [
+                (u['username'], u['assinaturas_ativas'], u['gasto_mensal'])
+                for u in usuarios
+            ],
+            [
+                ('a_est', 2, 35.0),
+                ('b_est', 0, 0.0),
+                ('c_est', 1, 20.0),
+                ('d_est', 0, 0.0),
+            ],
+        )
+        self.assertEqual(
+            [a['nome'] for a in usuarios[0]['assinaturas']], ['A1', 'A2']
+        )
+        self.assertEqual(usuarios[2]['assinaturas'][0]['categoria'], 'Streaming')
+        self.assertEqual(usuarios[1]['assinaturas'], [])
+        self.assertEqual(usuarios[1]['categorias'], len(CATEGORIAS_PADRAO))
+
+
+class HistoricoCobrancasTests(TestCase):
+    """Consultas por período somando cobranças detalhadas e arquivadas"""
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('historico', password='senha123')
+        self.outro = User.objects.create_user('outro', password='senha123')
+        rng = random.Random(11)
+        self.cobrancas = []
+        inicio = date(2023, 1, 1)
+        for usuario in (self.usuario, self.outro):
+            for i in range(400):
+                self.cobrancas.append(Cobranca(
+                    usuario=usuario,
+                    data=inicio + timedelta(days=rng.randint(0, 900)),
+                    valor=Decimal(rng.randint(100, 9999)) / 100,
+                ))
+        registrar_cobrancas(self.cobrancas)
+
+    def esperado(self, inicio, fim):
+        return sum(
+            (c.valor for c in self.cobrancas
+             if c.usuario == self.usuario and inicio <= c.data <= fim),
+            Decimal('0'),
+        )
+
+    def test_gasto_no_periodo_e_por_mes(self):
+        inicio, fim = date(2023, 3, 10), date(2024, 2, 20)
+        self.assertEqual(
+            gasto_no_periodo(self.usuario, inicio, fim),
+            {'BRL': self.esperado(inicio, fim)},
+        )
+
+        meses = gasto_por_mes(self.usuario, inicio, fim)
+        self.assertEqual(len(meses), 12)
+        self.assertEqual(meses[0]['mes'], date(2023, 3, 1))
+        self.assertEqual(
+            sum(m['totais'].get('BRL', 0) for m in meses),
+            self.esperado(inicio, fim),
+        )
+
+    def test_totais_separados_por_moeda(self):
+        registrar_cobrancas([
+            Cobranca(usuario=self.usuario, data=date(2026, 1, 5),
+                     valor=Decimal('10.00'), moeda='USD'),
+            Cobranca(usuario=self.usuario, data=date(2026, 1, 9),
+                     valor=Decimal('3.00'), moeda='USD'),
+            Cobranca(usuario=self.usuario, data=date(2026, 1, 9),
+                     valor=Decimal('7.00')),
+        ])
+        inicio, fim = date(2026, 1, 1), date(2026, 1, 31)
+        esperado = {'USD': Decimal('13.00'), 'BRL': Decimal('7.00')}
+        self.assertEqual(gasto_no_periodo(self.usuario, inicio, fim), esperado)
+        self.assertEqual(gasto_por_mes(self.usuario, inicio, fim), [
+            {'mes': inicio, 'quantidade': 3, 'totais': esperado},
+        ])
+
+        arquivar_cobrancas(date(2026, 2, 1))
+        self.assertEqual(gasto_no_periodo(self.usuario, inicio, fim), esperado)
+        self.assertEqual(
+            gasto_por_mes(self.usuario, inicio, fim)[0]['totais'], esperado
+        )
+
+    def test_arquivar_preserva_totais_mensais(self):
+        inicio, fim = date(2023, 1, 1), date(2025, 6, 30)
+        antes = gasto_por_mes(self.usuario, inicio, fim)
+
+        arquivados = arquivar_cobrancas(date(2024, 7, 15))
+        self.assertEqual(arquivados[0][0], date(2023, 1, 1))
+        self.assertEqual(arquivados[-1][0], date(2024, 6, 1))
+        self.assertFalse(Cobranca.objects.filter(data__lt=date(2024, 7, 1)).exists())
+        self.assertTrue(Cobranca.objects.filter(data__gte=date(2024, 7, 1)).exists())
+
+        self.assertEqual(gasto_por_mes(self.usuario, inicio, fim), antes)
+        self.assertEqual(
+            gasto_no_periodo(self.usuario, inicio, fim),
+            {'BRL': self.esperado(inicio, fim)},
+        )
+
+        # Mês já arquivado: o resumo é definitivo
+        registrar_cobrancas([Cobranca(
+            usuario=self.usuario, data=date(2023, 1, 5), valor=Decimal('1.00')
+        )])
+        self.assertEqual(gasto_por_mes(self.usuario, inicio, fim), antes)
+        arquivar_cobrancas(date(2024, 7, 15))
+        self.assertFalse(Cobranca.objects.filter(data__lt=date(2024, 7, 1)).exists())
+        self.assertEqual(gasto_por_mes(self.usuario, inicio, fim), antes)
+
+    def test_consulta_por_periodo_usa_indice(self):
+        plano = Cobranca.objects.filter(
+            usuario=self.usuario, data__gte=date(2023, 1, 1),
+            data__lte=date(2023, 12, 31),
+        ).explain()
+        self.assertIn('cobranca_usr_data_idx', plano)
+
+    def test_cobranca_registrada_e_imutavel(self):
+        cobranca = Cobranca.objects.filter(usuario=self.usuario).first()
+        cobranca.valor = Decimal('1.00')
+        with self.assertRaises(ValueError):
+            cobranca.save()
+
+    def test_comando_arquivar_mantem_meses_recentes(self):
+        recente = Cobranca.objects.create(
+            usuario=self.usuario, data=date.today(), valor=Decimal('5.00')
+        )
+        saida = StringIO()
+        call_command('arquivar_cobrancas', '--meses', '1', stdout=saida)
+
+        self.assertIn('arquivadas', saida.getvalue())
+        self.assertEqual(list(Cobranca.objects.all()), [recente])
+        self.assertEqual(
+            gasto_no_periodo(self.usuario, date(2023, 1, 1), date.today()),
+            {'BRL': self.esperado(date(2023, 1, 1), date.today()) + recente.valor},
+        )
+
+    def test_comando_arquivar_duas_vezes_nao_duplica(self):
+        hoje = date.today()
+        assinatura = Assinatura.objects.create(
+            usuario=self.usuario,
+            nome='Antiga',
+            valor=Decimal('20.00'),
+            ciclo_pagamento='MENSAL',
+            data_primeira_cobranca=somar_meses(hoje, -6),
+            data_proxima_cobranca=somar_meses(hoje, -6),
+        )
+        vencidas = cobrancas_vencidas(assinatura, hoje)
+        registrar_cobrancas(vencidas)
+        inicio = date(2023, 1, 1)
+        antes = gasto_por_mes(self.usuario, inicio, hoje)
+
+        call_command('arquivar_cobrancas', '--meses', '1', stdout=StringIO())
+        # As mesmas cobranças de novo, já sem as linhas que as barravam
+        registrar_cobrancas(cobrancas_vencidas(assinatura, hoje))
+        self.assertEqual(gasto_por_mes(self.usuario, inicio, hoje), antes)
+        call_command('arquivar_cobrancas', '--meses', '1', stdout=StringIO())
+
+        self.assertEqual(gasto_por_mes(self.usuario, inicio, hoje), antes)
+        self.assertFalse(Cobranca.objects.filter(
+            data__lt=somar_meses(inicio_do_mes(hoje), -1)
+        ).exists())
+
+    def test_atualizar_proxima_cobranca_registra_historico(self):
+        hoje = date.today()
+        assinatura = Assinatura.objects.create(
+            usuario=self.usuario,
+            nome='Atrasada',
+            valor=Decimal('20.00'),
+            moeda='EUR',
+            ciclo_pagamento='MENSAL',
+            data_primeira_cobranca=somar_meses(hoje, -3),
+            data_proxima_cobranca=somar_meses(hoje, -3),
+        )
+        for _ in range(2):
+            assinatura.atualizar_proxima_cobranca()
+        self.assertGreaterEqual(assinatura.data_proxima_cobranca, hoje)
+        self.assertEqual(
+            list(assinatura.cobrancas.order_by('data').values_list(
+                'data', 'valor', 'moeda'
+            )),
+            [
+                (somar_meses(hoje, -meses), Decimal('20.00'), 'EUR')
+                for meses in (3, 2, 1)
+            ],
+        )
+
+
+class ExportacaoTests(TestCase):
+    """Exportação em fluxo com os mesmos filtros da listagem"""
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('exportar', password='senha123')
+        self.client.force_login(self.usuario)
+        criar_assinaturas(self.usuario, 30)
+        criar_assinaturas(self.usuario, 5, status='CANCELADA', nome='Cancelada, "antiga"')
+        criar_assinaturas(User.objects.create_user('outro'), 5)
+
+    def baixar(self, nome, **params):
+        response = self.client.get(reverse(nome), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, response.getvalue().decode('utf-8')
+
+    def test_csv_com_filtros_e_ordenacao_da_listagem(self):
+        categoria = self.usuario.categorias.order_by('nome').first()
+        response, conteudo = self.baixar(
+            'exportar_assinaturas',
+            status='ATIVA', categoria=categoria.id, order_by='-valor',
+        )
+        self.assertIn('attachment; filename="assinaturas.csv"', response['Content-Disposition'])
+
+        linhas = list(csv.DictReader(StringIO(conteudo.lstrip('\ufeff'))))
+        esperadas = Assinatura.objects.filter(
+            usuario=self.usuario, status='ATIVA', categoria=categoria
+        ).order_by('-valor', '-id')
+        self.assertEqual(
+            [int(linha['id']) for linha in linhas],
+            list(esperadas.values_list('id', flat=True)),
+        )
+        self.assertEqual({linha['categoria'] for linha in linhas}, {categoria.nome})
+
+    def test_json_preserva_texto_com_virgulas_e_aspas(self):
+        _, conteudo = self.baixar(
+            'exportar_assinaturas', formato='json', status='CANCELADA'
+        )
+        dados = json.loads(conteudo)
+        self.assertEqual(len(dados), 5)
+        self.assertEqual(dados[0]['nome'], 'Cancelada, "antiga"')
+
+        _, conteudo = self.baixar('exportar_assinaturas', formato='json', search='inexistente')
+        self.assertEqual(json.loads(conteudo), [])
+
+    def test_categoria_invalida_e_ignorada(self):
+        _, todas = self.baixar('exportar_assinaturas')
+        for categoria in ('abc', '1.5'):
+            _, conteudo = self.baixar('exportar_assinaturas', categoria=categoria)
+            self.assertEqual(conteudo, todas)
+
+    def test_consultas_nao_crescem_com_o_volume(self):
+        # sessão, usuário e um SELECT com a categoria em JOIN
+        with self.assertNumQueries(3):
+            self.baixar('exportar_assinaturas')
+
+    def test_categorias_com_contagem(self):
+        _, conteudo = self.baixar('exportar_categorias')
+        linhas = list(csv.DictReader(StringIO(conteudo.lstrip('\ufeff'))))
+        self.assertEqual(len(linhas), self.usuario.categorias.count())
+        self.assertEqual(sum(int(linha['assinaturas']) for linha in linhas), 35)
+        self.assertEqual(sum(int(linha['assinaturas_ativas']) for linha in linhas), 30)
+
+
+class ImportacaoTests(TestCase):
+    """Importação por CSV com as regras do formulário e relatório por linha"""
+
+    CSV = (
+        'nome,categoria,valor,ciclo_pagamento,status,data_primeira_cobranca\n'
+        'Netflix,streaming,"39,90",MENSAL,ATIVA,2025-01-10\n'
+        'Spotify,,21.90,mensal,,10/02/2025\n'
+        ',Streaming,10,MENSAL,ATIVA,2025-01-10\n'
+        'Curso,Educação,abc,SEMANAL,ATIVA,2025-13-40\n'
+        'Jornal,Inexistente,0,ANUAL,ATIVA,2025-01-10\n'
+    )
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('importar', password='senha123')
+        self.client.force_login(self.usuario)
+
+    def test_valida_e_importa_com_relatorio_por_linha(self):
+        relatorio = importar_csv(self.usuario, StringIO(self.CSV))
+
+        self.assertEqual(relatorio['importadas'], 2)
+        self.assertEqual(relatorio['total_erros'], 3)
+        erros = dict(relatorio['erros'])
+        self.assertEqual(erros[4], ['Campo obrigatório: nome.'])
+        self.assertEqual(len(erros[5]), 3)  # valor, data e ciclo
+        self.assertIn('Categoria inválida: Inexistente.', erros[6])
+        self.assertTrue(any(e.startswith('valor:') for e in erros[6]))
+
+        netflix = Assinatura.objects.get(usuario=self.usuario, nome='Netflix')
+        self.assertEqual(netflix.valor, Decimal('39.90'))
+        self.assertEqual(netflix.categoria.nome, 'Streaming')
+        self.assertEqual(netflix.dia_vencimento, 10)
+        self.assertEqual(
+            netflix.data_proxima_cobranca,
+            netflix.calcular_proxima_cobranca(date(2025, 1, 10)),
+        )
+        self.assertEqual(netflix.valor_mensal_normalizado, Decimal('39.90'))
+
+        spotify = Assinatura.objects.get(usuario=self.usuario, nome='Spotify')
+        self.assertEqual(spotify.data_primeira_cobranca, date(2025, 2, 10))
+        self.assertEqual((spotify.status, spotify.categoria), ('ATIVA', None))
+
+        self.assertEqual(obter_resumo(self.usuario)['total_assinaturas'], 2)
+
+    def test_valores_nao_finitos_e_moeda_invalida(self):
+        arquivo = StringIO(
+            'nome,valor,moeda,ciclo_pagamento,data_primeira_cobranca\n'
+            'A,NaN,BRL,MENSAL,2025-01-10\n'
+            'B,Infinity,BRL,MENSAL,2025-01-10\n'
+            'C,-inf,BRL,MENSAL,2025-01-10\n'
+            'D,10,US,MENSAL,2025-01-10\n'
+            'E,10,1,MENSAL,2025-01-10\n'
+            'F,10,usd,MENSAL,2025-01-10\n'
+        )
+        relatorio = importar_csv(self.usuario, arquivo)
+        self.assertEqual(relatorio['importadas'], 1)
+        self.assertEqual(dict(relatorio['erros']), {
+            2: ['Valor inválido: NaN.'],
+            3: ['Valor inválido: Infinity.'],
+            4: ['Valor inválido: -inf.'],
+            5: ['Moeda inválida: US.'],
+            6: ['Moeda inválida: 1.'],
+        })
+        self.assertEqual(
+            self.usuario.assinaturas.get().moeda, 'USD'
+        )
+
+        # Pela view síncrona: relatório, não erro 500
+        arquivo = SimpleUploadedFile(
+            'assinaturas.csv',
+            b'nome,valor,ciclo_pagamento,data_primeira_cobranca\n'
+            b'G,NaN,MENSAL,2025-01-10\n',
+            'text/csv',
+        )
+        response = self.client.post(
+            reverse('importar_assinaturas'), {'arquivo': arquivo}
+        )
+        self.assertLess(response.status_code, 500)
+
+    def test_linha_com_colunas_a_mais(self):
+        arquivo = StringIO(
+            'nome,valor,ciclo_pagamento,data_primeira_cobranca\n'
+            'A,10,MENSAL,2025-01-10,extra,outra\n'
+            'B,10,MENSAL,2025-01-10,\n'
+            'C,10,MENSAL\n'
+        )
+        relatorio = importar_csv(self.usuario, arquivo)
+        self.assertEqual(relatorio['importadas'], 1)
+        self.assertEqual(dict(relatorio['erros']), {
+            2: ['Colunas a mais: 2 além do cabeçalho.'],
+            4: ['Campo obrigatório: data_primeira_cobranca.'],
+        })
+
+        arquivo = SimpleUploadedFile(
+            'assinaturas.csv',
+            b'nome,valor,ciclo_pagamento,data_primeira_cobranca\n'
+            b'D,10,MENSAL,2025-01-10,extra\n',
+            'text/csv',
+        )
+        response = self.client.post(
+            reverse('importar_assinaturas'), {'arquivo': arquivo}
+        )
+        self.assertContains(response, 'Colunas a mais: 1 além do cabeçalho.')
+
+    def test_erro_de_codificacao_nao_deixa_lotes_gravados(self):
+        linhas = ''.join(
+            f'S{i},10,MENSAL,2025-01-10\n' for i in range(TAMANHO_LOTE + 10)
+        )
+        conteudo = (
+            'nome,valor,ciclo_pagamento,data_primeira_cobranca\n' + linhas
+        ).encode('utf-8') + b'Caf\xe9,10,MENSAL,2025-01-10\n'
+        arquivo = SimpleUploadedFile('assinaturas.csv', conteudo, 'text/csv')
+        response = self.client.post(
+            reverse('importar_assinaturas'), {'arquivo': arquivo}
+        )
+        self.assertContains(response, 'Nenhuma assinatura foi importada.')
+        self.assertFalse(self.usuario.assinaturas.exists())
+
+    def test_reimporta_a_exportacao(self):
+        criar_assinaturas(self.usuario, 20)
+        conteudo = self.client.get(reverse('exportar_assinaturas')).getvalue()
+        destino = User.objects.create_user('destino')
+
+        relatorio = importar_csv(destino, StringIO(conteudo.decode('utf-8-sig')))
+        self.assertEqual((relatorio['importadas'], relatorio['total_erros']), (20, 0))
+        campos = ('nome', 'valor', 'ciclo_pagamento', 'categoria__nome')
+        self.assertEqual(
+            set(destino.assinaturas.values_list(*campos)),
+            set(self.usuario.assinaturas.values_list(*campos)),
+        )
+
+    def test_consultas_por_lote(self):
+        linhas = ''.join(
+            f'Serviço {i};Streaming;{i + 1},00;MENSAL;ATIVA;2025-01-10\n'
+            for i in range(50)
+        )
+        arquivo = StringIO(
+            'nome;categoria;valor;ciclo_pagamento;status;data_primeira_cobranca\n'
+            + linhas
+        )
+        # Taxas de câmbio em memória (chave do resumo invalidado no fim)
+        taxas_de_cambio()
+        # categorias; por lote: INSERT e reconstrução do consolidado
+        # (DELETE, SELECT, INSERT), cada um com SAVEPOINT e RELEASE
+        with self.assertNumQueries(1 + 5 * 8):
+            relatorio = importar_csv(self.usuario, arquivo, tamanho_lote=10)
+        self.assertEqual(relatorio['importadas'], 50)
+
+    def test_cabecalho_sem_colunas_obrigatorias(self):
+        with self.assertRaises(ValueError):
+            importar_csv(self.usuario, StringIO('nome,valor\nA,1\n'))
+
+    def test_upload_pela_view(self):
+        arquivo = SimpleUploadedFile(
+            'assinaturas.csv', self.CSV.encode('utf-8-sig'), 'text/csv'
+        )
+        response = self.client.post(
+            reverse('importar_assinaturas'), {'arquivo': arquivo}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['relatorio']['importadas'], 2)
+        self.assertContains(response, 'Categoria inválida: Inexistente.')
+
+    def test_comando(self):
+        with tempfile.NamedTemporaryFile(
+            'w', suffix='.csv', encoding='utf-8', delete=False
+        ) as arquivo:
+            arquivo.write(self.CSV)
+        self.addCleanup(os.remove, arquivo.name)
+
+        saida = StringIO()
+        call_command(
+            'importar_assinaturas', 'importar', arquivo.name, '--dry-run',
+            stdout=saida,
+        )
+        self.assertIn('2 assinaturas seriam importadas, 3 linha(s)', saida.getvalue())
+        self.assertIn('Linha 4: Campo obrigatório: nome.', saida.getvalue())
+        self.assertFalse(self.usuario.assinaturas.exists())
+
+        with self.assertRaises(CommandError):
+            call_command('importar_assinaturas', 'ninguem', arquivo.name)
+
+
+class CalendarioTests(TestCase):
+    """Calendário .ics por token, com 304 enquanto nada muda"""
+
+    def setUp(self):
+        cache.clear()
+        taxas_de_cambio()
+        self.usuario = User.objects.create_user('calendario', password='senha123')
+        self.assinaturas = criar_assinaturas(self.usuario, 8)
+        criar_assinaturas(self.usuario, 2, status='CANCELADA')
+        self.feed = FeedCalendario.objects.create(usuario=self.usuario)
+        self.url = reverse('calendario_ics', args=[self.feed.token])
+
+    def baixar(self, **cabecalhos):
+        return self.client.get(self.url, headers=cabecalhos)
+
+    def test_eventos_iguais_a_projecao(self):
+        response = self.baixar()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        self.assertIn('private', response['Cache-Control'])
+
+        conteudo = response.content.decode('utf-8')
+        self.assertTrue(conteudo.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertTrue(conteudo.endswith('END:VCALENDAR\r\n'))
+        datas = sorted(
+            linha.split(':')[1] for linha in conteudo.split('\r\n')
+            if linha.startswith('DTSTART')
+        )
+        projecao = projetar_usuario(self.usuario, 12, detalhar=True)
+        esperadas = sorted(
+            cobranca['data'].strftime('%Y%m%d')
+            for mes in projecao['meses'] for cobranca in mes['cobrancas']
+        )
+        self.assertEqual(datas, esperadas)
+        self.assertIn('SUMMARY:Assinatura 0 - R$ 10\\,00', conteudo)
+        self.assertNotIn('Assinatura 8 ', conteudo)  # canceladas
+
+    def test_revalidacao_responde_304_sem_gerar(self):
+        response = self.baixar()
+        etag, ultima = response['ETag'], response['Last-Modified']
+
+        with self.assertNumQueries(2):  # feed e última alteração
+            response = self.baixar(if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        with self.assertNumQueries(2):
+            response = self.baixar(if_modified_since=ultima)
+        self.assertEqual(response.status_code, 304)
+
+    def test_corpo_em_cache_ate_a_versao_mudar(self):
+        self.baixar()
+        # feed, última alteração e mais nada: o corpo vem do cache
+        with self.assertNumQueries(2):
+            response = self.baixar(if_none_match='"outra"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_alteracoes_mudam_a_versao(self):
+        etags = [self.baixar()['ETag']]
+
+        assinatura = self.assinaturas[0]
+        assinatura.nome = 'Renomeada'
+        assinatura.save()
+        response = self.baixar(if_none_match=etags[-1])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Renomeada', response.content.decode('utf-8'))
+        etags.append(response['ETag'])
+
+        Assinatura.objects.filter(pk=self.assinaturas[1].pk).update(
+            valor=Decimal('77.00')
+        )
+        etags.append(self.baixar(if_none_match=etags[-1])['ETag'])
+
+        self.assinaturas[2].delete()
+        response = self.baixar(if_none_match=etags[-1])
+        self.assertEqual(response.status_code, 200)
+        etags.append(response['ETag'])
+
+        self.assertEqual(len(set(etags)), 4)
+
+    def test_token_invalido_e_regenerado(self):
+        response = self.client.get(reverse('calendario_ics', args=['invalido']))
+        self.assertEqual(response.status_code, 404)
+
+        self.client.force_login(self.usuario)
+        response = self.client.post(
+            reverse('configuracoes'), {'action': 'regenerate_calendar'}
+        )
+        self.assertRedirects(response, reverse('configuracoes'))
+        self.assertEqual(self.baixar().status_code, 404)
+
+        self.feed.refresh_from_db()
+        response = self.client.get(reverse('configuracoes'))
+        self.assertContains(response, self.feed.token)
+
+    def test_ativacao_pelas_configuracoes(self):
+        usuario = User.objects.create_user('sem_feed', password='senha123')
+        self.client.force_login(usuario)
+        self.assertContains(self.client.get(reverse('configuracoes')), 'Ativar calendário')
+        self.client.post(reverse('configuracoes'), {'action': 'regenerate_calendar'})
+        self.assertTrue(FeedCalendario.objects.filter(usuario=usuario).exists())
+
+    def test_escape_e_quebra_de_linhas(self):
+        cobranca = {
+            'data': date(2025, 3, 1),
+            'assinatura_id': 1,
+            'nome': 'Café; chá, pão\\ ' + 'é' * 60,
+            'valor': Decimal('5.5'),
+        }
+        conteudo = gerar_ics([cobranca], self.feed.data_atualizacao)
+        linhas = conteudo.split('\r\n')
+        self.assertTrue(all(len(linha.encode()) <= 75 for linha in linhas))
+        # Desdobrando, o texto escapado volta inteiro
+        desdobrado = conteudo.replace('\r\n ', '')
+        self.assertIn(
+            'SUMMARY:Café\\; chá\\, pão\\\\ ' + 'é' * 60 + ' - R$ 5\\,50',
+            desdobrado,
+        )
+        self.assertEqual(_dobrar('a' * 75), 'a' * 75)
+
+
+class LembretesTests(TestCase):
+    """Um email por usuário com as cobranças da janela, sem repetir"""
+
+    def setUp(self):
+        self.hoje = date(2025, 3, 10)
+        self.usuarios = [
+            User.objects.create_user(f'lembrete{i}', email=f'u{i}@exemplo.com')
+            for i in range(5)
+        ]
+        for i, usuario in enumerate(self.usuarios):
+            self.criar(usuario, f'Streaming {i}', self.hoje)
+            self.criar(usuario, f'Academia {i}', self.hoje + timedelta(days=3))
+            # Fora da janela, cancelada e vencida não entram
+            self.criar(usuario, 'Depois', self.hoje + timedelta(days=4))
+            self.criar(usuario, 'Cancelada', self.hoje, status='CANCELADA')
+            self.criar(usuario, 'Vencida', self.hoje - timedelta(days=1))
+        sem_email = User.objects.create_user('sem_email')
+        self.criar(sem_email, 'Sem email', self.hoje)
+
+    def criar(self, usuario, nome, data, **extra):
+        return Assinatura.objects.create(
+            usuario=usuario, nome=nome, valor=Decimal('1234.5'),
+            ciclo_pagamento='MENSAL', data_primeira_cobranca=data,
+            data_proxima_cobranca=data, **extra,
+        )
+
+    def executar(self, *args, data=None):
+        saida = StringIO()
+        call_command(
+            'enviar_lembretes', '--data', (data or self.hoje).isoformat(),
+            *args, stdout=saida, stderr=StringIO(),
+        )
+        return saida.getvalue()
+
+    def test_um_email_por_usuario_em_lotes(self):
+        saida = self.executar('--batch-size', '2')
+        self.assertIn(
+            '5 lembretes enviados (10 cobranças) em 3 lote(s); '
+            '1 usuários sem email', saida
+        )
+        self.assertEqual(len(mail.outbox), 5)
+
+        email = next(e for e in mail.outbox if e.to == ['u0@exemplo.com'])
+        self.assertEqual(email.subject, 'Meu Bolso: 2 cobranças nos próximos dias')
+        self.assertIn('- 10/03/2025: Streaming 0 (R$ 1.234,50)', email.body)
+        self.assertIn('- 13/03/2025: Academia 0 (R$ 1.234,50)', email.body)
+        for nome in ('Depois', 'Cancelada', 'Vencida'):
+            self.assertNotIn(nome, email.body)
+
+    def test_reexecucao_nao_reenvia(self):
+        self.executar()
+        self.executar()
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(LembreteCobranca.objects.count(), 10)
+
+        # No dia seguinte só a cobrança que entrou na janela é avisada
+        self.executar(data=self.hoje + timedelta(days=1))
+        self.assertEqual(len(mail.outbox), 10)
+        self.assertTrue(all('Depois' in e.body for e in mail.outbox[5:]))
+        # Registros de cobranças passadas são removidos
+        self.assertFalse(
+            LembreteCobranca.objects.filter(data_cobranca=self.hoje).exists()
+        )
+
+    def test_dry_run(self):
+        saida = self.executar('--dry-run')
+        self.assertIn('5 lembretes seriam enviados', saida)
+        self.assertEqual(mail.outbox, [])
+        self.assertFalse(LembreteCobranca.objects.exists())
+
+    def test_falha_no_envio_fica_para_a_proxima_execucao(self):
+        class ConexaoInstavel:
+            def __init__(self):
+                self.enviados = []
+
+            def send_messages(self, mensagens):
+                if mensagens[0].to == ['u1@exemplo.com']:
+                    raise OSError('conexão recusada')
+                self.enviados += mensagens
+                return len(mensagens)
+
+        conexao = ConexaoInstavel()
+        with self.assertLogs('assinaturas.lembretes', 'ERROR'):
+            resultados = list(enviar_lembretes(self.hoje, conexao))
+        self.assertEqual(sum(r['falhas'] for r in resultados), 1)
+        self.assertEqual(len(conexao.enviados), 4)
+
+        self.executar()
+        self.assertEqual([e.to for e in mail.outbox], [['u1@exemplo.com']])
+
+    def test_consultas_por_lote_nao_crescem_com_as_cobrancas(self):
+        for usuario in self.usuarios:
+            for i in range(20):
+                self.criar(usuario, f'Extra {i}', self.hoje + timedelta(days=i % 4))
+        # Por lote: usuários, lembretes já enviados, cobranças; um INSERT
+        # por email enviado; e a consulta final que encerra a paginação
+        with self.assertNumQueries(3 * 3 + 5 + 1):
+            list(enviar_lembretes(self.hoje, mail.get_connection(), tamanho_lote=2))
+
+    def test_interrupcao_no_meio_do_lote_nao_reenvia(self):
+        class ConexaoInterrompida:
+            """Encerra a execução (como um SIGTERM) no terceiro envio"""
+
+            def __init__(self):
+                self.enviados = []
+
+            def send_messages(self, mensagens):
+                if len(self.enviados) == 2:
+                    raise KeyboardInterrupt
+                self.enviados += mensagens
+                return len(mensagens)
+
+        conexao = ConexaoInterrompida()
+        with self.assertRaises(KeyboardInterrupt):
+            list(enviar_lembretes(self.hoje, conexao))
+        self.assertEqual(LembreteCobranca.objects.count(), 4)
+
+        self.executar()
+        enviados = {tuple(e.to) for e in conexao.enviados}
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertFalse(enviados & {tuple(e.to) for e in mail.outbox})
+
+
+class TarefasTests(TestCase):
+    """Fila de tarefas no banco: reserva, novas tentativas e importação"""
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('tarefas', password='senha123')
+        self.client.force_login(self.usuario)
+        self.diretorio = tempfile.mkdtemp()
+        self.addCleanup(os.rmdir, self.diretorio)
+        self.falhas = 0
+
+        @registrar_tarefa('teste_instavel')
+        def instavel(tarefa, falhas):
+            if self.falhas < falhas:
+                self.falhas += 1
+                raise ConnectionError('banco indisponível')
+            return {'falhas': self.falhas}
+
+        @registrar_tarefa('teste_invalida')
+        def invalida(tarefa):
+            raise ErroDefinitivo('Parâmetros inválidos.')
+
+        self.addCleanup(TIPOS.pop, 'teste_instavel')
+        self.addCleanup(TIPOS.pop, 'teste_invalida')
+
+    def test_reserva_exclusiva(self):
+        tarefa = enfileirar('teste_instavel', falhas=0)
+        reservada = reservar_tarefa('a')
+        self.assertEqual(reservada.pk, tarefa.pk)
+        self.assertEqual(reservada.status, 'EXECUTANDO')
+        self.assertEqual(reservada.tentativas, 1)
+        self.assertIsNone(reservar_tarefa('b'))
+
+        executar_tarefa(reservada)
+        reservada.refresh_from_db()
+        self.assertEqual(reservada.status, 'CONCLUIDA')
+        self.assertEqual(reservada.resultado, {'falhas': 0})
+
+    def test_novas_tentativas_com_espera(self):
+        tarefa = enfileirar('teste_instavel', falhas=1)
+        with self.assertLogs('assinaturas.tarefas', 'ERROR'):
+            executar_tarefa(reservar_tarefa('a'))
+        tarefa.refresh_from_db()
+        self.assertEqual(tarefa.status, 'PENDENTE')
+        self.assertEqual(tarefa.erro, 'ConnectionError: banco indisponível')
+        # Só volta a ser reservada depois da espera
+        self.assertGreater(
+            tarefa.executar_apos,
+            timezone.now() + timedelta(seconds=ESPERA_BASE - 5),
+        )
+        self.assertIsNone(reservar_tarefa('a'))
+
+        Tarefa.objects.update(executar_apos=timezone.now())
+        executar_tarefa(reservar_tarefa('a'))
+        tarefa.refresh_from_db()
+        self.assertEqual((tarefa.status, tarefa.tentativas), ('CONCLUIDA', 2))
+
+    def test_falha_definitiva_e_tentativas_esgotadas(self):
+        invalida = enfileirar('teste_invalida')
+        esgotada = enfileirar('teste_instavel', max_tentativas=1, falhas=5)
+        with self.assertLogs('assinaturas.tarefas', 'ERROR'):
+            call_command('worker', '--uma-vez', stdout=StringIO())
+
+        invalida.refresh_from_db()
+        esgotada.refresh_from_db()
+        self.assertEqual((invalida.status, invalida.tentativas), ('FALHOU', 1))
+        self.assertEqual(invalida.erro, 'Parâmetros inválidos.')
+        self.assertEqual(esgotada.status, 'FALHOU')
+        self.assertEqual(self.falhas, 1)
+
+    def test_tarefas_abandonadas_voltam_para_a_fila(self):
+        tarefa = enfileirar('teste_instavel', falhas=0)
+        reservar_tarefa('a')
+        self.assertEqual(liberar_abandonadas(), 0)
+        Tarefa.objects.update(data_inicio=timezone.now() - timedelta(days=1))
+        self.assertEqual(liberar_abandonadas(), 1)
+        tarefa.refresh_from_db()
+        self.assertEqual(tarefa.status, 'PENDENTE')
+
+    def test_execucao_liberada_nao_sobrescreve_a_seguinte(self):
+        tarefa = enfileirar('teste_instavel', falhas=1)
+        antiga = reservar_tarefa('a')
+        Tarefa.objects.update(data_inicio=timezone.now() - timedelta(days=1))
+        liberar_abandonadas()
+        nova = reservar_tarefa('b')
+
+        # A antiga falha e tentaria devolver a tarefa à fila
+        with self.assertLogs('assinaturas.tarefas', 'WARNING') as logs:
+            executar_tarefa(antiga)
+        self.assertIn('liberada durante a execução', logs.output[-1])
+        tarefa.refresh_from_db()
+        self.assertEqual((tarefa.status, tarefa.trabalhador), ('EXECUTANDO', 'b'))
+
+        executar_tarefa(nova)
+        with self.assertLogs('assinaturas.tarefas', 'WARNING'):
+            executar_tarefa(antiga)  # nem o sucesso tardio é gravado
+        tarefa.refresh_from_db()
+        self.assertEqual((tarefa.status, tarefa.trabalhador), ('CONCLUIDA', 'b'))
+
+    def test_importacao_sem_tentativas_remove_o_arquivo(self):
+        tarefa = self.enfileirar_importacao(3)
+        Tarefa.objects.update(max_tentativas=1)
+
+        def indisponivel(linha, categorias):
+            raise ConnectionError('banco indisponível')
+
+        with mock.patch.object(importacao, 'validar_linha', indisponivel):
+            with self.assertLogs('assinaturas.tarefas', 'ERROR'):
+                executar_tarefa(reservar_tarefa('a'))
+        tarefa.refresh_from_db()
+        self.assertEqual(tarefa.status, 'FALHOU')
+        self.assertEqual(os.listdir(self.diretorio), [])
+
+        # Abandonada sem tentativas restantes: mesmo destino
+        self.enfileirar_importacao(3)
+        Tarefa.objects.update(max_tentativas=1)
+        reservar_tarefa('a')
+        Tarefa.objects.update(data_inicio=timezone.now() - timedelta(days=1))
+        liberar_abandonadas()
+        self.assertEqual(os.listdir(self.diretorio), [])
+
+    def test_comando_permitido(self):
+        permitido = enfileirar('comando', nome='arquivar_cobrancas')
+        proibido = enfileirar('comando', nome='flush', argumentos=['--noinput'])
+        call_command('worker', '--uma-vez', stdout=StringIO())
+
+        permitido.refresh_from_db()
+        proibido.refresh_from_db()
+        self.assertEqual(permitido.status, 'CONCLUIDA')
+        self.assertIn('cobranças anteriores', permitido.resultado['saida'])
+        self.assertEqual(proibido.status, 'FALHOU')
+        self.assertTrue(User.objects.exists())
+
+    def test_importacao_grande_vai_para_o_worker(self):
+        arquivo = SimpleUploadedFile(
+            'assinaturas.csv', ImportacaoTests.CSV.encode('utf-8'), 'text/csv'
+        )
+        with self.settings(TAREFAS_DIR=self.diretorio, IMPORTACAO_LIMITE_SINCRONO=10):
+            response = self.client.post(
+                reverse('importar_assinaturas'), {'arquivo': arquivo}
+            )
+        tarefa = Tarefa.objects.get()
+        self.assertRedirects(
+            response, reverse('importar_assinaturas') + f'?tarefa={tarefa.pk}'
+        )
+        self.assertFalse(self.usuario.assinaturas.exists())
+
+        pagina = self.client.get(response.url)
+        self.assertContains(pagina, 'Importando em segundo plano')
+        status = self.client.get(reverse('status_tarefa', args=[tarefa.pk])).json()
+        self.assertEqual((status['status'], status['finalizada']), ('PENDENTE', False))
+
+        call_command('worker', '--uma-vez', stdout=StringIO())
+
+        status = self.client.get(reverse('status_tarefa', args=[tarefa.pk])).json()
+        self.assertEqual(status['status'], 'CONCLUIDA')
+        self.assertEqual(status['resultado']['importadas'], 2)
+        self.assertEqual(self.usuario.assinaturas.count(), 2)
+        self.assertEqual(os.listdir(self.diretorio), [])
+
+        pagina = self.client.get(response.url)
+        self.assertNotContains(pagina, 'Importando em segundo plano')
+        self.assertContains(pagina, 'Categoria inválida: Inexistente.')
+
+    def enfileirar_importacao(self, linhas):
+        caminho = os.path.join(self.diretorio, 'grande.csv')
+        with open(caminho, 'w', encoding='utf-8') as arquivo:
+            arquivo.write('nome,valor,ciclo_pagamento,data_primeira_cobranca\n')
+            for i in range(linhas):
+                arquivo.write(f'Serviço {i},10,MENSAL,2025-01-10\n')
+        return enfileirar(
+            'importar_assinaturas', self.usuario, arquivo=caminho, tamanho_lote=2
+        )
+
+    def test_importacao_retomada_sem_duplicar(self):
+        tarefa = self.enfileirar_importacao(5)
+        validar_linha = importacao.validar_linha
+        lidas = []
+
+        def falhar_no_segundo_lote(linha, categorias):
+            lidas.append(linha['nome'])
+            if len(lidas) == 4:
+                raise ConnectionError('banco indisponível')
+            return validar_linha(linha, categorias)
+
+        with mock.patch.object(importacao, 'validar_linha', falhar_no_segundo_lote):
+            with self.assertLogs('assinaturas.tarefas', 'ERROR'):
+                executar_tarefa(reservar_tarefa('a'))
+        tarefa.refresh_from_db()
+        self.assertEqual(tarefa.status, 'PENDENTE')
+        self.assertEqual(tarefa.resultado['posicao'], 2)
+        self.assertEqual(self.usuario.assinaturas.count(), 2)
+
+        Tarefa.objects.update(executar_apos=timezone.now())
+        executar_tarefa(reservar_tarefa('a'))
+        tarefa.refresh_from_db()
+        self.assertEqual(tarefa.status, 'CONCLUIDA')
+        self.assertEqual(
+            tarefa.resultado, {'importadas': 5, 'total_erros': 0, 'erros': []}
+        )
+        self.assertEqual(
+            sorted(self.usuario.assinaturas.values_list('nome', flat=True)),
+            [f'Serviço {i}' for i in range(5)],
+        )
+        self.assertEqual(os.listdir(self.diretorio), [])
+
+    def test_execucao_liberada_nao_grava(self):
+        tarefa = self.enfileirar_importacao(3)
+        antiga = reservar_tarefa('a')
+        Tarefa.objects.update(data_inicio=timezone.now() - timedelta(days=1))
+        liberar_abandonadas()
+        nova = reservar_tarefa('b')
+
+        # A execução antiga continua, mas o lote dela é desfeito
+        with self.assertLogs('assinaturas.tarefas', 'WARNING'):
+            executar_tarefa(antiga)
+        self.assertFalse(self.usuario.assinaturas.exists())
+        tarefa.refresh_from_db()
+        self.assertEqual((tarefa.status, tarefa.trabalhador), ('EXECUTANDO', 'b'))
+
+        executar_tarefa(nova)
+        tarefa.refresh_from_db()
+        self.assertEqual(tarefa.status, 'CONCLUIDA')
+        self.assertEqual(self.usuario.assinaturas.count(), 3)
+
+    def test_status_apenas_do_dono(self):
+        outro = User.objects.create_user('outro_tarefas')
+        tarefa = enfileirar('teste_instavel', outro, falhas=0)
+        response = self.client.get(reverse('status_tarefa', args=[tarefa.pk]))
+        self.assertEqual(response.status_code, 404)
+
+
+class CambioTests(TestCase):
+    """Totais convertidos para a moeda base no SQL, com taxas em memória"""
+
+    def setUp(self):
+        cache.clear()
+        invalidar_taxas()
+        self.addCleanup(invalidar_taxas)  # taxas do teste somem no rollback
+        TaxaCambio.objects.create(moeda='USD', taxa=Decimal('5'))
+        TaxaCambio.objects.create(moeda='EUR', taxa=Decimal('6'))
+        self.usuario = User.objects.create_user('cambio', password='senha123')
+        self.client.force_login(self.usuario)
+        self.reais = criar_assinaturas(self.usuario, 6)
+        self.dolares = criar_assinaturas(self.usuario, 4, moeda='USD')
+        invalidar_taxas()  # o bulk_create já carregou as taxas
+
+    def anual(self, assinaturas):
+        return sum(a.valor_anual() for a in assinaturas)
+
+    def test_totais_na_moeda_base(self):
+        esperado = self.anual(self.reais) + 5 * self.anual(self.dolares)
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['gasto_anual'], esperado)
+        self.assertContains(response, 'US$ 10,00')  # linha na moeda original
+
+        response = self.client.get(reverse('configuracoes'))
+        self.assertAlmostEqual(
+            response.context['gasto_mensal'], esperado / 12, places=6
+        )
+
+        Perfil.objects.create(usuario=self.usuario, moeda_base='USD')
+        esperado = self.anual(self.reais) / 5 + self.anual(self.dolares)
+        response = self.client.get(reverse('dashboard'))
+        self.assertAlmostEqual(response.context['gasto_anual'], esperado, places=6)
+        self.assertEqual(response.context['simbolo_moeda'], 'US$')
+
+    def test_consultas_nao_dependem_das_moedas(self):
+        criar_assinaturas(self.usuario, 50, moeda='EUR')
+        taxas_de_cambio()
+        # sessão, usuário, moeda base, totais, próximas cobranças,
+        # categorias, top 5
+        with self.assertNumQueries(7):
+            self.client.get(reverse('dashboard'))
+
+    def test_taxas_em_memoria_ate_o_ttl(self):
+        with self.assertNumQueries(1):
+            taxas, versao = taxas_de_cambio()
+        with self.assertNumQueries(0):
+            self.assertEqual(taxas_de_cambio(), (taxas, versao))
+        self.assertEqual(fator('USD', 'EUR'), Decimal('0.8333333333'))
+        self.assertIsNone(fator('JPY', 'BRL'))
+
+        TaxaCambio.objects.filter(moeda='USD').update(taxa=Decimal('4'))
+        self.assertEqual(taxas_de_cambio()[0]['USD'], Decimal('5'))
+        with override_settings(CAMBIO_TTL=0):
+            invalidar_taxas()
+            taxas_de_cambio()
+            with self.assertNumQueries(1):
+                taxas, novo = taxas_de_cambio()
+        self.assertEqual(taxas['USD'], Decimal('4'))
+        self.assertNotEqual(novo, versao)
+
+        # Salvar pelo ORM descarta as taxas deste processo
+        TaxaCambio.objects.get(moeda='EUR').delete()
+        self.assertNotIn('EUR', taxas_de_cambio()[0])
+
+    def test_nova_taxa_muda_resumo_em_cache(self):
+        self.client.get(reverse('dashboard'))
+        TaxaCambio.objects.filter(moeda='USD').get().delete()
+        TaxaCambio.objects.create(moeda='USD', taxa=Decimal('2'))
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(
+            response.context['gasto_anual'],
+            self.anual(self.reais) + 2 * self.anual(self.dolares),
+        )
+
+    def test_moeda_sem_taxa_fica_fora_dos_totais(self):
+        ienes = criar_assinaturas(
+            self.usuario, 1, moeda='JPY', valor=Decimal('100')
+        )
+        total = Assinatura.objects.filter(usuario=self.usuario).aggregate(
+            total=Sum(converter('valor', 'BRL'))
+        )['total']
+        valores = sum(a.valor for a in self.reais) + 5 * sum(
+            a.valor for a in self.dolares
+        )
+        self.assertEqual(total, valores)
+        # Destino sem taxa: só entra o que já está nele
+        self.assertIsNone(
+            Assinatura.objects.filter(usuario=self.usuario).aggregate(
+                total=Sum(converter('valor', 'GBP'))
+            )['total']
+        )
+
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(
+            response.context['gasto_anual'],
+            self.anual(self.reais) + 5 * self.anual(self.dolares),
+        )
+        self.assertEqual(response.context['sem_conversao'], [
+            {'moeda': 'JPY', 'simbolo': 'JPY', 'gasto_anual': self.anual(ienes)},
+        ])
+        self.assertContains(response, 'Sem taxa de câmbio para a moeda base')
+
+        response = self.client.get(reverse('configuracoes'))
+        self.assertEqual(
+            response.context['gasto_mensal'],
+            (self.anual(self.reais) + 5 * self.anual(self.dolares)) / 12,
+        )
+        self.assertEqual(response.context['total_assinaturas'], 10 + len(ienes))
+        self.assertEqual(response.context['sem_conversao'], [
+            {'moeda': 'JPY', 'simbolo': 'JPY', 'gasto_anual': self.anual(ienes)},
+        ])
+        self.assertContains(response, 'Sem taxa de câmbio para a moeda base')
+
+        projecao = self.client.get(
+            reverse('projecao_json'), {'detalhar': '1'}
+        ).json()
+        self.assertEqual(projecao['sem_taxa'], ['JPY'])
+        cobrancas = [c for m in projecao['meses'] for c in m['cobrancas']]
+        self.assertEqual(
+            {c['moeda'] for c in cobrancas if c['assinatura_id'] == ienes[0].pk},
+            {'JPY'},
+        )
+        for mes in projecao['meses']:
+            self.assertEqual(
+                Decimal(str(mes['total'])),
+                sum(Decimal(str(c['valor'])) for c in mes['cobrancas']
+                    if c['moeda'] is None),
+            )
+
+        from scripts.ver_estatisticas import coletar_estatisticas
+
+        financeiro = coletar_estatisticas()['financeiro']
+        self.assertEqual(financeiro['moedas_sem_taxa'], ['JPY'])
+        self.assertNotIn('JPY', [a['moeda'] for a in financeiro['mais_caras']])
+
+        # No calendário a cobrança segue com o valor na moeda original
+        feed = FeedCalendario.objects.create(usuario=self.usuario)
+        calendario = self.client.get(
+            reverse('calendario_ics', args=[feed.token])
+        ).content.decode('utf-8')
+        self.assertIn('Assinatura 0 - JPY 100\\,00', calendario)
+
+    def test_comando_carregar_cambio(self):
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        csv_caminho = os.path.join(diretorio.name, 'taxas.csv')
+        with open(csv_caminho, 'w', encoding='utf-8') as arquivo:
+            arquivo.write('moeda,taxa\nusd,5.25\nGBP,6.9\nBRL,1\n')
+        json_caminho = os.path.join(diretorio.name, 'taxas.json')
+        with open(json_caminho, 'w', encoding='utf-8') as arquivo:
+            json.dump({'EUR': '5.80'}, arquivo)
+
+        taxas_de_cambio()
+        call_command('carregar_cambio', csv_caminho, stdout=StringIO())
+        call_command('carregar_cambio', json_caminho, stdout=StringIO())
+
+        self.assertEqual(
+            dict(TaxaCambio.objects.values_list('moeda', 'taxa')),
+            {'USD': Decimal('5.25'), 'GBP': Decimal('6.9'), 'EUR': Decimal('5.8')},
+        )
+        # bulk_create não envia post_save: o comando descarta as taxas
+        self.assertEqual(taxas_de_cambio()[0]['USD'], Decimal('5.25'))
+
+        with open(csv_caminho, 'w', encoding='utf-8') as arquivo:
+            arquivo.write('moeda,taxa\nUSD,-1\n')
+        with self.assertRaisesMessage(CommandError, 'Taxa inválida para USD'):
+            call_command('carregar_cambio', csv_caminho, stdout=StringIO())
+        with self.assertRaises(ValueError):
+            ler_taxas(StringIO('[1, 2]'), 'json')
+
+    def test_trocar_moeda_base_nas_configuracoes(self):
+        self.client.get(reverse('dashboard'))
+        feed = FeedCalendario.objects.create(usuario=self.usuario)
+        versao_feed = feed.data_atualizacao
+
+        response = self.client.post(
+            reverse('configuracoes'),
+            {'action': 'update_currency', 'moeda_base': 'eur'},
+        )
+        self.assertRedirects(response, reverse('configuracoes'))
+        self.assertEqual(self.usuario.perfil.moeda_base, 'EUR')
+        feed.refresh_from_db()
+        self.assertGreater(feed.data_atualizacao, versao_feed)
+
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['simbolo_moeda'], '€')
+        calendario = self.client.get(
+            reverse('calendario_ics', args=[feed.token])
+        ).content.decode('utf-8')
+        self.assertIn('€', calendario)
+
+        self.client.post(
+            reverse('configuracoes'),
+            {'action': 'update_currency', 'moeda_base': 'XYZ'},
+        )
+        self.assertEqual(Perfil.objects.get().moeda_base, 'EUR')
+
+    def test_consolidado_separa_moedas(self):
+        linhas = GastoConsolidado.objects.filter(
+            usuario=self.usuario, quantidade__gt=0
+        )
+        self.assertEqual(
+            set(linhas.values_list('moeda', flat=True)), {'BRL', 'USD'}
+        )
+        assinatura = self.dolares[0]
+        assinatura.moeda = 'EUR'
+        assinatura.save()
+        self.assertEqual(
+            linhas.filter(moeda='EUR').get().valor_anual,
+            assinatura.valor_anual(),
+        )
+
+
+class ApiTests(TestCase):
+    """API JSON: paginação por cursor, ETag e gravações em lote"""
+
+    def setUp(self):
+        cache.clear()
+        self.usuario = User.objects.create_user('api', password='senha123')
+        self.client.force_login(self.usuario)
+        self.categorias = list(self.usuario.categorias.order_by('id'))
+
+    def enviar(self, metodo, nome, dados):
+        return self.client.generic(
+            metodo, reverse(nome), json.dumps(dados),
+            content_type='application/json',
+        )
+
+    def itens(self, quantidade):
+        return [
+            {
+                'nome': f'Serviço {i}',
+                'valor': f'{10 + i % 50}.90',
+                'ciclo_pagamento': ['MENSAL', 'ANUAL'][i % 2],
+                'data_primeira_cobranca': '2025-01-31',
+                'categoria_id': self.categorias[i % 3].pk,
+                'moeda': 'usd' if i % 7 == 0 else 'BRL',
+            }
+            for i in range(quantidade)
+        ]
+
+    def assertConsolidadoCorreto(self):
+        # O SQLite soma decimais em ponto flutuante: compara nas casas
+        # das colunas
+        def linha(grupo):
+            return (
+                *(grupo[c] for c in GastoConsolidadoTests.CAMPOS[:-2]),
+                Decimal(grupo['valor_mensal']).quantize(Decimal('0.0001')),
+                Decimal(grupo['valor_anual']).quantize(Decimal('0.01')),
+            )
+        self.assertEqual(
+            {linha(g) for g in GastoConsolidado.objects.filter(
+                quantidade__gt=0
+            ).values()},
+            {linha(g) for g in calcular_consolidado()},
+        )
+
+    def test_listagem_por_cursor_com_filtros(self):
+        criar_assinaturas(self.usuario, 30)
+        criar_assinaturas(self.usuario, 5, status='CANCELADA')
+        outro = User.objects.create_user('outro_api')
+        criar_assinaturas(outro, 3)
+
+        ids, cursor = [], None
+        while True:
+            parametros = {'status': 'ATIVA', 'order_by': '-valor', 'limite': 12}
+            if cursor:
+                parametros['cursor'] = cursor
+            # sessão, usuário, página
+            with self.assertNumQueries(3):
+                dados = self.client.get(reverse('api_assinaturas'), parametros).json()
+            ids += [item['id'] for item in dados['resultados']]
+            cursor = dados['proxima']
+            if cursor is None:
+                break
+
+        esperados = list(
+            Assinatura.objects.filter(usuario=self.usuario, status='ATIVA')
+            .order_by('-valor', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(ids, esperados)
+        self.assertEqual(set(dados['resultados'][0]), set(api.CAMPOS_ASSINATURA))
+
+        response = self.client.get(reverse('api_assinaturas'), {'categoria': 'x'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_cursor_invalido_responde_400(self):
+        criar_assinaturas(self.usuario, 3)
+        cursor = self.client.get(
+            reverse('api_assinaturas'), {'limite': 1}
+        ).json()['proxima']
+        for nome, parametros in [
+            ('api_assinaturas', {'cursor': '???'}),
+            ('api_categorias', {'cursor': 'bm9wZQ'}),
+            # Cursor de outra ordenação
+            ('api_assinaturas', {'cursor': cursor, 'order_by': '-valor'}),
+        ]:
+            response = self.client.get(reverse(nome), parametros)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()['erro'], 'Cursor inválido.')
+
+    def test_etag_e_304(self):
+        criar_assinaturas(self.usuario, 3)
+        response = self.client.get(reverse('api_assinaturas'))
+        etag = response['ETag']
+
+        response = self.client.get(
+            reverse('api_assinaturas'), headers={'if-none-match': etag}
+        )
+        self.assertEqual(response.status_code, 304)
+
+        assinatura = Assinatura.objects.filter(usuario=self.usuario).first()
+        response = self.client.get(reverse('api_assinatura', args=[assinatura.pk]))
+        self.assertEqual(response.json()['nome'], assinatura.nome)
+        assinatura.valor += 1
+        assinatura.save()
+        response = self.client.get(
+            reverse('api_assinaturas'), headers={'if-none-match': etag}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_acesso_apenas_do_dono(self):
+        outro = User.objects.create_user('intruso')
+        alheia = criar_assinaturas(outro, 1)[0]
+
+        response = self.client.get(reverse('api_assinatura', args=[alheia.pk]))
+        self.assertEqual(response.status_code, 404)
+        response = self.enviar('PATCH', 'api_assinaturas', [{'id': alheia.pk, 'valor': 1}])
+        self.assertEqual(response.status_code, 400)
+        response = self.enviar('DELETE', 'api_assinaturas', [alheia.pk])
+        self.assertEqual(response.json()['excluidos'], 0)
+        self.assertTrue(Assinatura.objects.filter(pk=alheia.pk).exists())
+
+        self.client.logout()
+        response = self.client.get(reverse('api_assinaturas'))
+        self.assertEqual(response.status_code, 401)
+
+    def test_lote_de_1000_em_poucas_consultas(self):
+        # Os lotes do SQLite (999 parâmetros por consulta) dominam a
+        # contagem; o restante é constante
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.enviar('POST', 'api_assinaturas', self.itens(1000))
+        self.assertEqual(response.status_code, 201)
+        self.assertLess(len(consultas), 40)
+        criadas = response.json()['resultados']
+        self.assertEqual(len(criadas), 1000)
+        self.assertEqual(criadas[0]['moeda'], 'USD')
+        self.assertEqual(criadas[0]['data_proxima_cobranca'],
+                         Assinatura.objects.get(pk=criadas[0]['id']).data_proxima_cobranca.isoformat())
+        self.assertConsolidadoCorreto()
+
+        alteracoes = [
+            {'id': item['id'], 'valor': 5, 'status': 'PAUSADA', 'categoria_id': None}
+            for item in criadas[::2]
+        ]
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.enviar('PATCH', 'api_assinaturas', alteracoes)
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(len(consultas), 40)
+        self.assertEqual(
+            Assinatura.objects.filter(status='PAUSADA', valor=5, categoria=None).count(),
+            500,
+        )
+        self.assertConsolidadoCorreto()
+
+        ids = [item['id'] for item in criadas]
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.enviar('DELETE', 'api_assinaturas', ids)
+        self.assertEqual(response.json()['excluidos'], 1000)
+        self.assertLess(len(consultas), 40)
+        self.assertFalse(Assinatura.objects.exists())
+        self.assertConsolidadoCorreto()
+
+    def test_item_invalido_nao_grava_nada(self):
+        itens = self.itens(5)
+        itens[1]['valor'] = '0'
+        itens[3]['ciclo_pagamento'] = 'SEMANAL'
+        itens[4]['extra'] = 1
+        response = self.enviar('POST', 'api_assinaturas', itens)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([e['indice'] for e in response.json()['erros']], [1, 3, 4])
+        self.assertFalse(Assinatura.objects.exists())
+
+        response = self.enviar('POST', 'api_assinaturas', {'nome': 'x'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.generic(
+            'POST', reverse('api_assinaturas'), '{', content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+        criada = self.enviar('POST', 'api_assinaturas', self.itens(1)).json()
+        pk = criada['resultados'][0]['id']
+        response = self.enviar('PATCH', 'api_assinaturas', [
+            {'id': pk, 'nome': 'Novo'}, {'id': pk, 'valor': 1},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Assinatura.objects.get(pk=pk).nome, 'Serviço 0')
+
+    def test_categorias_em_lote(self):
+        assinaturas = criar_assinaturas(self.usuario, 9)
+        response = self.enviar('POST', 'api_categorias', [
+            {'nome': 'Jogos', 'cor': '#112233'},
+            {'nome': 'Streaming'},
+            {'nome': 'Jogos'},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([e['indice'] for e in response.json()['erros']], [1, 2])
+
+        response = self.enviar('POST', 'api_categorias', [{'nome': 'Jogos', 'cor': None}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json()['erros'][0]['mensagens'], ['Cor inválida: None (use #RRGGBB).']
+        )
+
+        response = self.enviar('POST', 'api_categorias', [{'nome': 'Jogos', 'cor': '#112233'}])
+        self.assertEqual(response.status_code, 201)
+        jogos = response.json()['resultados'][0]
+
+        a, b = self.categorias[:2]
+        response = self.enviar('PATCH', 'api_categorias', [
+            {'id': a.pk, 'nome': 'Filmes', 'descricao': None}, {'id': b.pk, 'cor': '#000000'},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [c['nome'] for c in response.json()['resultados']], ['Filmes', b.nome]
+        )
+        response = self.enviar('PATCH', 'api_categorias', [{'id': jogos['id'], 'nome': b.nome}])
+        self.assertEqual(response.status_code, 400)
+        # Troca de nomes: o índice único é verificado linha a linha
+        response = self.enviar('PATCH', 'api_categorias', [
+            {'id': a.pk, 'nome': b.nome}, {'id': b.pk, 'nome': 'Filmes'},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Categoria.objects.get(pk=a.pk).nome, 'Filmes')
+
+        nomes = [c['nome'] for c in self.client.get(
+            reverse('api_categorias'), {'limite': 200}
+        ).json()['resultados']]
+        self.assertEqual(nomes, sorted(nomes))
+
+        afetadas = [x.pk for x in assinaturas if x.categoria_id in (a.pk, b.pk)]
+        response = self.enviar('DELETE', 'api_categorias', [a.pk, b.pk])
+        self.assertEqual(response.json()['excluidos'], 2)
+        self.assertEqual(
+            Assinatura.objects.filter(categoria=None).count(), len(afetadas)
+        )
+        self.assertConsolidadoCorreto()
+
+
+@override_settings(SINCRONIZACAO_MARGEM=0)
+class SincronizacaoTests(TestCase):
+    """Sincronização incremental: mudanças desde o token e exclusões"""
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('sync', password='senha123')
+        self.client.force_login(self.usuario)
+        self.assinaturas = criar_assinaturas(self.usuario, 12)
+        criar_assinaturas(User.objects.create_user('outro_sync'), 3)
+
+    def sincronizar(self, token=None):
+        parametros = {'token': token} if token else {}
+        response = self.client.get(reverse('api_sincronizar'), parametros)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def ids(self, dados, chave):
+        return sorted(item['id'] for item in dados[chave])
+
+    def test_primeira_sincronizacao_paginada(self):
+        # Várias linhas com a mesma data_atualizacao (update em massa)
+        Assinatura.objects.filter(usuario=self.usuario).update(status='PAUSADA')
+        vistas = {'assinaturas': [], 'categorias': []}
+        token, paginas = None, 0
+        while True:
+            dados = sincronizar(self.usuario, token, limite=5)
+            for chave in vistas:
+                vistas[chave] += [item['id'] for item in dados[chave]]
+            token, paginas = dados['token'], paginas + 1
+            if not dados['mais']:
+                break
+        self.assertEqual(paginas, 5)
+        self.assertEqual(
+            sorted(vistas['assinaturas']), sorted(a.pk for a in self.assinaturas)
+        )
+        self.assertEqual(
+            sorted(vistas['categorias']),
+            list(self.usuario.categorias.order_by('id').values_list('id', flat=True)),
+        )
+
+    def test_sondagem_sem_mudancas(self):
+        token = self.sincronizar()['token']
+        # sessão, usuário, mudanças (UNION ALL)
+        with self.assertNumQueries(3):
+            dados = self.sincronizar(token)
+        self.assertEqual(dados['assinaturas'], [])
+        self.assertEqual(dados['categorias'], [])
+        self.assertEqual(dados['excluidas'], {'assinaturas': [], 'categorias': []})
+        self.assertFalse(dados['mais'])
+
+    def test_alteracoes_e_exclusoes(self):
+        token = self.sincronizar()['token']
+        a, b, c, d = self.assinaturas[:4]
+        excluidas = sorted([b.pk, c.pk, d.pk])
+        a.observacoes = 'nova'
+        a.save(update_fields=['observacoes'])
+        Assinatura.objects.filter(pk__in=[c.pk, d.pk]).delete()
+        b.delete()
+        categoria = self.usuario.categorias.exclude(
+            pk__in=[a.categoria_id]
+        ).filter(assinaturas__isnull=False).first()
+        afetadas = list(categoria.assinaturas.values_list('id', flat=True))
+        self.client.generic(
+            'PATCH', reverse('api_categorias'),
+            json.dumps([{'id': a.categoria_id, 'cor': '#000000'}]),
+            content_type='application/json',
+        )
+
+        dados = self.sincronizar(token)
+        self.assertEqual(self.ids(dados, 'assinaturas'), [a.pk])
+        self.assertEqual(dados['assinaturas'][0]['observacoes'], 'nova')
+        self.assertEqual(self.ids(dados, 'categorias'), [a.categoria_id])
+        self.assertEqual(sorted(dados['excluidas']['assinaturas']), excluidas)
+
+        # Assinaturas de uma categoria excluída voltam sem categoria
+        token = dados['token']
+        categoria_id = categoria.pk
+        categoria.delete()
+        dados = self.sincronizar(token)
+        self.assertEqual(dados['excluidas']['categorias'], [categoria_id])
+        restantes = sorted(set(afetadas) - set(excluidas))
+        self.assertEqual(self.ids(dados, 'assinaturas'), restantes)
+        self.assertTrue(all(
+            item['categoria_id'] is None for item in dados['assinaturas']
+        ))
+        self.assertEqual(self.sincronizar(dados['token'])['assinaturas'], [])
+
+        # Pela API: uma Exclusao por categoria em um INSERT
+        token = dados['token']
+        outras = sorted(self.usuario.categorias.values_list('id', flat=True)[:2])
+        self.client.generic(
+            'DELETE', reverse('api_categorias'), json.dumps(outras),
+            content_type='application/json',
+        )
+        self.assertEqual(
+            sorted(self.sincronizar(token)['excluidas']['categorias']), outras
+        )
+
+        # Excluir o usuário leva as exclusões junto, sem gravar novas
+        self.usuario.delete()
+        self.assertFalse(Exclusao.objects.exists())
+
+    @override_settings(SINCRONIZACAO_MARGEM=60)
+    def test_mudancas_recentes_voltam_na_proxima_sondagem(self):
+        token = self.sincronizar()['token']
+        for _ in range(2):
+            dados = self.sincronizar(token)
+            self.assertEqual(len(dados['assinaturas']), 12)
+            token = dados['token']
+
+    def test_token_invalido_ou_expirado(self):
+        response = self.client.get(reverse('api_sincronizar'), {'token': 'xyz'})
+        self.assertEqual(response.status_code, 400)
+
+        antigo = timezone.now() - timedelta(days=100)
+        self.assertEqual(self.client.get(
+            reverse('api_sincronizar'),
+            {'token': codificar_token((antigo, 0, 1))},
+        ).status_code, 410)
+
+        self.assinaturas[0].delete()
+        Exclusao.objects.update(data_exclusao=antigo)
+        mantida = self.assinaturas[1].pk
+        self.assinaturas[1].delete()
+        saida = StringIO()
+        call_command('limpar_exclusoes', stdout=saida)
+        self.assertIn('1 exclusões', saida.getvalue())
+        self.assertEqual(
+            list(Exclusao.objects.values_list('objeto_id', flat=True)),
+            [mantida],
+        )
+
+        self.client.logout()
+        self.assertEqual(
+            self.client.get(reverse('api_sincronizar')).status_code, 401
+        )
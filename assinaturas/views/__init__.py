@@ -31,6 +31,42 @@ from .categoria_views import (
     deletar_categoria,
 )
 
+# Importar views da projeção de gastos
+from .projecao_views import (
+    projecao,
+    projecao_json,
+)
+
+# Importar views de exportação
+from .exportacao_views import (
+    exportar_assinaturas,
+    exportar_categorias,
+)
+
+# Importar views de importação
+from .importacao_views import (
+    importar_assinaturas,
+)
+
+# Importar views das tarefas em segundo plano
+from .tarefa_views import (
+    status_tarefa,
+)
+
+# Importar views do calendário
+from .calendario_views import (
+    calendario_ics,
+)
+
+# Importar views da API JSON
+from .api_views import (
+    api_assinaturas,
+    api_assinatura,
+    api_categorias,
+    api_categoria,
+    api_sincronizar,
+)
+
 # Importar views de configurações
 from .configuracoes_views import (
     configuracoes,
@@ -59,6 +95,24 @@ __all__ = [
     'editar_categoria',
     'deletar_categoria',
     'categorias_view',  # Alias para compatibilidade
+    # Projeção
+    'projecao',
+    'projecao_json',
+    # Exportação
+    'exportar_assinaturas',
+    'exportar_categorias',
+    # Importação
+    'importar_assinaturas',
+    # Tarefas
+    'status_tarefa',
+    # Calendário
+    'calendario_ics',
+    # API
+    'api_assinaturas',
+    'api_assinatura',
+    'api_categorias',
+    'api_categoria',
+    'api_sincronizar',
     # Configurações
     'configuracoes',
 ]
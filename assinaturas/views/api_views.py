@@ -0,0 +1,193 @@
+"""
+Views da API JSON de assinaturas e categorias
+
+Cada endpoint de coleção atende GET (listagem paginada por cursor),
+POST (criação em lote), PATCH (alteração em lote) e DELETE (exclusão
+em lote, corpo com a lista de ids); o de item atende GET. A autenticação
+é a mesma sessão do site (escritas com o token CSRF no cabeçalho
+X-CSRFToken). As respostas levam ETag e GET com If-None-Match igual
+responde 304. api_sincronizar entrega só as mudanças desde um token
+(ver sincronizacao.py).
+"""
+import hashlib
+import json
+from functools import wraps
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from django.views.decorators.http import require_http_methods, require_safe
+
+from .. import api, sincronizacao
+from ..models import Assinatura, Categoria
+from ..paginacao import CursorInvalido, paginar_keyset
+from .assinatura_views import filtrar_assinaturas
+
+
+def _responder(request, dados, status=200):
+    """JSON com ETag do corpo; GET com a mesma ETag recebe 304"""
+    corpo = json.dumps(dados, cls=DjangoJSONEncoder, ensure_ascii=False)
+    response = HttpResponse(
+        corpo, status=status, content_type='application/json'
+    )
+    etag = quote_etag(hashlib.md5(corpo.encode()).hexdigest())
+    response['ETag'] = etag
+    # O cliente pode guardar, mas revalida a cada uso
+    patch_cache_control(response, private=True, no_cache=True)
+    if request.method in ('GET', 'HEAD') and status == 200:
+        return get_conditional_response(request, etag=etag, response=response)
+    return response
+
+
+def _erro(request, status, mensagem, erros=None):
+    dados = {'erro': mensagem}
+    if erros is not None:
+        dados['erros'] = erros
+    return _responder(request, dados, status)
+
+
+def api_login_required(view):
+    """Como login_required, mas responde 401 em vez de redirecionar"""
+    @wraps(view)
+    def verificar(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return _erro(request, 401, 'Autenticação necessária.')
+        return view(request, *args, **kwargs)
+    return verificar
+
+
+def _limite(request):
+    """?limite= entre 1 e LIMITE_PAGINA (TAMANHO_PAGINA se ausente)"""
+    try:
+        limite = int(request.GET.get('limite', api.TAMANHO_PAGINA))
+    except ValueError:
+        return api.TAMANHO_PAGINA
+    return min(max(limite, 1), api.LIMITE_PAGINA)
+
+
+def _pagina(request, queryset, ordenacao):
+    try:
+        pagina = paginar_keyset(
+            queryset,
+            ordenacao,
+            cursor=request.GET.get('cursor'),
+            tamanho=_limite(request),
+            estrito=True,
+        )
+    except CursorInvalido as erro:
+        return _erro(request, 400, str(erro))
+    return _responder(request, {
+        'resultados': pagina['itens'],
+        'proxima': pagina['proxima'],
+        'anterior': pagina['anterior'],
+    })
+
+
+def _gravar(request, criar, atualizar, excluir, serializar):
+    """POST, PATCH e DELETE de uma coleção"""
+    try:
+        itens = json.loads(request.body)
+    except ValueError:
+        return _erro(request, 400, 'Corpo JSON inválido.')
+
+    try:
+        if request.method == 'POST':
+            ids = criar(request.user, itens)
+            status = 201
+        elif request.method == 'PATCH':
+            ids = atualizar(request.user, itens)
+            status = 200
+        else:
+            return _responder(request, {'excluidos': excluir(request.user, itens)})
+    except api.ErroLote as erro:
+        return _erro(request, 400, str(erro), erro.erros)
+
+    return _responder(
+        request, {'resultados': serializar(request.user, ids)}, status
+    )
+
+
+@api_login_required
+@require_http_methods(['GET', 'HEAD', 'POST', 'PATCH', 'DELETE'])
+def api_assinaturas(request):
+    """
+    Assinaturas do usuário. GET aceita os filtros da listagem
+    (status, categoria, search), order_by, cursor e limite.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return _gravar(
+            request,
+            api.criar_assinaturas,
+            api.atualizar_assinaturas,
+            api.excluir_assinaturas,
+            api.serializar_assinaturas,
+        )
+
+    assinaturas, _ = filtrar_assinaturas(
+        request, Assinatura.objects.for_user(request.user)
+    )
+    order_by = Assinatura.ordenacao_valida(request.GET.get('order_by'))
+    return _pagina(
+        request, assinaturas.values(*api.CAMPOS_ASSINATURA), order_by
+    )
+
+
+@api_login_required
+@require_safe
+def api_assinatura(request, id):
+    """Uma assinatura do usuário"""
+    assinatura = Assinatura.objects.for_user(request.user).filter(
+        id=id
+    ).values(*api.CAMPOS_ASSINATURA).first()
+    if assinatura is None:
+        return _erro(request, 404, 'Assinatura não encontrada.')
+    return _responder(request, assinatura)
+
+
+@api_login_required
+@require_http_methods(['GET', 'HEAD', 'POST', 'PATCH', 'DELETE'])
+def api_categorias(request):
+    """Categorias do usuário, por nome; GET aceita cursor e limite"""
+    if request.method not in ('GET', 'HEAD'):
+        return _gravar(
+            request,
+            api.criar_categorias,
+            api.atualizar_categorias,
+            api.excluir_categorias,
+            api.serializar_categorias,
+        )
+
+    categorias = Categoria.objects.filter(usuario=request.user)
+    return _pagina(request, categorias.values(*api.CAMPOS_CATEGORIA), 'nome')
+
+
+@api_login_required
+@require_safe
+def api_categoria(request, id):
+    """Uma categoria do usuário"""
+    categoria = Categoria.objects.filter(
+        usuario=request.user, id=id
+    ).values(*api.CAMPOS_CATEGORIA).first()
+    if categoria is None:
+        return _erro(request, 404, 'Categoria não encontrada.')
+    return _responder(request, categoria)
+
+
+@api_login_required
+@require_safe
+def api_sincronizar(request):
+    """
+    Assinaturas e categorias alteradas e ids excluídos desde ?token=
+    (tudo, sem token), com o token da próxima chamada. Token expirado
+    responde 410: o cliente descarta a cópia e recomeça sem token.
+    """
+    try:
+        dados = sincronizacao.sincronizar(
+            request.user, request.GET.get('token')
+        )
+    except sincronizacao.TokenInvalido as erro:
+        return _erro(request, 400, str(erro))
+    except sincronizacao.TokenExpirado as erro:
+        return _erro(request, 410, str(erro))
+    return _responder(request, dados)
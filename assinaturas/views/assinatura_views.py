@@ -5,52 +5,87 @@ Views para CRUD de Assinaturas
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.db.models import Count, Q
 from decimal import Decimal
 from datetime import datetime
 from ..models import Assinatura, Categoria
+from ..paginacao import paginar_keyset
+from ..signals import garantir_categorias_padrao
 
 
-@login_required(login_url='login')
-def listar_assinaturas(request):
-    """View para listagem de assinaturas com filtros"""
-    # Buscar todas as assinaturas do usuário
-    assinaturas = Assinatura.objects.filter(usuario=request.user)
+# Quantidade de assinaturas por página na listagem
+ASSINATURAS_POR_PAGINA = 25
+
+
+def filtrar_assinaturas(request, assinaturas):
+    """
+    Aplica os filtros da listagem (status, categoria, busca) vindos da
+    query string. Retorna (queryset, filtros aplicados).
+    """
+    filtros = {
+        'status_filter': request.GET.get('status', ''),
+        'categoria_filter': request.GET.get('categoria', ''),
+        'search': request.GET.get('search', ''),
+    }
+    # Categoria que não é um id (ex.: ?categoria=abc) é ignorada
+    if not filtros['categoria_filter'].isdigit():
+        filtros['categoria_filter'] = ''
 
     # Filtro por status
-    status_filter = request.GET.get('status', '')
-    if status_filter:
-        assinaturas = assinaturas.filter(status=status_filter)
+    if filtros['status_filter']:
+        assinaturas = assinaturas.filter(status=filtros['status_filter'])
 
     # Filtro por categoria
-    categoria_filter = request.GET.get('categoria', '')
-    if categoria_filter:
-        assinaturas = assinaturas.filter(categoria_id=categoria_filter)
+    if filtros['categoria_filter']:
+        assinaturas = assinaturas.filter(
+            categoria_id=filtros['categoria_filter']
+        )
 
     # Busca por nome
-    search = request.GET.get('search', '')
-    if search:
-        assinaturas = assinaturas.filter(nome__icontains=search)
+    if filtros['search']:
+        assinaturas = assinaturas.filter(nome__icontains=filtros['search'])
 
-    # Ordenação
-    order_by = request.GET.get('order_by', '-data_criacao')
-    assinaturas = assinaturas.order_by(order_by)
+    return assinaturas, filtros
+
+
+@login_required(login_url='login')
+def listar_assinaturas(request):
+    """View para listagem de assinaturas com filtros"""
+    # Buscar todas as assinaturas do usuário
+    assinaturas, filtros = filtrar_assinaturas(
+        request,
+        Assinatura.objects.for_user(request.user).with_categoria()
+    )
+
+    # Ordenação (apenas as declaradas em Assinatura.ORDENACAO_CHOICES)
+    order_by = Assinatura.ordenacao_valida(request.GET.get('order_by'))
 
     # Buscar todas as categorias do usuário para o filtro
     categorias = Categoria.objects.filter(usuario=request.user)
 
     # Estatísticas
-    total_assinaturas = assinaturas.count()
-    assinaturas_ativas = assinaturas.filter(status='ATIVA').count()
+    estatisticas = assinaturas.aggregate(
+        total_assinaturas=Count('id'),
+        assinaturas_ativas=Count('id', filter=Q(status='ATIVA')),
+    )
+
+    # Paginação por cursor
+    pagina = paginar_keyset(
+        assinaturas,
+        order_by,
+        cursor=request.GET.get('cursor'),
+        tamanho=ASSINATURAS_POR_PAGINA,
+    )
 
     context = {
-        'assinaturas': assinaturas,
+        'assinaturas': pagina['itens'],
+        'pagina': pagina,
         'categorias': categorias,
-        'total_assinaturas': total_assinaturas,
-        'assinaturas_ativas': assinaturas_ativas,
-        'status_filter': status_filter,
-        'categoria_filter': categoria_filter,
-        'search': search,
+        'total_assinaturas': estatisticas['total_assinaturas'],
+        'assinaturas_ativas': estatisticas['assinaturas_ativas'],
+        **filtros,
         'order_by': order_by,
+        'ordenacoes': Assinatura.ORDENACAO_CHOICES,
     }
 
     return render(request, 'assinaturas.html', context)
@@ -123,6 +158,7 @@ def criar_assinatura(request):
             return redirect('criar_assinatura')
 
     # GET request - exibir formulário
+    garantir_categorias_padrao(request.user)
     categorias = Categoria.objects.filter(usuario=request.user)
 
     context = {
@@ -138,9 +174,8 @@ def criar_assinatura(request):
 def editar_assinatura(request, id):
     """View para editar assinatura existente"""
     assinatura = get_object_or_404(
-        Assinatura,
-        id=id,
-        usuario=request.user
+        Assinatura.objects.for_user(request.user),
+        id=id
     )
 
     if request.method == 'POST':
@@ -205,6 +240,7 @@ def editar_assinatura(request, id):
             return redirect('editar_assinatura', id=id)
 
     # GET request - exibir formulário preenchido
+    garantir_categorias_padrao(request.user)
     categorias = Categoria.objects.filter(usuario=request.user)
 
     context = {
@@ -222,9 +258,8 @@ def editar_assinatura(request, id):
 def deletar_assinatura(request, id):
     """View para deletar assinatura"""
     assinatura = get_object_or_404(
-        Assinatura,
-        id=id,
-        usuario=request.user
+        Assinatura.objects.for_user(request.user),
+        id=id
     )
 
     if request.method == 'POST':
@@ -6,6 +6,7 @@ from django.shortcuts import render, redirect
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import User
 from django.contrib import messages
+from django.db import transaction
 
 
 def login_view(request):
@@ -57,12 +58,13 @@ def signup_view(request):
             messages.error(request, 'Este e-mail já está cadastrado.')
             return render(request, 'signup.html')
 
-        # Criar usuário
-        user = User.objects.create_user(
-            username=username,
-            email=email,
-            password=password
-        )
+        # Criar usuário (e as categorias padrão, via signal) na mesma transação
+        with transaction.atomic():
+            user = User.objects.create_user(
+                username=username,
+                email=email,
+                password=password
+            )
 
         # Fazer login automático
         login(request, user)
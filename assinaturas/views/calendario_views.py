@@ -0,0 +1,52 @@
+"""
+View do calendário (.ics) de cobranças
+
+Acessada por aplicativos de calendário, que não têm sessão: o acesso é
+pelo token do feed. Com a versão (ETag/Last-Modified) calculada antes
+de gerar o corpo, as revalidações sem mudança respondem 304 com duas
+consultas.
+"""
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+from ..calendario import calendario_usuario, versao
+from ..models import FeedCalendario
+
+
+# Intervalo sugerido para o cliente revalidar (segundos)
+CALENDARIO_MAX_AGE = 60 * 15
+
+
+def _cabecalhos(response, etag, ultima_alteracao):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(ultima_alteracao.timestamp())
+    patch_cache_control(response, private=True, max_age=CALENDARIO_MAX_AGE)
+    return response
+
+
+@require_safe
+def calendario_ics(request, token):
+    """
+    Próximas cobranças do dono do token no formato iCalendar
+    """
+    feed = get_object_or_404(
+        FeedCalendario.objects.only('usuario', 'data_atualizacao'),
+        token=token,
+    )
+    etag, ultima_alteracao = versao(feed)
+
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(ultima_alteracao.timestamp())
+    )
+    if response is not None:
+        return _cabecalhos(response, etag, ultima_alteracao)
+
+    response = HttpResponse(
+        calendario_usuario(feed, etag, ultima_alteracao),
+        content_type='text/calendar; charset=utf-8',
+    )
+    response['Content-Disposition'] = 'inline; filename="cobrancas.ics"'
+    return _cabecalhos(response, etag, ultima_alteracao)
@@ -7,11 +7,14 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db.models import Count, Q
 from ..models import Categoria, Assinatura
+from ..signals import garantir_categorias_padrao
 
 
 @login_required(login_url='login')
 def listar_categorias(request):
     """View para listagem de categorias com estatísticas"""
+    garantir_categorias_padrao(request.user)
+
     # Buscar todas as categorias do usuário
     categorias = Categoria.objects.filter(usuario=request.user).annotate(
         total_assinaturas=Count(
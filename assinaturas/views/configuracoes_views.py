@@ -6,6 +6,12 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.contrib.auth import update_session_auth_hash
 from django.contrib.auth.forms import PasswordChangeForm
+from django.db.models import Q, Sum
+from django.urls import reverse
+from decimal import Decimal
+from ..cambio import converter, moeda_base, moedas_disponiveis
+from ..models import FeedCalendario, Perfil
+from ..models.assinatura import simbolo_moeda
 
 
 @login_required(login_url='login')
@@ -54,23 +60,83 @@ def configuracoes(request):
                 messages.success(request, 'Senha alterada com sucesso!')
             
             return redirect('configuracoes')
+        
+        # Ativar o calendário ou trocar o endereço (invalida o anterior)
+        elif action == 'regenerate_calendar':
+            feed, criado = FeedCalendario.objects.get_or_create(
+                usuario=request.user
+            )
+            if criado:
+                messages.success(request, 'Calendário de cobranças ativado!')
+            else:
+                feed.regenerar()
+                messages.success(
+                    request,
+                    'Novo endereço do calendário gerado. O anterior deixou de funcionar.'
+                )
+            
+            return redirect('configuracoes')
+        
+        # Moeda em que os totais são exibidos
+        elif action == 'update_currency':
+            moeda = request.POST.get('moeda_base', '').strip().upper()
+            if moeda not in moedas_disponiveis():
+                messages.error(request, 'Moeda sem taxa de câmbio cadastrada.')
+            else:
+                # Os signals invalidam o resumo e o calendário
+                Perfil.objects.update_or_create(
+                    usuario=request.user, defaults={'moeda_base': moeda}
+                )
+                messages.success(request, f'Moeda base alterada para {moeda}.')
+            
+            return redirect('configuracoes')
     
-    # Estatísticas do usuário
-    total_assinaturas = request.user.assinaturas.count()
-    assinaturas_ativas = request.user.assinaturas.filter(status='ATIVA').count()
+    # Estatísticas do usuário a partir dos gastos consolidados, por
+    # moeda (gasto mensal derivado do anual, que é exato), na moeda
+    # base; moedas sem taxa ficam fora do gasto, como no dashboard
+    moeda = moeda_base(request.user)
+    ativa = Q(status='ATIVA')
+    por_moeda = request.user.gastos_consolidados.values('moeda').annotate(
+        total_assinaturas=Sum('quantidade', default=0),
+        assinaturas_ativas=Sum('quantidade', filter=ativa, default=0),
+        valor_original=Sum('valor_anual', filter=ativa, default=Decimal('0')),
+        gasto_anual=Sum(converter('valor_anual', moeda), filter=ativa),
+    ).order_by('moeda')
+    total_assinaturas = assinaturas_ativas = 0
+    gasto_anual = Decimal('0')
+    sem_conversao = []
+    for linha in por_moeda:
+        total_assinaturas += linha['total_assinaturas']
+        assinaturas_ativas += linha['assinaturas_ativas']
+        if linha['gasto_anual'] is not None:
+            gasto_anual += linha['gasto_anual']
+        elif linha['valor_original']:
+            sem_conversao.append({
+                'moeda': linha['moeda'],
+                'simbolo': simbolo_moeda(linha['moeda']),
+                'gasto_anual': linha['valor_original'],
+            })
     total_categorias = request.user.categorias.count()
+    gasto_mensal = gasto_anual / 12
     
-    # Calcular gasto total
-    gasto_mensal = sum(
-        a.valor_mensal() 
-        for a in request.user.assinaturas.filter(status='ATIVA')
-    )
+    # Endereço do calendário (.ics), se ativado
+    feed = FeedCalendario.objects.filter(usuario=request.user).first()
+    calendario_url = None
+    if feed is not None:
+        calendario_url = request.build_absolute_uri(
+            reverse('calendario_ics', args=[feed.token])
+        )
     
     context = {
         'total_assinaturas': total_assinaturas,
         'assinaturas_ativas': assinaturas_ativas,
         'total_categorias': total_categorias,
         'gasto_mensal': gasto_mensal,
+        'sem_conversao': sem_conversao,
+        'simbolo_moeda': simbolo_moeda(moeda),
+        'moeda_base': moeda,
+        'moedas_disponiveis': moedas_disponiveis(),
+        'calendario_url': calendario_url,
     }
     
     return render(request, 'configuracoes.html', context)
@@ -3,9 +3,7 @@ Views para o dashboard principal
 """
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
-from django.db.models import Count, Q
-from datetime import date, timedelta
-from ..models import Assinatura, Categoria
+from ..resumo import obter_resumo
 
 
 @login_required(login_url='login')
@@ -13,53 +11,19 @@ def dashboard(request):
     """
     View principal do dashboard com estatísticas e resumo das assinaturas
     """
-    # Assinaturas ativas do usuário
-    assinaturas_ativas = Assinatura.objects.filter(
-        usuario=request.user,
-        status='ATIVA'
-    )
-
-    # Total de assinaturas ativas
-    total_assinaturas = assinaturas_ativas.count()
-
-    # Gasto mensal (convertendo todas as assinaturas para base mensal)
-    gasto_mensal = sum(
-        assinatura.valor_mensal()
-        for assinatura in assinaturas_ativas
-    )
-
-    # Gasto anual
-    gasto_anual = sum(
-        assinatura.valor_anual()
-        for assinatura in assinaturas_ativas
-    )
-
-    # Próximas cobranças (próximos 30 dias)
-    hoje = date.today()
-    proximos_30_dias = hoje + timedelta(days=30)
-
-    proximas_cobranças = assinaturas_ativas.filter(
-        data_proxima_cobranca__gte=hoje,
-        data_proxima_cobranca__lte=proximos_30_dias
-    ).order_by('data_proxima_cobranca')[:5]
-
-    # Distribuição por categoria
-    categorias_stats = Categoria.objects.filter(
-        usuario=request.user
-    ).annotate(
-        total_assinaturas=Count(
-            'assinaturas',
-            filter=Q(assinaturas__status='ATIVA')
-        )
-    ).filter(total_assinaturas__gt=0)
+    # Totais, próximas cobranças e categorias (em cache por usuário)
+    resumo = obter_resumo(request.user)
 
     context = {
-        'total_assinaturas': total_assinaturas,
-        'gasto_mensal': gasto_mensal,
-        'gasto_anual': gasto_anual,
-        'proximas_cobranças': proximas_cobranças,
-        'categorias_stats': categorias_stats,
-        'assinaturas_ativas': assinaturas_ativas[:5],
+        'simbolo_moeda': resumo['simbolo_moeda'],
+        'total_assinaturas': resumo['total_assinaturas'],
+        'gasto_mensal': resumo['gasto_mensal'],
+        'gasto_anual': resumo['gasto_anual'],
+        'sem_conversao': resumo['sem_conversao'],
+        'proximas_cobranças': resumo['proximas_cobrancas'],
+        'total_proximas_cobrancas': resumo['total_proximas_cobrancas'],
+        'categorias_stats': resumo['categorias_stats'],
+        'assinaturas_ativas': resumo['assinaturas_ativas'],
     }
 
     return render(request, 'dashboard.html', context)
@@ -0,0 +1,117 @@
+"""
+Views de exportação (CSV e JSON) de assinaturas e categorias
+
+As respostas são geradas em fluxo: as linhas saem do banco com
+values_list().iterator() e são escritas uma a uma, então a memória não
+cresce com o volume e o primeiro byte sai logo após a primeira leitura.
+"""
+import csv
+
+from django.contrib.auth.decorators import login_required
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Q
+from django.http import StreamingHttpResponse
+
+from ..models import Assinatura, Categoria
+from .assinatura_views import filtrar_assinaturas
+
+
+# Linhas buscadas por vez no cursor do banco
+LINHAS_POR_LOTE = 2000
+
+# Colunas exportadas: (campo em values_list, cabeçalho)
+COLUNAS_ASSINATURAS = [
+    ('id', 'id'),
+    ('nome', 'nome'),
+    ('categoria__nome', 'categoria'),
+    ('valor', 'valor'),
+    ('moeda', 'moeda'),
+    ('ciclo_pagamento', 'ciclo_pagamento'),
+    ('status', 'status'),
+    ('data_primeira_cobranca', 'data_primeira_cobranca'),
+    ('data_proxima_cobranca', 'data_proxima_cobranca'),
+    ('valor_mensal_normalizado', 'valor_mensal'),
+    ('descricao', 'descricao'),
+    ('observacoes', 'observacoes'),
+]
+
+COLUNAS_CATEGORIAS = [
+    ('id', 'id'),
+    ('nome', 'nome'),
+    ('descricao', 'descricao'),
+    ('cor', 'cor'),
+    ('total_ativas', 'assinaturas_ativas'),
+    ('total_todas', 'assinaturas'),
+]
+
+
+class _Eco:
+    """Arquivo falso para o csv.writer: write() devolve a linha escrita"""
+
+    def write(self, valor):
+        return valor
+
+
+def _linhas_csv(cabecalho, linhas):
+    escritor = csv.writer(_Eco())
+    # BOM para planilhas abrirem o arquivo como UTF-8
+    yield '\ufeff' + escritor.writerow(cabecalho)
+    for linha in linhas:
+        yield escritor.writerow(linha)
+
+
+def _linhas_json(cabecalho, linhas):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    separador = '['
+    for linha in linhas:
+        yield separador + encoder.encode(dict(zip(cabecalho, linha)))
+        separador = ',\n'
+    yield ']\n' if separador != '[' else '[]\n'
+
+
+def _exportar(request, queryset, colunas, nome_arquivo):
+    """Resposta em fluxo no formato de ?formato= (csv, padrão, ou json)"""
+    campos = [campo for campo, _ in colunas]
+    cabecalho = [titulo for _, titulo in colunas]
+    linhas = queryset.values_list(*campos).iterator(chunk_size=LINHAS_POR_LOTE)
+
+    if request.GET.get('formato') == 'json':
+        conteudo = _linhas_json(cabecalho, linhas)
+        tipo, extensao = 'application/json', 'json'
+    else:
+        conteudo = _linhas_csv(cabecalho, linhas)
+        tipo, extensao = 'text/csv; charset=utf-8', 'csv'
+
+    response = StreamingHttpResponse(conteudo, content_type=tipo)
+    response['Content-Disposition'] = (
+        f'attachment; filename="{nome_arquivo}.{extensao}"'
+    )
+    return response
+
+
+@login_required(login_url='login')
+def exportar_assinaturas(request):
+    """
+    Exporta as assinaturas do usuário com os mesmos filtros e ordenação
+    da listagem (status, categoria, search, order_by)
+    """
+    assinaturas, _ = filtrar_assinaturas(
+        request, Assinatura.objects.for_user(request.user)
+    )
+    order_by = Assinatura.ordenacao_valida(request.GET.get('order_by'))
+    # Mesmo índice (usuario, campo, id) da listagem
+    desempate = '-id' if order_by.startswith('-') else 'id'
+    assinaturas = assinaturas.order_by(order_by, desempate)
+
+    return _exportar(request, assinaturas, COLUNAS_ASSINATURAS, 'assinaturas')
+
+
+@login_required(login_url='login')
+def exportar_categorias(request):
+    """Exporta as categorias do usuário com a contagem de assinaturas"""
+    categorias = Categoria.objects.filter(usuario=request.user).annotate(
+        total_ativas=Count('assinaturas', filter=Q(assinaturas__status='ATIVA')),
+        total_todas=Count('assinaturas'),
+    ).order_by('nome')
+
+    return _exportar(request, categorias, COLUNAS_CATEGORIAS, 'categorias')
@@ -0,0 +1,97 @@
+"""
+View de importação de assinaturas por CSV
+"""
+import io
+import os
+import uuid
+
+from django.conf import settings
+from django.shortcuts import get_object_or_404, redirect, render
+from django.contrib.auth.decorators import login_required
+from django.contrib import messages
+from django.db import transaction
+from django.urls import reverse
+from ..importacao import CAMPOS_OBRIGATORIOS, importar_csv
+from ..models import Tarefa
+from ..signals import garantir_categorias_padrao
+from ..tarefas import enfileirar
+
+
+def _enfileirar_importacao(usuario, arquivo):
+    """Salva o upload em TAREFAS_DIR e cria a tarefa de importação"""
+    os.makedirs(settings.TAREFAS_DIR, exist_ok=True)
+    caminho = os.path.join(
+        settings.TAREFAS_DIR, f'importacao-{uuid.uuid4().hex}.csv'
+    )
+    with open(caminho, 'wb') as destino:
+        for pedaco in arquivo.chunks():
+            destino.write(pedaco)
+    return enfileirar('importar_assinaturas', usuario, arquivo=caminho)
+
+
+@login_required(login_url='login')
+def importar_assinaturas(request):
+    """
+    View para importar assinaturas de um CSV enviado pelo usuário,
+    exibindo o relatório com os erros por linha. Arquivos acima de
+    IMPORTACAO_LIMITE_SINCRONO são importados pelo worker; a página
+    acompanha a tarefa (?tarefa=id) até o relatório ficar pronto.
+    """
+    relatorio = None
+    tarefa = None
+
+    if request.method == 'POST':
+        arquivo = request.FILES.get('arquivo')
+        if not arquivo:
+            messages.error(request, 'Selecione um arquivo CSV.')
+        elif arquivo.size > settings.IMPORTACAO_LIMITE_SINCRONO:
+            garantir_categorias_padrao(request.user)
+            tarefa = _enfileirar_importacao(request.user, arquivo)
+            messages.info(
+                request,
+                'Arquivo recebido. A importação continua em segundo plano.'
+            )
+            return redirect(
+                f"{reverse('importar_assinaturas')}?tarefa={tarefa.pk}"
+            )
+        else:
+            garantir_categorias_padrao(request.user)
+            # Lido em fluxo: o upload não é carregado inteiro na memória
+            texto = io.TextIOWrapper(arquivo, encoding='utf-8-sig', newline='')
+            try:
+                # Um erro no meio do arquivo desfaz os lotes já gravados
+                with transaction.atomic():
+                    relatorio = importar_csv(request.user, texto)
+            except UnicodeDecodeError:
+                messages.error(
+                    request,
+                    'O arquivo deve estar em UTF-8. Nenhuma assinatura foi importada.'
+                )
+            except ValueError as erro:
+                messages.error(request, str(erro))
+            else:
+                if relatorio['importadas']:
+                    messages.success(
+                        request,
+                        f'{relatorio["importadas"]} assinatura(s) importada(s).'
+                    )
+            finally:
+                texto.detach()
+
+    elif request.GET.get('tarefa', '').isdigit():
+        tarefa = get_object_or_404(
+            Tarefa,
+            id=request.GET['tarefa'],
+            usuario=request.user,
+            tipo='importar_assinaturas',
+        )
+        if tarefa.status == 'CONCLUIDA':
+            relatorio = tarefa.resultado
+
+    context = {
+        'relatorio': relatorio,
+        'tarefa': tarefa,
+        'campos_obrigatorios': CAMPOS_OBRIGATORIOS,
+    }
+
+    return render(request, 'importar_assinaturas.html', context)
@@ -0,0 +1,47 @@
+"""
+Views da projeção de gastos futuros
+"""
+from django.shortcuts import render
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from ..models.assinatura import simbolo_moeda
+from ..projecao import HORIZONTES, projetar_usuario
+
+
+def _horizonte(request):
+    """Horizonte pedido em ?meses= (apenas os de HORIZONTES)"""
+    try:
+        meses = int(request.GET.get('meses', HORIZONTES[0]))
+    except ValueError:
+        return HORIZONTES[0]
+    return meses if meses in HORIZONTES else HORIZONTES[0]
+
+
+@login_required(login_url='login')
+def projecao(request):
+    """
+    View com as cobranças previstas mês a mês e por categoria
+    """
+    meses = _horizonte(request)
+    projecao = projetar_usuario(request.user, meses, detalhar=True)
+
+    context = {
+        'projecao': projecao,
+        'simbolo_moeda': simbolo_moeda(projecao['moeda']),
+        'meses': meses,
+        'horizontes': HORIZONTES,
+        'media_mensal': projecao['total'] / meses,
+        'maior_mes': max(mes['total'] for mes in projecao['meses']),
+    }
+
+    return render(request, 'projecao.html', context)
+
+
+@login_required(login_url='login')
+def projecao_json(request):
+    """
+    Projeção em JSON; ?detalhar=1 inclui cada cobrança prevista
+    """
+    detalhar = request.GET.get('detalhar') == '1'
+    projecao = projetar_usuario(request.user, _horizonte(request), detalhar=detalhar)
+    return JsonResponse(projecao)
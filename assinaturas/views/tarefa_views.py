@@ -0,0 +1,27 @@
+"""
+View de acompanhamento das tarefas em segundo plano
+"""
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from ..models import Tarefa
+
+
+@login_required(login_url='login')
+def status_tarefa(request, id):
+    """
+    Situação de uma tarefa do usuário em JSON, consultada
+    periodicamente pelas páginas que enfileiram tarefas
+    """
+    tarefa = get_object_or_404(Tarefa, id=id, usuario=request.user)
+
+    return JsonResponse({
+        'id': tarefa.id,
+        'tipo': tarefa.tipo,
+        'status': tarefa.status,
+        'status_display': tarefa.get_status_display(),
+        'tentativas': tarefa.tentativas,
+        'finalizada': tarefa.finalizada,
+        'erro': tarefa.erro if tarefa.status == 'FALHOU' else '',
+        'resultado': tarefa.resultado,
+    })
@@ -0,0 +1,12 @@
+"""
+Benchmarks reprodutíveis do Meu Bolso
+
+- modelos.py: micro-benchmarks dos métodos de cálculo de Assinatura
+  e do signal de categorias padrão
+- paginas.py: requisições ponta a ponta para cada URL de
+  meubolso/urls.py, pelo test client, em vários volumes de dados
+- medicao.py: medição e comparação entre duas execuções
+
+Executados por `python manage.py benchmark`. Os dados criados ficam
+dentro de transações desfeitas ao final.
+"""
@@ -0,0 +1,49 @@
+"""
+Medição de tempo e comparação entre execuções dos benchmarks
+"""
+import statistics
+import time
+
+
+def medir(funcao, numero=1, repeticoes=5, itens=1, preparar=None):
+    """
+    Executa `funcao` `numero` vezes em cada repetição e retorna o tempo
+    por item em microssegundos (mediana, mínimo e máximo entre as
+    repetições). `itens` é quantos itens cada chamada processa;
+    `preparar` roda antes de cada chamada, fora da medição.
+    """
+    tempos = []
+    for _ in range(repeticoes):
+        decorrido = 0.0
+        for _ in range(numero):
+            if preparar is not None:
+                preparar()
+            inicio = time.perf_counter()
+            funcao()
+            decorrido += time.perf_counter() - inicio
+        tempos.append(decorrido * 1e6 / (numero * itens))
+
+    return {
+        'mediana_us': statistics.median(tempos),
+        'min_us': min(tempos),
+        'max_us': max(tempos),
+        'numero': numero,
+        'repeticoes': repeticoes,
+    }
+
+
+def comparar(base, atual, limite):
+    """
+    Compara os resultados de duas execuções pela mediana.
+
+    Retorna uma lista de (nome, base_us, atual_us, variacao_pct, lento),
+    onde `lento` indica variação acima de `limite` por cento. Benchmarks
+    presentes em apenas uma das execuções são ignorados.
+    """
+    comparacao = []
+    for nome in sorted(set(base) & set(atual)):
+        antes = base[nome]['mediana_us']
+        depois = atual[nome]['mediana_us']
+        variacao = (depois - antes) * 100 / antes if antes else 0.0
+        comparacao.append((nome, antes, depois, variacao, variacao > limite))
+    return comparacao
@@ -0,0 +1,109 @@
+"""
+Micro-benchmarks dos cálculos de Assinatura e do signal de cadastro
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from assinaturas.ciclos import proxima_cobranca
+from assinaturas.models import Assinatura
+from assinaturas.signals import criar_categorias_padrao
+
+from .medicao import medir
+
+
+# Assinaturas em memória usadas pelos micro-benchmarks
+QUANTIDADE_ASSINATURAS = 100
+
+
+def montar_assinaturas(hoje):
+    """Assinaturas não salvas cobrindo todos os ciclos e datas antigas"""
+    ciclos = [ciclo for ciclo, _ in Assinatura.CICLO_CHOICES]
+    assinaturas = []
+    for i in range(QUANTIDADE_ASSINATURAS):
+        # Até ~10 anos no passado: vários ciclos a avançar
+        primeira = hoje - timedelta(days=37 * i)
+        assinaturas.append(Assinatura(
+            nome=f'Benchmark {i}',
+            valor=Decimal('9.90') + i,
+            ciclo_pagamento=ciclos[i % len(ciclos)],
+            data_primeira_cobranca=primeira,
+            data_proxima_cobranca=primeira,
+            dia_vencimento=primeira.day,
+        ))
+    return assinaturas
+
+
+def executar(numero=100, repeticoes=5):
+    """Retorna {nome: resultado} com o tempo por assinatura de cada método"""
+    hoje = date.today()
+    assinaturas = montar_assinaturas(hoje)
+    itens = len(assinaturas)
+    resultados = {}
+
+    def calcular_proxima_cobranca():
+        for assinatura in assinaturas:
+            assinatura.calcular_proxima_cobranca(hoje=hoje)
+
+    def calcular_proxima_cobranca_funcao():
+        for assinatura in assinaturas:
+            proxima_cobranca(
+                assinatura.data_primeira_cobranca,
+                assinatura.ciclo_pagamento,
+                hoje,
+                assinatura.dia_vencimento,
+            )
+
+    def valor_mensal():
+        for assinatura in assinaturas:
+            assinatura.valor_mensal()
+
+    def valor_anual():
+        for assinatura in assinaturas:
+            assinatura.valor_anual()
+
+    def normalizar_valores():
+        for assinatura in assinaturas:
+            assinatura.normalizar_valores()
+
+    micro = {
+        'modelo.calcular_proxima_cobranca': calcular_proxima_cobranca,
+        'ciclos.proxima_cobranca': calcular_proxima_cobranca_funcao,
+        'modelo.valor_mensal': valor_mensal,
+        'modelo.valor_anual': valor_anual,
+        'modelo.normalizar_valores': normalizar_valores,
+    }
+    for nome, funcao in micro.items():
+        resultados[nome] = medir(funcao, numero, repeticoes, itens=itens)
+
+    resultados['signals.criar_categorias_padrao'] = medir_signal_cadastro(
+        numero, repeticoes
+    )
+    return resultados
+
+
+def medir_signal_cadastro(numero, repeticoes):
+    """Tempo do receiver de categorias padrão, um usuário novo por chamada"""
+    with transaction.atomic():
+        # bulk_create não dispara o signal: usuários criados sem categorias
+        usuarios = iter(User.objects.bulk_create([
+            User(username=f'benchmark_signal_{i}')
+            for i in range(numero * repeticoes)
+        ]))
+        atual = {}
+
+        def proximo_usuario():
+            atual['usuario'] = next(usuarios)
+
+        def receiver():
+            criar_categorias_padrao(
+                sender=User, instance=atual['usuario'], created=True
+            )
+
+        resultado = medir(
+            receiver, numero, repeticoes, preparar=proximo_usuario
+        )
+        transaction.set_rollback(True)
+    return resultado
@@ -0,0 +1,220 @@
+"""
+Benchmarks ponta a ponta das URLs de meubolso/urls.py
+
+Cada volume de dados roda em uma transação própria, desfeita ao final.
+O cache é limpo antes de cada requisição, então o dashboard é medido
+sempre calculando o resumo.
+"""
+import random
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from assinaturas.management.commands.gerar_dados_carga import (
+    Command as GerarDadosCarga,
+)
+from assinaturas.models import Assinatura, FeedCalendario
+from assinaturas.signals import criar_categorias_padrao_para
+from assinaturas.tarefas import enfileirar
+
+from .medicao import medir
+
+
+def criar_massa(tamanho, seed=42):
+    """Cria um usuário administrador com `tamanho` assinaturas"""
+    usuario = User.objects.create(
+        username=f'benchmark_{tamanho}', is_staff=True, is_superuser=True
+    )
+    # No modo sob demanda o signal não cria as categorias
+    criar_categorias_padrao_para(usuario)
+    categorias = {c.nome: c for c in usuario.categorias.all()}
+
+    rng = random.Random(seed)
+    gerador = GerarDadosCarga()
+    hoje = date.today()
+    Assinatura.objects.bulk_create(
+        [
+            gerador.gerar_assinatura(rng, usuario, categorias, hoje)
+            for _ in range(tamanho)
+        ],
+        batch_size=5000,
+    )
+    return usuario
+
+
+def baixar(response):
+    """Consome o conteúdo de respostas em fluxo (exportações)"""
+    if response.streaming:
+        response.getvalue()
+    return response
+
+
+def montar_rotas(usuario, repeticoes):
+    """
+    Lista de (nome, requisição, preparação) para cada URL. O nome
+    começa pelo nome da URL em meubolso/urls.py (os testes conferem
+    que nenhuma ficou de fora).
+    """
+    cliente = Client()
+    cliente.force_login(usuario)
+    anonimo = Client()
+
+    assinatura_id = usuario.assinaturas.order_by('id').values_list(
+        'id', flat=True
+    ).first()
+    categoria_id = usuario.categorias.order_by('id').values_list(
+        'id', flat=True
+    ).first()
+    feed, _ = FeedCalendario.objects.get_or_create(usuario=usuario)
+    tarefa = enfileirar('comando', usuario, nome='arquivar_cobrancas')
+    formulario = {
+        'nome': 'Benchmark',
+        'valor': '29,90',
+        'ciclo_pagamento': 'MENSAL',
+        'data_primeira_cobranca': date.today().isoformat(),
+        'categoria': categoria_id,
+        'status': 'ATIVA',
+    }
+
+    # Exclusão: uma assinatura diferente por requisição (+1 do aquecimento)
+    excluir = list(usuario.assinaturas.exclude(id=assinatura_id).order_by(
+        '-id'
+    ).values_list('id', flat=True)[:repeticoes + 1])
+    atual = {}
+
+    def proxima_exclusao():
+        cache.clear()
+        atual['id'] = excluir.pop()
+
+    rotas = [
+        ('robots.txt', lambda: anonimo.get('/robots.txt'), None),
+        ('login', lambda: anonimo.get(reverse('login')), None),
+        ('signup', lambda: anonimo.get(reverse('signup')), None),
+        ('logout', lambda: anonimo.get(reverse('logout')), None),
+        ('dashboard', lambda: cliente.get(reverse('dashboard')), None),
+        ('dashboard_alt', lambda: cliente.get(reverse('dashboard_alt')), None),
+        ('assinaturas', lambda: cliente.get(reverse('assinaturas')), None),
+        ('assinaturas:filtrada', lambda: cliente.get(
+            reverse('assinaturas'),
+            {'status': 'ATIVA', 'search': 'a', 'order_by': '-valor'},
+        ), None),
+        ('criar_assinatura', lambda: cliente.get(
+            reverse('criar_assinatura')
+        ), None),
+        ('criar_assinatura:post', lambda: cliente.post(
+            reverse('criar_assinatura'), formulario
+        ), None),
+        ('editar_assinatura', lambda: cliente.get(
+            reverse('editar_assinatura', args=[assinatura_id])
+        ), None),
+        ('editar_assinatura:post', lambda: cliente.post(
+            reverse('editar_assinatura', args=[assinatura_id]), formulario
+        ), None),
+        ('exportar_assinaturas', lambda: baixar(cliente.get(
+            reverse('exportar_assinaturas')
+        )), None),
+        ('exportar_assinaturas:json', lambda: baixar(cliente.get(
+            reverse('exportar_assinaturas'), {'formato': 'json'}
+        )), None),
+        ('categorias', lambda: cliente.get(reverse('categorias')), None),
+        ('exportar_categorias', lambda: baixar(cliente.get(
+            reverse('exportar_categorias')
+        )), None),
+        ('criar_categoria', lambda: cliente.get(
+            reverse('criar_categoria')
+        ), None),
+        ('editar_categoria', lambda: cliente.get(
+            reverse('editar_categoria', args=[categoria_id])
+        ), None),
+        ('deletar_categoria', lambda: cliente.get(
+            reverse('deletar_categoria', args=[categoria_id])
+        ), None),
+        ('projecao', lambda: cliente.get(
+            reverse('projecao'), {'meses': 24}
+        ), None),
+        ('projecao_json', lambda: cliente.get(
+            reverse('projecao_json'), {'meses': 24}
+        ), None),
+        ('configuracoes', lambda: cliente.get(reverse('configuracoes')), None),
+        ('importar_assinaturas', lambda: cliente.get(
+            reverse('importar_assinaturas')
+        ), None),
+        ('calendario_ics', lambda: anonimo.get(
+            reverse('calendario_ics', args=[feed.token])
+        ), None),
+        ('status_tarefa', lambda: cliente.get(
+            reverse('status_tarefa', args=[tarefa.pk])
+        ), None),
+        ('api_assinaturas', lambda: cliente.get(
+            reverse('api_assinaturas'), {'order_by': '-valor'}
+        ), None),
+        ('api_assinatura', lambda: cliente.get(
+            reverse('api_assinatura', args=[assinatura_id])
+        ), None),
+        ('api_categorias', lambda: cliente.get(
+            reverse('api_categorias')
+        ), None),
+        ('api_categoria', lambda: cliente.get(
+            reverse('api_categoria', args=[categoria_id])
+        ), None),
+        ('api_sincronizar', lambda: cliente.get(
+            reverse('api_sincronizar')
+        ), None),
+        ('admin:index', lambda: cliente.get(reverse('admin:index')), None),
+        ('admin:assinaturas', lambda: cliente.get(
+            reverse('admin:assinaturas_assinatura_changelist')
+        ), None),
+        ('admin:categorias', lambda: cliente.get(
+            reverse('admin:assinaturas_categoria_changelist')
+        ), None),
+    ]
+    # O GET de deletar_assinatura renderiza um template que não existe
+    if len(excluir) == repeticoes + 1:
+        rotas.append(('deletar_assinatura:post', lambda: cliente.post(
+            reverse('deletar_assinatura', args=[atual['id']])
+        ), proxima_exclusao))
+
+    return rotas
+
+
+def contar_consultas(requisicao):
+    """Executa a requisição e retorna (queries executadas, resposta)"""
+    consultas = []
+
+    def registrar(execute, sql, params, many, context):
+        consultas.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(registrar):
+        response = requisicao()
+    return len(consultas), response
+
+
+def executar(tamanhos=(10, 1000), repeticoes=5):
+    """Retorna {nome: resultado} para cada URL em cada volume de dados"""
+    resultados = {}
+    # O test client usa o host "testserver"
+    with override_settings(ALLOWED_HOSTS=['testserver']):
+        for tamanho in tamanhos:
+            with transaction.atomic():
+                usuario = criar_massa(tamanho)
+                for nome, requisicao, preparar in montar_rotas(
+                    usuario, repeticoes
+                ):
+                    preparar = preparar or cache.clear
+                    # Aquecimento, que também conta as queries
+                    preparar()
+                    consultas, response = contar_consultas(requisicao)
+
+                    resultado = medir(
+                        requisicao, repeticoes=repeticoes, preparar=preparar
+                    )
+                    resultado['consultas'] = consultas
+                    resultado['status'] = response.status_code
+                    resultados[f'url.{nome}[{tamanho}]'] = resultado
+                transaction.set_rollback(True)
+    return resultados
@@ -42,6 +42,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'assinaturas.middleware.MedicaoDesempenhoMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -81,6 +82,75 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Usado pelo resumo do dashboard (assinaturas/resumo.py). Em produção com
+# vários processos, use um backend compartilhado (Redis/Memcached).
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'meubolso',
+    },
+    # Histograma do middleware de desempenho: em arquivo para que o
+    # comando desempenho_views leia as medições do servidor
+    'desempenho': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.cache' / 'desempenho',
+    },
+}
+
+
+# Medição de consultas e tempo por requisição (assinaturas/middleware.py):
+# cabeçalho Server-Timing, histograma por URL (manage.py desempenho_views)
+# e log das requisições acima dos limites, com o SQL executado
+
+DESEMPENHO_ATIVO = False
+DESEMPENHO_CACHE = 'desempenho'
+DESEMPENHO_INTERVALO = 10  # segundos entre descargas para o cache
+DESEMPENHO_LIMITE_CONSULTAS = 20
+DESEMPENHO_LIMITE_MS = 500
+
+
+# Categorias padrão de novos usuários: False cria no cadastro;
+# True cria apenas quando o usuário abre categorias ou o formulário
+# de assinatura pela primeira vez (ver assinaturas/signals.py)
+
+CATEGORIAS_PADRAO_SOB_DEMANDA = False
+
+
+# Lembretes de cobrança (manage.py enviar_lembretes): enviados pelo
+# EMAIL_BACKEND (SMTP por padrão, com EMAIL_HOST/EMAIL_PORT etc.);
+# em desenvolvimento, use --backend com o console ou filebased
+
+DEFAULT_FROM_EMAIL = 'Meu Bolso <nao-responda@meubolso.com.br>'
+EMAIL_FILE_PATH = BASE_DIR / 'emails'
+
+
+# Moedas: as taxas de câmbio (TaxaCambio, manage.py carregar_cambio)
+# dizem quanto vale 1 unidade de cada moeda na moeda de referência.
+# Os totais são convertidos para a moeda base do usuário (Perfil).
+
+MOEDA_REFERENCIA = 'BRL'
+CAMBIO_TTL = 300  # segundos que as taxas ficam em memória por processo
+
+
+# Tarefas em segundo plano (manage.py worker, ver assinaturas/tarefas.py):
+# arquivos recebidos ficam em TAREFAS_DIR até a tarefa terminar;
+# importações acima do limite (bytes) saem da requisição
+
+TAREFAS_DIR = BASE_DIR / 'tarefas'
+IMPORTACAO_LIMITE_SINCRONO = 1024 * 1024
+
+
+# Sincronização incremental da API (ver assinaturas/sincronizacao.py):
+# o token não avança além de agora - MARGEM (transações ainda abertas)
+# e as exclusões ficam guardadas por RETENCAO dias (limpar_exclusoes)
+
+SINCRONIZACAO_MARGEM = 2  # segundos
+SINCRONIZACAO_RETENCAO = 90  # dias
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
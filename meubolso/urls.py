@@ -34,15 +34,35 @@ urlpatterns = [
     path('assinaturas/nova/', views.criar_assinatura, name='criar_assinatura'),
     path('assinaturas/<int:id>/editar/', views.editar_assinatura, name='editar_assinatura'),
     path('assinaturas/<int:id>/deletar/', views.deletar_assinatura, name='deletar_assinatura'),
+    path('assinaturas/exportar/', views.exportar_assinaturas, name='exportar_assinaturas'),
+    path('assinaturas/importar/', views.importar_assinaturas, name='importar_assinaturas'),
     
     # Categorias - Estrutura RESTful
     path('categorias/', views.listar_categorias, name='categorias'),
     path('categorias/nova/', views.criar_categoria, name='criar_categoria'),
     path('categorias/<int:id>/editar/', views.editar_categoria, name='editar_categoria'),
     path('categorias/<int:id>/deletar/', views.deletar_categoria, name='deletar_categoria'),
+    path('categorias/exportar/', views.exportar_categorias, name='exportar_categorias'),
+    
+    # Projeção de gastos
+    path('projecao/', views.projecao, name='projecao'),
+    path('projecao/dados/', views.projecao_json, name='projecao_json'),
     
     # Configurações
     path('configuracoes/', views.configuracoes, name='configuracoes'),
+    
+    # Tarefas em segundo plano (consulta do status)
+    path('tarefas/<int:id>/', views.status_tarefa, name='status_tarefa'),
+    
+    # API JSON (listagem, item, gravações em lote e sincronização)
+    path('api/assinaturas/', views.api_assinaturas, name='api_assinaturas'),
+    path('api/assinaturas/<int:id>/', views.api_assinatura, name='api_assinatura'),
+    path('api/categorias/', views.api_categorias, name='api_categorias'),
+    path('api/categorias/<int:id>/', views.api_categoria, name='api_categoria'),
+    path('api/sincronizar/', views.api_sincronizar, name='api_sincronizar'),
+    
+    # Calendário de cobranças (acesso pelo token, sem login)
+    path('calendario/<str:token>.ics', views.calendario_ics, name='calendario_ics'),
 ]
 
 # Servir arquivos estáticos em desenvolvimento
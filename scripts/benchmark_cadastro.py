@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""
+Benchmark da criação de usuários com categorias padrão
+
+Compara a criação antiga (um INSERT por categoria), o bulk_create
+atual e o modo sob demanda. Tudo roda dentro de uma transação que
+é desfeita ao final, sem deixar dados no banco.
+
+Uso: python -m scripts.benchmark_cadastro [--usuarios N]
+"""
+import os
+import sys
+import time
+import django
+
+# Adicionar diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'meubolso.settings')
+django.setup()
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.test.utils import override_settings
+from assinaturas.models import Categoria
+from assinaturas.signals import CATEGORIAS_PADRAO, criar_categorias_padrao
+
+
+def criar_categorias_uma_a_uma(sender, instance, created, **kwargs):
+    """Implementação anterior: um Categoria.objects.create() por categoria"""
+    if created:
+        for categoria_data in CATEGORIAS_PADRAO:
+            Categoria.objects.create(usuario=instance, **categoria_data)
+
+
+def medir(rotulo, quantidade):
+    """Cria `quantidade` usuários e desfaz; retorna ms por cadastro"""
+    with transaction.atomic():
+        inicio = time.perf_counter()
+        for i in range(quantidade):
+            # Sem senha: o hash dominaria a medição
+            User.objects.create(username=f'benchmark_{rotulo}_{i}')
+        decorrido = time.perf_counter() - inicio
+        transaction.set_rollback(True)
+    return decorrido * 1000 / quantidade
+
+
+def executar_benchmark(quantidade):
+    print(f"\n⏱️  Cadastro de {quantidade} usuários (média por usuário)\n")
+
+    # Antes: troca o receiver atual pelo laço de create()
+    post_save.disconnect(criar_categorias_padrao, sender=User)
+    post_save.connect(criar_categorias_uma_a_uma, sender=User)
+    try:
+        antes = medir('antes', quantidade)
+    finally:
+        post_save.disconnect(criar_categorias_uma_a_uma, sender=User)
+        post_save.connect(criar_categorias_padrao, sender=User)
+
+    depois = medir('bulk', quantidade)
+
+    with override_settings(CATEGORIAS_PADRAO_SOB_DEMANDA=True):
+        sob_demanda = medir('sob_demanda', quantidade)
+
+    print(f"   Um INSERT por categoria: {antes:8.3f} ms")
+    print(f"   bulk_create:             {depois:8.3f} ms "
+          f"({antes / depois:.1f}x mais rápido)")
+    print(f"   Sob demanda:             {sob_demanda:8.3f} ms "
+          f"({antes / sob_demanda:.1f}x mais rápido)")
+    print()
+
+
+if __name__ == '__main__':
+    quantidade = 200
+    if '--usuarios' in sys.argv:
+        quantidade = int(sys.argv[sys.argv.index('--usuarios') + 1])
+
+    executar_benchmark(quantidade)
@@ -114,7 +114,7 @@ print("\n" + "=" * 60)
 print("INFORMAÇÕES DAS ASSINATURAS")
 print("=" * 60)
 
-assinaturas = Assinatura.objects.filter(usuario=user, status='ATIVA')
+assinaturas = Assinatura.objects.for_user(user).ativas().with_categoria()
 
 for ass in assinaturas:
     print(f"\n📱 {ass.nome}")
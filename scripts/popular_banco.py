@@ -191,7 +191,7 @@ def criar_dados_exemplo():
     print(f"   • Senha: senha123")
     print(f"   • Categorias: {categorias.count()}")
     
-    assinaturas = Assinatura.objects.filter(usuario=user)
+    assinaturas = Assinatura.objects.for_user(user)
     print(f"   • Assinaturas: {assinaturas.count()}")
     
     total_mensal = sum(a.valor_mensal() for a in assinaturas)
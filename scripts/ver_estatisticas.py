@@ -2,11 +2,21 @@
 """
 Script para visualizar estatísticas do banco de dados
 
-Uso: python -m scripts.ver_estatisticas [--usuarios]
+Os números saem de poucas consultas agregadas sobre GastoConsolidado
+(uma linha por usuário, categoria, status, ciclo e moeda), com os
+valores convertidos para MOEDA_REFERENCIA no próprio SQL; moedas sem
+taxa ficam fora dos totais e são listadas à parte. O modo detalhado
+percorre usuários e assinaturas em fluxo, com .iterator(), então o
+uso de memória não cresce com o volume de dados.
+
+Uso: python -m scripts.ver_estatisticas [--usuarios] [--json]
 """
 import os
 import sys
+import json
+import argparse
 import django
+from decimal import Decimal
 
 # Adicionar diretório raiz ao path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -14,154 +24,324 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'meubolso.settings')
 django.setup()
 
+from django.conf import settings
 from django.contrib.auth.models import User
-from assinaturas.models import Categoria, Assinatura
-from django.db.models import Count, Sum, Q
+from assinaturas.cambio import converter, moedas_sem_taxa
+from assinaturas.models import Categoria, Assinatura, GastoConsolidado
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+ATIVA = Q(status='ATIVA')
+REFERENCIA = settings.MOEDA_REFERENCIA
+
 
+def _dinheiro(valor):
+    """Converte Decimal em float com 2 casas (para saída JSON)"""
+    return float((valor or Decimal('0')).quantize(Decimal('0.01')))
 
-def exibir_estatisticas():
+
+def coletar_estatisticas():
+    """Calcula as estatísticas gerais com consultas agregadas"""
+
+    # ===== USUÁRIOS =====
+    usuarios = User.objects.aggregate(
+        total=Count('id'),
+        ativos=Count('id', filter=Q(is_active=True)),
+    )
+
+    # ===== ASSINATURAS E FINANCEIRO (uma única agregação) =====
+    consolidados = GastoConsolidado.objects.filter(quantidade__gt=0)
+    assinaturas = consolidados.aggregate(
+        total=Sum('quantidade', default=0),
+        ativas=Sum('quantidade', filter=ATIVA, default=0),
+        pausadas=Sum('quantidade', filter=Q(status='PAUSADA'), default=0),
+        canceladas=Sum('quantidade', filter=Q(status='CANCELADA'), default=0),
+        gasto_anual=Sum(
+            converter('valor_anual', REFERENCIA),
+            filter=ATIVA,
+            default=Decimal('0'),
+        ),
+        usuarios_com_assinaturas=Count(
+            'usuario', filter=ATIVA, distinct=True
+        ),
+    )
+    gasto_mensal = assinaturas['gasto_anual'] / 12
+    media_por_usuario = Decimal('0')
+    if assinaturas['usuarios_com_assinaturas']:
+        media_por_usuario = (
+            gasto_mensal / assinaturas['usuarios_com_assinaturas']
+        )
+
+    # ===== CATEGORIAS (agrupadas por nome entre todos os usuários) =====
+    ativos = consolidados.filter(ATIVA)
+    categorias_mais_usadas = ativos.filter(
+        categoria__isnull=False
+    ).values('categoria__nome').annotate(
+        total=Sum('quantidade')
+    ).order_by('-total', 'categoria__nome')[:5]
+
+    # Moedas das ativas que não entram nos totais
+    sem_taxa = moedas_sem_taxa(
+        ativos.values_list('moeda', flat=True).distinct(), REFERENCIA
+    )
+
+    # Assinaturas mais caras, pelo custo mensal na moeda de referência
+    mais_caras = Assinatura.objects.ativas().annotate(
+        mensal_referencia=converter('valor_mensal_normalizado', REFERENCIA)
+    ).filter(mensal_referencia__isnull=False).order_by(
+        '-mensal_referencia'
+    ).values(
+        'nome', 'valor', 'moeda', 'ciclo_pagamento', 'mensal_referencia'
+    )[:5]
+
+    ciclos = ativos.values(
+        'ciclo_pagamento'
+    ).annotate(total=Sum('quantidade')).order_by('-total')
+
+    usuarios_top = ativos.values(
+        'usuario__username'
+    ).annotate(
+        total=Sum('quantidade'),
+        gasto_anual=Sum(
+            converter('valor_anual', REFERENCIA), default=Decimal('0')
+        ),
+    ).order_by('-total', 'usuario__username')[:5]
+
+    return {
+        'usuarios': {
+            'total': usuarios['total'],
+            'ativos': usuarios['ativos'],
+            'inativos': usuarios['total'] - usuarios['ativos'],
+        },
+        'categorias': {
+            'total': Categoria.objects.count(),
+            'mais_usadas': [
+                {'nome': c['categoria__nome'], 'assinaturas': c['total']}
+                for c in categorias_mais_usadas
+            ],
+        },
+        'assinaturas': {
+            'total': assinaturas['total'],
+            'ativas': assinaturas['ativas'],
+            'pausadas': assinaturas['pausadas'],
+            'canceladas': assinaturas['canceladas'],
+        },
+        'financeiro': {
+            'total_mensal': _dinheiro(gasto_mensal),
+            'total_anual': _dinheiro(assinaturas['gasto_anual']),
+            'media_por_usuario_mensal': _dinheiro(media_por_usuario),
+            'moedas_sem_taxa': sem_taxa,
+            'mais_caras': [
+                {
+                    'nome': a['nome'],
+                    'valor': _dinheiro(a['valor']),
+                    'moeda': a['moeda'],
+                    'ciclo_pagamento': a['ciclo_pagamento'],
+                    'valor_mensal': _dinheiro(a['mensal_referencia']),
+                }
+                for a in mais_caras
+            ],
+        },
+        'ciclos': {c['ciclo_pagamento']: c['total'] for c in ciclos},
+        'usuarios_top': [
+            {
+                'username': u['usuario__username'],
+                'assinaturas': u['total'],
+                'gasto_mensal': _dinheiro(u['gasto_anual'] / 12),
+            }
+            for u in usuarios_top
+        ],
+    }
+
+
+def exibir_estatisticas(estatisticas):
     """Exibe estatísticas gerais do banco de dados"""
-    
+
     print("\n" + "="*60)
     print("📊 ESTATÍSTICAS DO BANCO DE DADOS - MEU BOLSO")
     print("="*60 + "\n")
-    
-    # ===== USUÁRIOS =====
-    total_usuarios = User.objects.count()
-    usuarios_ativos = User.objects.filter(is_active=True).count()
-    
+
+    usuarios = estatisticas['usuarios']
     print("👥 USUÁRIOS")
-    print(f"   Total: {total_usuarios}")
-    print(f"   Ativos: {usuarios_ativos}")
-    print(f"   Inativos: {total_usuarios - usuarios_ativos}")
+    print(f"   Total: {usuarios['total']}")
+    print(f"   Ativos: {usuarios['ativos']}")
+    print(f"   Inativos: {usuarios['inativos']}")
     print()
-    
-    # ===== CATEGORIAS =====
-    total_categorias = Categoria.objects.count()
-    categorias_mais_usadas = Categoria.objects.annotate(
-        total_assinaturas=Count('assinaturas', filter=Q(assinaturas__status='ATIVA'))
-    ).order_by('-total_assinaturas')[:5]
-    
+
+    categorias = estatisticas['categorias']
     print("📁 CATEGORIAS")
-    print(f"   Total: {total_categorias}")
+    print(f"   Total: {categorias['total']}")
     print()
     print("   Top 5 categorias mais usadas:")
-    for cat in categorias_mais_usadas:
-        print(f"      • {cat.nome}: {cat.total_assinaturas} assinaturas")
+    for cat in categorias['mais_usadas']:
+        print(f"      • {cat['nome']}: {cat['assinaturas']} assinaturas")
     print()
-    
-    # ===== ASSINATURAS =====
-    total_assinaturas = Assinatura.objects.count()
-    assinaturas_ativas = Assinatura.objects.filter(status='ATIVA').count()
-    assinaturas_pausadas = Assinatura.objects.filter(status='PAUSADA').count()
-    assinaturas_canceladas = Assinatura.objects.filter(status='CANCELADA').count()
-    
+
+    assinaturas = estatisticas['assinaturas']
     print("💳 ASSINATURAS")
-    print(f"   Total: {total_assinaturas}")
-    print(f"   Ativas: {assinaturas_ativas}")
-    print(f"   Pausadas: {assinaturas_pausadas}")
-    print(f"   Canceladas: {assinaturas_canceladas}")
+    print(f"   Total: {assinaturas['total']}")
+    print(f"   Ativas: {assinaturas['ativas']}")
+    print(f"   Pausadas: {assinaturas['pausadas']}")
+    print(f"   Canceladas: {assinaturas['canceladas']}")
     print()
-    
-    # ===== ESTATÍSTICAS FINANCEIRAS =====
-    if assinaturas_ativas > 0:
-        assinaturas = Assinatura.objects.filter(status='ATIVA')
-        
-        # Calcular totais
-        total_mensal = sum(a.valor_mensal() for a in assinaturas)
-        total_anual = sum(a.valor_anual() for a in assinaturas)
-        
-        # Média por usuário
-        usuarios_com_assinaturas = User.objects.filter(
-            assinaturas__status='ATIVA'
-        ).distinct().count()
-        
-        if usuarios_com_assinaturas > 0:
-            media_por_usuario = total_mensal / usuarios_com_assinaturas
-        else:
-            media_por_usuario = 0
-        
+
+    if assinaturas['ativas'] > 0:
+        financeiro = estatisticas['financeiro']
         print("💰 FINANCEIRO (apenas assinaturas ativas)")
-        print(f"   Total mensal: R$ {total_mensal:,.2f}")
-        print(f"   Total anual: R$ {total_anual:,.2f}")
-        print(f"   Média por usuário: R$ {media_por_usuario:,.2f}/mês")
+        print(f"   Total mensal: R$ {financeiro['total_mensal']:,.2f}")
+        print(f"   Total anual: R$ {financeiro['total_anual']:,.2f}")
+        print(f"   Média por usuário: "
+              f"R$ {financeiro['media_por_usuario_mensal']:,.2f}/mês")
+        if financeiro['moedas_sem_taxa']:
+            print(f"   Fora dos totais (sem taxa de câmbio): "
+                  f"{', '.join(financeiro['moedas_sem_taxa'])}")
         print()
-        
-        # Assinaturas mais caras
-        mais_caras = assinaturas.order_by('-valor')[:5]
-        print("   Top 5 assinaturas mais caras:")
-        for ass in mais_caras:
-            print(f"      • {ass.nome}: R$ {ass.valor} ({ass.ciclo_pagamento})")
+
+        print("   Top 5 assinaturas mais caras (por mês):")
+        for ass in financeiro['mais_caras']:
+            print(f"      • {ass['nome']}: {ass['moeda']} {ass['valor']:.2f} "
+                  f"({ass['ciclo_pagamento']}, "
+                  f"R$ {ass['valor_mensal']:,.2f}/mês)")
         print()
-    
-    # ===== CICLOS DE PAGAMENTO =====
-    ciclos = Assinatura.objects.filter(status='ATIVA').values(
-        'ciclo_pagamento'
-    ).annotate(total=Count('id'))
-    
-    if ciclos:
+
+    if estatisticas['ciclos']:
         print("📅 DISTRIBUIÇÃO POR CICLO DE PAGAMENTO")
-        for ciclo in ciclos:
-            print(f"   {ciclo['ciclo_pagamento']}: {ciclo['total']} assinaturas")
+        for ciclo, total in estatisticas['ciclos'].items():
+            print(f"   {ciclo}: {total} assinaturas")
         print()
-    
-    # ===== USUÁRIOS COM MAIS ASSINATURAS =====
-    usuarios_top = User.objects.annotate(
-        total_assinaturas=Count('assinaturas', filter=Q(assinaturas__status='ATIVA'))
-    ).filter(total_assinaturas__gt=0).order_by('-total_assinaturas')[:5]
-    
-    if usuarios_top:
+
+    if estatisticas['usuarios_top']:
         print("🏆 TOP 5 USUÁRIOS COM MAIS ASSINATURAS")
-        for user in usuarios_top:
-            gasto = sum(
-                a.valor_mensal() 
-                for a in user.assinaturas.filter(status='ATIVA')
-            )
-            print(f"   • {user.username}: {user.total_assinaturas} assinaturas "
-                  f"(R$ {gasto:,.2f}/mês)")
+        for user in estatisticas['usuarios_top']:
+            print(f"   • {user['username']}: {user['assinaturas']} assinaturas "
+                  f"(R$ {user['gasto_mensal']:,.2f}/mês)")
         print()
-    
+
     print("="*60 + "\n")
 
 
-def listar_usuarios_detalhado():
+def iterar_usuarios_detalhados(chunk_size=2000):
+    """
+    Gera um dicionário por usuário com suas assinaturas ativas.
+
+    Usuários e assinaturas são lidos em dois fluxos ordenados por
+    usuário e combinados em sequência: apenas as assinaturas do
+    usuário atual ficam em memória.
+    """
+    total_categorias = Categoria.objects.filter(
+        usuario=OuterRef('pk')
+    ).values('usuario').annotate(total=Count('id')).values('total')
+
+    usuarios = User.objects.annotate(
+        total_categorias=Coalesce(
+            Subquery(total_categorias, output_field=IntegerField()), 0
+        )
+    ).order_by('id').values_list(
+        'id', 'username', 'email', 'total_categorias'
+    ).iterator(chunk_size=chunk_size)
+
+    assinaturas = Assinatura.objects.ativas().annotate(
+        anual_referencia=converter('valor_anual_normalizado', REFERENCIA)
+    ).order_by(
+        'usuario_id', 'id'
+    ).values_list(
+        'usuario_id', 'nome', 'categoria__nome', 'valor', 'moeda',
+        'ciclo_pagamento', 'anual_referencia',
+    ).iterator(chunk_size=chunk_size)
+
+    pendente = next(assinaturas, None)
+    for usuario_id, username, email, categorias in usuarios:
+        lista = []
+        sem_taxa = set()
+        gasto_anual = Decimal('0')
+        while pendente is not None and pendente[0] <= usuario_id:
+            if pendente[0] == usuario_id:
+                _, nome, categoria, valor, moeda, ciclo, anual = pendente
+                if anual is None:
+                    sem_taxa.add(moeda)
+                else:
+                    gasto_anual += anual
+                lista.append({
+                    'nome': nome,
+                    'categoria': categoria,
+                    'valor': _dinheiro(valor),
+                    'moeda': moeda,
+                    'ciclo_pagamento': ciclo,
+                })
+            pendente = next(assinaturas, None)
+
+        yield {
+            'username': username,
+            'email': email,
+            'categorias': categorias,
+            'assinaturas_ativas': len(lista),
+            'gasto_mensal': _dinheiro(gasto_anual / 12),
+            'moedas_sem_taxa': sorted(sem_taxa),
+            'assinaturas': lista,
+        }
+
+
+def listar_usuarios_detalhado(usuarios):
     """Lista todos os usuários com suas assinaturas"""
-    
-    usuarios = User.objects.all()
-    
-    if not usuarios:
-        print("\n⚠️  Nenhum usuário encontrado no banco de dados.\n")
-        return
-    
-    print("\n" + "="*60)
-    print("👥 DETALHES DOS USUÁRIOS")
-    print("="*60 + "\n")
-    
+
+    cabecalho = False
     for user in usuarios:
-        assinaturas = user.assinaturas.filter(status='ATIVA')
-        categorias = user.categorias.count()
-        
-        print(f"📌 {user.username} ({user.email})")
-        print(f"   Categorias: {categorias}")
-        print(f"   Assinaturas ativas: {assinaturas.count()}")
-        
-        if assinaturas:
-            total_mensal = sum(a.valor_mensal() for a in assinaturas)
-            print(f"   Gasto mensal: R$ {total_mensal:,.2f}")
+        if not cabecalho:
+            print("\n" + "="*60)
+            print("👥 DETALHES DOS USUÁRIOS")
+            print("="*60 + "\n")
+            cabecalho = True
+
+        print(f"📌 {user['username']} ({user['email']})")
+        print(f"   Categorias: {user['categorias']}")
+        print(f"   Assinaturas ativas: {user['assinaturas_ativas']}")
+
+        if user['assinaturas']:
+            print(f"   Gasto mensal: R$ {user['gasto_mensal']:,.2f}")
+            if user['moedas_sem_taxa']:
+                print(f"   Fora do total (sem taxa de câmbio): "
+                      f"{', '.join(user['moedas_sem_taxa'])}")
             print(f"   Assinaturas:")
-            for ass in assinaturas:
-                cat_nome = ass.categoria.nome if ass.categoria else "Sem categoria"
-                print(f"      • {ass.nome} ({cat_nome}): R$ {ass.valor} "
-                      f"({ass.ciclo_pagamento})")
+            for ass in user['assinaturas']:
+                cat_nome = ass['categoria'] or "Sem categoria"
+                print(f"      • {ass['nome']} ({cat_nome}): "
+                      f"{ass['moeda']} {ass['valor']:.2f} ({ass['ciclo_pagamento']})")
         print()
-    
+
+    if not cabecalho:
+        print("\n⚠️  Nenhum usuário encontrado no banco de dados.\n")
+        return
+
     print("="*60 + "\n")
 
 
 if __name__ == '__main__':
-    import sys
-    
-    if len(sys.argv) > 1 and sys.argv[1] == '--usuarios':
-        listar_usuarios_detalhado()
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument(
+        '--usuarios', action='store_true',
+        help='Lista cada usuário com suas assinaturas ativas',
+    )
+    parser.add_argument(
+        '--json', action='store_true',
+        help='Saída em JSON (no modo --usuarios, um objeto por linha)',
+    )
+    parser.add_argument(
+        '--chunk-size', type=int, default=2000,
+        help='Linhas lidas por vez no modo --usuarios (padrão: 2000)',
+    )
+    args = parser.parse_args()
+
+    if args.usuarios:
+        usuarios = iterar_usuarios_detalhados(args.chunk_size)
+        if args.json:
+            for user in usuarios:
+                print(json.dumps(user, ensure_ascii=False))
+        else:
+            listar_usuarios_detalhado(usuarios)
     else:
-        exibir_estatisticas()
+        estatisticas = coletar_estatisticas()
+        if args.json:
+            print(json.dumps(estatisticas, ensure_ascii=False, indent=2))
+        else:
+            exibir_estatisticas(estatisticas)